@@ -0,0 +1,66 @@
+"""Event count and libass burn speed of the "words" and "compact" ASS modes.
+
+Renders captions for a synthetic timeline in both modes and, when ffmpeg is
+available, burns each onto a blank 1080x1920 clip (decoded to the null muxer,
+so the number is dominated by libass) to compare frames per second.
+
+Run from the repository root:
+    python -m benchmarks.bench_ass
+    python -m benchmarks.bench_ass --minutes 10 --preset clean
+"""
+import argparse
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from captions.ass_renderer import generate_ass
+from captions.chunking import chunk_words
+from captions.presets import load_preset
+from .synthetic import make_words
+
+WORDS_PER_MINUTE = 160
+
+def count_events(ass_path: Path) -> int:
+    with open(ass_path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.startswith("Dialogue:"))
+
+def burn_fps(ass_path: Path, seconds: float, fps: int = 30) -> float:
+    """Renders the subtitles over a blank clip and returns the achieved frames per second."""
+    cmd = [
+        "ffmpeg", "-v", "error", "-nostdin",
+        "-f", "lavfi", "-i", f"color=c=black:s=1080x1920:r={fps}:d={seconds}",
+        "-vf", f"ass={ass_path.name}",
+        "-f", "null", "-"
+    ]
+    started = time.perf_counter()
+    subprocess.run(cmd, check=True, cwd=ass_path.parent)
+    return seconds * fps / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ASS render modes.")
+    parser.add_argument("--minutes", type=float, default=10.0, help="Length of the synthetic timeline")
+    parser.add_argument("--preset", default="tiktok")
+    parser.add_argument("--burn-seconds", type=float, default=60.0, help="Seconds of video to burn per mode (0 to skip)")
+    args = parser.parse_args()
+
+    words = make_words(int(args.minutes * WORDS_PER_MINUTE))
+    config = load_preset(args.preset)
+    segments = chunk_words(words, config.chunking)
+    burn = args.burn_seconds > 0 and shutil.which("ffmpeg")
+
+    print(f"{len(words)} words, {len(segments)} segments ({args.minutes:g} min)")
+    print(f"{'mode':>8} {'events':>8} {'size (KB)':>10} {'generate (ms)':>14} {'burn fps':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("words", "compact"):
+            config.render_mode = mode
+            ass_path = Path(tmp) / f"{mode}.ass"
+            started = time.perf_counter()
+            generate_ass(segments, config, ass_path)
+            elapsed = time.perf_counter() - started
+            fps = f"{burn_fps(ass_path, min(args.burn_seconds, args.minutes * 60)):.1f}" if burn else "-"
+            print(f"{mode:>8} {count_events(ass_path):>8} {ass_path.stat().st_size / 1024:>10.1f} "
+                  f"{elapsed * 1000:>14.1f} {fps:>9}")
+
+if __name__ == "__main__":
+    main()
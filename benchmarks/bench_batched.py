@@ -0,0 +1,120 @@
+"""Files per hour of the regular transcription path against the batched mode.
+
+Transcribes the same inputs once file by file (captions.asr.transcribe, what
+--batch does today) and once per batch size / beam size combination with
+captions.batched.transcribe_batched, grouping --batch-files inputs per pass
+like --batch --batched. Decoding is timed after the model is loaded and the
+audio is decoded, so only transcription counts.
+
+Numbers only mean something with a real model and real speech; with --fake
+the FakeWhisperModel/FakeBatchedPipeline stand-ins run instead, which checks
+the plumbing and measures its overhead without a model download.
+
+Run from the repository root:
+    python -m benchmarks.bench_batched talks/*.mp4 --model small --compute-type int8
+    python -m benchmarks.bench_batched talks/*.mp4 --batch-sizes 4 8 16 --beam-sizes 1 5
+    python -m benchmarks.bench_batched --fake --files 8 --seconds 300
+"""
+import argparse
+import json
+import logging
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, List
+import numpy as np
+from captions.asr import SAMPLE_RATE, load_audio, transcribe
+from captions.batched import BatchedOptions, transcribe_batched
+from captions.cpu import get_cpu_budget
+from captions.models import get_model
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_OUTPUT = BENCH_DIR / "batched_results.json"
+
+def synthetic_audio(files: int, seconds: float) -> List[np.ndarray]:
+    """Low-level noise; the decoder does far less work on it than on speech."""
+    rng = np.random.default_rng(0)
+    return [(rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.01).astype(np.float32)
+            for _ in range(files)]
+
+def timed(func: Callable[[], int]) -> dict:
+    started = time.perf_counter()
+    words = func()
+    return {"seconds": round(time.perf_counter() - started, 3), "words": words}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare files/hour of regular and batched transcription.")
+    parser.add_argument("inputs", nargs="*", type=Path, help="Audio or video files (default: synthetic noise)")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--language", default="en", help="Fixed so both paths skip language detection")
+    parser.add_argument("--cpu-threads", type=int, default=0)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8])
+    parser.add_argument("--beam-sizes", type=int, nargs="+", default=[1])
+    parser.add_argument("--batch-files", type=int, default=4, help="Inputs per batched pass")
+    parser.add_argument("--files", type=int, default=4, help="Synthetic inputs when no files are given")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Length of each synthetic input")
+    parser.add_argument("--fake", action="store_true", help="Use the fake model instead of Whisper")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        if args.fake:
+            from .fakes import fake_whisper
+
+            stack.enter_context(fake_whisper())
+            args.model = "fake"
+
+        logging.disable(logging.INFO)
+        audios = [load_audio(p) for p in args.inputs] if args.inputs else synthetic_audio(args.files, args.seconds)
+        audio_hours = sum(len(a) for a in audios) / SAMPLE_RATE / 3600
+        # Resolved once so the preload, both paths and the report share one model
+        threads = args.cpu_threads or get_cpu_budget().model_threads()
+        get_model(args.model, device=args.device, compute_type=args.compute_type, cpu_threads=threads)
+
+        runs = {}
+        runs["sequential"] = timed(lambda: sum(
+            len(transcribe(a, model_size=args.model, device=args.device, compute_type=args.compute_type,
+                           language=args.language, cpu_threads=threads)) for a in audios))
+        for batch_size in args.batch_sizes:
+            for beam_size in args.beam_sizes:
+                options = BatchedOptions(batch_size=batch_size, beam_size=beam_size,
+                                         cpu_threads=threads, files=args.batch_files)
+
+                def run() -> int:
+                    words = 0
+                    for i in range(0, len(audios), args.batch_files):
+                        results = transcribe_batched(audios[i:i + args.batch_files], model_size=args.model,
+                                                     device=args.device, compute_type=args.compute_type,
+                                                     language=args.language, options=options)
+                        words += sum(len(r) for r in results)
+                    return words
+
+                runs[f"batched b{batch_size} beam{beam_size}"] = timed(run)
+        logging.disable(logging.NOTSET)
+
+    base = runs["sequential"]["seconds"]
+    print(f"{len(audios)} files, {audio_hours * 60:.1f} min of audio, model {args.model}\n")
+    print(f"{'run':<24} {'seconds':>9} {'files/hour':>11} {'x realtime':>11} {'speedup':>8} {'words':>8}")
+    for name, run in runs.items():
+        seconds = run["seconds"] or 1e-9
+        run["files_per_hour"] = round(len(audios) * 3600 / seconds, 1)
+        run["realtime_factor"] = round(audio_hours * 3600 / seconds, 2)
+        print(f"{name:<24} {run['seconds']:>9.2f} {run['files_per_hour']:>11,.0f} "
+              f"{run['realtime_factor']:>11.1f} {base / seconds:>7.2f}x {run['words']:>8}")
+
+    report = {
+        "model": args.model,
+        "device": args.device,
+        "compute_type": args.compute_type,
+        "cpu_threads": threads,
+        "files": len(audios),
+        "audio_seconds": round(audio_hours * 3600, 1),
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Chunking throughput on synthetic timelines.
+
+Run from the repository root:
+    python -m benchmarks.bench_chunking
+    python -m benchmarks.bench_chunking --sizes 1000 100000 --preset clean
+"""
+import argparse
+import time
+from captions.chunking import chunk_words
+from captions.presets import load_preset
+from .synthetic import make_words
+
+def bench(size: int, preset: str, repeat: int) -> dict:
+    words = make_words(size)
+    config = load_preset(preset).chunking
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        segments = chunk_words(words, config)
+        best = min(best, time.perf_counter() - started)
+    lines = sum(len(s.line_ranges()) for s in segments)
+    return {"words": size, "segments": len(segments), "lines": lines, "seconds": best,
+            "words_per_second": size / best if best else float("inf")}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunk_words on synthetic timelines.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--preset", default="tiktok")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'words':>8} {'segments':>9} {'lines':>7} {'time (ms)':>10} {'words/s':>12}")
+    for size in args.sizes:
+        r = bench(size, args.preset, args.repeat)
+        print(f"{r['words']:>8} {r['segments']:>9} {r['lines']:>7} {r['seconds'] * 1000:>10.1f} {r['words_per_second']:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Startup time of the CLI and GUI entry points.
+
+Runs each case in a fresh interpreter, reports the fastest and median wall
+time and the slowest imports (from python -X importtime), and exits with
+status 1 when a case goes over --max-seconds or imports a module it
+shouldn't (faster_whisper/ctranslate2 on paths that never transcribe).
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --max-seconds 0.5
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+from captions.asr import save_transcript
+from .synthetic import make_words
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that only the transcription stage may load
+TRANSCRIPTION_MODULES = ("faster_whisper", "ctranslate2")
+
+def build_cases(tmp: Path) -> Dict[str, Tuple[List[str], Tuple[str, ...]]]:
+    """Returns {name: (argv, forbidden modules)}."""
+    transcript = tmp / "bench_transcript.json"
+    save_transcript(make_words(2_000), transcript)
+    main = str(ROOT / "main.py")
+    cases = {
+        "cli_help": ([sys.executable, main, "--help"], TRANSCRIPTION_MODULES),
+        "ass_only": ([sys.executable, main, "--transcript", str(transcript), "--dry-run"], TRANSCRIPTION_MODULES),
+    }
+    if importlib.util.find_spec("customtkinter"):
+        # Importing the app module is everything that happens before the window is built
+        cases["gui_import"] = ([sys.executable, "-c", "import gui"], TRANSCRIPTION_MODULES)
+    return cases
+
+def time_run(argv: List[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run(argv, check=True, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+def import_profile(argv: List[str]) -> List[Tuple[str, float]]:
+    """Returns (module, cumulative seconds) for the top-level imports of a run."""
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME="1")
+    result = subprocess.run(argv, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the "| "
+        modules.append((name[1:].rstrip(), int(cumulative) / 1e6))
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI and GUI startup time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0,
+                        help="Fail when the median startup of a case exceeds this")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per case")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (argv, forbidden) in build_cases(Path(tmp)).items():
+            times = [time_run(argv) for _ in range(args.runs)]
+            median = statistics.median(times)
+            print(f"{name:<12} min {min(times) * 1000:7.0f} ms   median {median * 1000:7.0f} ms")
+
+            profile = import_profile(argv)
+            # Top-level entries (no leading spaces) carry the cumulative cost
+            top_level = [(m, t) for m, t in profile if not m.startswith(" ")]
+            for module, seconds in sorted(top_level, key=lambda x: -x[1])[:args.top]:
+                print(f"{'':<12} {seconds * 1000:7.1f} ms  {module.strip()}")
+
+            loaded = {m.strip() for m, _ in profile}
+            bad = [m for m in forbidden if m in loaded]
+            if bad:
+                failures.append(f"{name} imports {', '.join(bad)}")
+            if median > args.max_seconds:
+                failures.append(f"{name} took {median:.2f}s (limit {args.max_seconds:.2f}s)")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+    print(f"\nAll cases under {args.max_seconds:.2f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Stand-ins for Whisper and ffmpeg so the full pipeline runs offline.
+
+FakeWhisperModel replaces faster_whisper.WhisperModel in the model registry
+and "transcribes" any audio into a synthetic timeline proportional to its
+length; FakeBatchedPipeline does the same per clip for the batched mode. stub_ffmpeg() puts a tiny Python ffmpeg on PATH that emits silent PCM
+for decoding and a finished -progress report for burns, without touching any
+video. The stub relies on a shebang, so it only works on Unix-like systems.
+"""
+import os
+import stat
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from captions import batched, models
+from captions.asr import SAMPLE_RATE
+from .synthetic import make_words
+
+WORDS_PER_SECOND = 160 / 60
+SEGMENT_WORDS = 12
+
+class FakeWhisperModel:
+    """Mimics the parts of WhisperModel that captions.asr uses."""
+
+    def __init__(self, model_size: str, device: str = "auto", compute_type: str = "default", **kwargs):
+        self.model_size = model_size
+
+    def transcribe(self, audio, word_timestamps: bool = False, language=None, **kwargs):
+        seconds = len(audio) / SAMPLE_RATE if not isinstance(audio, str) else 60.0
+        info = SimpleNamespace(language=language or "en", language_probability=1.0, duration=seconds)
+        return fake_segments(seconds), info
+
+    def detect_language(self, audio, **kwargs):
+        return "en", 1.0, [("en", 1.0)]
+
+def fake_segments(seconds: float, offset: float = 0.0):
+    """Yields Whisper-like segments for `seconds` of audio starting at offset."""
+    words = make_words(max(1, int(seconds * WORDS_PER_SECOND)))
+    for i in range(0, len(words), SEGMENT_WORDS):
+        chunk = words[i:i + SEGMENT_WORDS]
+        yield SimpleNamespace(
+            start=offset + chunk[0].start, end=offset + chunk[-1].end,
+            text=" ".join(w.word for w in chunk),
+            words=[SimpleNamespace(word=w.word, start=offset + w.start, end=offset + w.end,
+                                   probability=w.probability) for w in chunk],
+        )
+
+class FakeBatchedPipeline:
+    """Mimics BatchedInferencePipeline.transcribe with clip_timestamps."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, language=None, clip_timestamps=None, **kwargs):
+        clips = clip_timestamps or [{"start": 0.0, "end": len(audio) / SAMPLE_RATE}]
+
+        def segments():
+            for clip in clips:
+                for segment in fake_segments(clip["end"] - clip["start"], clip["start"]):
+                    # The real pipeline rounds segment times to the millisecond
+                    segment.start, segment.end = round(segment.start, 3), round(segment.end, 3)
+                    yield segment
+
+        info = SimpleNamespace(language=language or "en", language_probability=1.0,
+                               duration=len(audio) / SAMPLE_RATE)
+        return segments(), info
+
+@contextmanager
+def fake_whisper():
+    """Makes the model registry build FakeWhisperModels (and the batched mode
+    use FakeBatchedPipeline)."""
+    original = models.WhisperModel
+    original_pipeline = batched.BatchedInferencePipeline
+    models.get_registry().clear()
+    models.WhisperModel = FakeWhisperModel
+    batched.BatchedInferencePipeline = FakeBatchedPipeline
+    try:
+        yield
+    finally:
+        models.WhisperModel = original
+        batched.BatchedInferencePipeline = original_pipeline
+        models.get_registry().clear()
+
+STUB_FFMPEG = """#!{python}
+import os, sys
+args = sys.argv[1:]
+if "pipe:1" in args and "s16le" in args:
+    # Audio decode: silent 16-bit mono PCM of the requested length
+    seconds = float(os.environ.get("CAPTIONS_STUB_AUDIO_SECONDS", "60"))
+    sys.stdout.buffer.write(bytes(int(seconds * {rate}) * 2))
+    sys.exit(0)
+output = args[-1] if args else "-"
+if output not in ("-", "pipe:1"):
+    open(output, "wb").close()
+if "-progress" in args:
+    print("frame=1800\\nfps=900.0\\nspeed=30.0x\\nprogress=end", flush=True)
+"""
+
+@contextmanager
+def stub_ffmpeg(audio_seconds: float = 60.0):
+    """Replaces PATH with a folder holding only the stub ffmpeg.
+
+    ffprobe is deliberately missing, so media helpers take their fallbacks.
+    """
+    old_path = os.environ.get("PATH", "")
+    old_seconds = os.environ.get("CAPTIONS_STUB_AUDIO_SECONDS")
+    with tempfile.TemporaryDirectory() as tmp:
+        ffmpeg = Path(tmp) / "ffmpeg"
+        ffmpeg.write_text(STUB_FFMPEG.format(python=sys.executable, rate=SAMPLE_RATE))
+        ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IXUSR)
+        os.environ["PATH"] = tmp
+        os.environ["CAPTIONS_STUB_AUDIO_SECONDS"] = str(audio_seconds)
+        try:
+            yield
+        finally:
+            os.environ["PATH"] = old_path
+            if old_seconds is None:
+                os.environ.pop("CAPTIONS_STUB_AUDIO_SECONDS", None)
+            else:
+                os.environ["CAPTIONS_STUB_AUDIO_SECONDS"] = old_seconds
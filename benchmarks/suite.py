@@ -0,0 +1,193 @@
+"""Benchmark suite with a stored baseline and a regression gate.
+
+Measures the hot paths in isolation on synthetic timelines (chunk_words,
+get_text_width, format_time, generate_ass, load_preset) and a full
+process_video run with a fake WhisperModel and a stub ffmpeg, so it needs no
+model download, GPU or real ffmpeg.
+
+Every benchmark reports a throughput (higher is better). Results are written
+to --output; with a baseline present the suite exits with status 1 when any
+throughput drops more than --threshold below it. Baselines are machine
+specific, record one on the machine that runs the comparison.
+
+Run from the repository root:
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite
+    python -m benchmarks.suite --words 50000 --threshold 0.1 --only chunk_words generate_ass
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from captions.ass_renderer import format_time, generate_ass, get_text_width
+from captions.chunking import chunk_words
+from captions.presets import load_preset
+from .synthetic import make_words
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results.json"
+
+def best_of(repeat: int, func: Callable[[], None]) -> float:
+    """Runs func `repeat` times and returns the fastest wall time."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+# Each benchmark returns (operations, seconds) and is reported as operations per second
+
+def bench_chunk_words(words: int, repeat: int) -> Tuple[int, float]:
+    timeline = make_words(words)
+    config = load_preset("tiktok").chunking
+    return words, best_of(repeat, lambda: chunk_words(timeline, config))
+
+def bench_get_text_width(words: int, repeat: int) -> Tuple[int, float]:
+    texts = [w.word for w in make_words(words)]
+    font = load_preset("tiktok").font
+
+    def run():
+        for text in texts:
+            get_text_width(text, font.name, font.size)
+
+    return len(texts), best_of(repeat, run)
+
+def bench_format_time(words: int, repeat: int) -> Tuple[int, float]:
+    times = [w.start for w in make_words(words)]
+
+    def run():
+        for t in times:
+            format_time(t)
+
+    return len(times), best_of(repeat, run)
+
+def bench_generate_ass(words: int, repeat: int) -> Tuple[int, float]:
+    config = load_preset("tiktok")
+    segments = chunk_words(make_words(words), config.chunking)
+    with tempfile.TemporaryDirectory() as tmp:
+        ass_path = Path(tmp) / "bench.ass"
+        return words, best_of(repeat, lambda: generate_ass(segments, config, ass_path))
+
+def bench_load_preset(words: int, repeat: int) -> Tuple[int, float]:
+    calls = 200
+
+    def run():
+        for _ in range(calls):
+            load_preset("tiktok")
+
+    return calls, best_of(repeat, run)
+
+def bench_process_video(words: int, repeat: int) -> Tuple[int, float]:
+    # Imported here so the isolated benchmarks don't need faster_whisper
+    from main import process_video
+    from .fakes import WORDS_PER_SECOND, fake_whisper, stub_ffmpeg
+
+    audio_seconds = words / WORDS_PER_SECOND
+    with tempfile.TemporaryDirectory() as tmp, fake_whisper(), stub_ffmpeg(audio_seconds):
+        input_path = Path(tmp) / "input.mp4"
+        input_path.touch()
+
+        def run():
+            process_video(str(input_path), str(Path(tmp) / "output.mp4"), model="fake", use_cache=False)
+
+        return words, best_of(repeat, run)
+
+BENCHMARKS: Dict[str, Callable[[int, int], Tuple[int, float]]] = {
+    "chunk_words": bench_chunk_words,
+    "get_text_width": bench_get_text_width,
+    "format_time": bench_format_time,
+    "generate_ass": bench_generate_ass,
+    "load_preset": bench_load_preset,
+    "process_video": bench_process_video,
+}
+
+def run_suite(names: List[str], words: int, repeat: int) -> Dict[str, dict]:
+    results = {}
+    for name in names:
+        if name == "process_video" and os.name == "nt":
+            print(f"{name:<16} skipped (the stub ffmpeg needs a Unix shell)")
+            continue
+        # The pipeline logs a lot; keep the table readable
+        logging.disable(logging.CRITICAL)
+        try:
+            with redirect_stdout(io.StringIO()):
+                ops, seconds = BENCHMARKS[name](words, repeat)
+        finally:
+            logging.disable(logging.NOTSET)
+        results[name] = {"ops": ops, "seconds": round(seconds, 6),
+                         "ops_per_second": round(ops / seconds, 2) if seconds else float("inf")}
+        print(f"{name:<16} {ops:>8} ops {seconds * 1000:>10.1f} ms {results[name]['ops_per_second']:>14,.0f} ops/s")
+    return results
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Returns the names of benchmarks that regressed more than threshold."""
+    regressions = []
+    print(f"\n{'benchmark':<16} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["ops_per_second"]
+        after = result["ops_per_second"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<16} {before:>14,.0f} {after:>14,.0f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare against a baseline.")
+    parser.add_argument("--words", type=int, default=10_000, help="Size of the synthetic timeline")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the fastest counts")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run a subset of the benchmarks")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed throughput drop before failing (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+
+    results = run_suite(args.only or list(BENCHMARKS), args.words, args.repeat)
+    report = {
+        "words": args.words,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline to create one.")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("words") != args.words:
+        print(f"\nWarning: baseline was recorded with --words {baseline.get('words')}")
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+if __name__ == "__main__":
+    main()
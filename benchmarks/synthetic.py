@@ -0,0 +1,29 @@
+import random
+from typing import List
+from captions.asr import Word
+
+VOCABULARY = [
+    "the", "a", "and", "to", "of", "you", "that", "it", "is", "in", "this", "for", "was", "on",
+    "really", "people", "because", "something", "actually", "video", "caption", "thinking",
+    "everyone", "important", "different", "understand", "absolutely", "here", "now", "so",
+]
+PUNCTUATION = [".", ",", "?", "!"]
+
+def make_words(count: int, seed: int = 0) -> List[Word]:
+    """Builds a synthetic word timeline that looks like real speech.
+
+    Roughly 3 words per second, punctuation every ~8 words and an occasional
+    longer pause, so chunking hits all of its split rules.
+    """
+    rng = random.Random(seed)
+    words = []
+    t = 0.0
+    for _ in range(count):
+        text = rng.choice(VOCABULARY)
+        if rng.random() < 0.12:
+            text += rng.choice(PUNCTUATION)
+        duration = 0.12 + 0.04 * len(text) * rng.uniform(0.6, 1.4)
+        words.append(Word(text, t, t + duration, rng.uniform(0.6, 1.0)))
+        t += duration
+        t += rng.uniform(0.6, 1.2) if rng.random() < 0.05 else rng.uniform(0.0, 0.08)
+    return words
@@ -1,11 +1,18 @@
 import subprocess
 import json
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Dict, Any
-from faster_whisper import WhisperModel
-from .utils import log_info, log_success, log_error, log_warning
+from typing import Any, Callable, Dict, List, Optional, Union
+import numpy as np
+from .cpu import claim_threads, get_cpu_budget
+from .models import get_model, uses_gpu
+from .utils import JobCancelled, ProgressCallback, log_info, log_success, log_error, log_warning
+
+SAMPLE_RATE = 16000
 
 class Word:
+    __slots__ = ("word", "start", "end", "probability")
+
     def __init__(self, word: str, start: float, end: float, probability: float):
         self.word = word.strip()
         self.start = start
@@ -20,6 +27,10 @@ class Word:
             "probability": self.probability
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Word":
+        return cls(data["word"], data["start"], data["end"], data.get("probability", 1.0))
+
 def extract_audio(video_path: Path, output_path: Path) -> Path:
     """Extracts audio from video using ffmpeg."""
     log_info(f"Extracting audio from {video_path}...")
@@ -42,41 +53,142 @@ def extract_audio(video_path: Path, output_path: Path) -> Path:
         log_error(f"FFmpeg failed: {e.stderr.decode()}")
         raise
 
+def load_audio(input_path: Path, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decodes any audio or video file to mono float32 PCM through an ffmpeg pipe."""
+    log_info(f"Decoding audio from {input_path}...")
+
+    # Raw signed 16-bit PCM on stdout, no intermediate WAV file
+    cmd = [
+        "ffmpeg", "-nostdin",
+        "-i", str(input_path),
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "pipe:1"
+    ]
+
+    try:
+        result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        log_error(f"FFmpeg failed: {e.stderr.decode()}")
+        raise
 
-def transcribe(audio_path: Path, model_size: str = "medium", device: str = "auto", compute_type: str = "default") -> List[Word]:
-    """Transcribes audio using faster-whisper and returns a list of words."""
+    audio = np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32)
+    audio *= 1.0 / 32768.0
+    log_success(f"Decoded {len(audio) / sample_rate:.1f}s of audio")
+    return audio
+
+def whisper_threads(device: str, cpu_threads: int = 0):
+    """Context yielding the cpu_threads for a WhisperModel and holding them in
+    the CPU budget (see captions.cpu) while the model runs.
+
+    Unless the caller chose a count, it is the budget's fixed model_threads,
+    so every job of this process asks the registry for the same model. GPU
+    models use no budget.
+    """
+    if uses_gpu(device):
+        return nullcontext(cpu_threads)
+    return claim_threads("transcribe", cpu_threads or get_cpu_budget().model_threads())
+
+def transcribe(audio_path: Union[Path, np.ndarray], model_size: str = "medium", device: str = "auto", compute_type: str = "default",
+               language: Optional[str] = None, cpu_threads: int = 0,
+               progress: Optional[ProgressCallback] = None,
+               on_words: Optional[Callable[[List[Word]], None]] = None,
+               on_restart: Optional[Callable[[], None]] = None) -> List[Word]:
+    """Transcribes audio using faster-whisper and returns a list of words.
+
+    audio_path may be a file or a 16 kHz mono float32 buffer from load_audio.
+    progress is called after every decoded segment with the fraction of the
+    audio covered so far. on_words gets the words of each segment as soon as
+    Whisper has decoded it, so later stages can run alongside. If the device
+    fails after words were handed out, on_restart is called to drop them
+    before the CPU retry hands them out again; without it there is no retry.
+    An explicit cpu_threads is taken as already claimed by the caller (see
+    whisper_threads); with 0 this function claims its own share.
+    """
+    audio = audio_path if isinstance(audio_path, np.ndarray) else str(audio_path)
+    # Once words have been handed out, a retry would hand them out twice
+    delivered = False
+
+    def _claim(dev):
+        if cpu_threads:
+            return nullcontext(cpu_threads)
+        return whisper_threads(dev)
     
-    def _run_transcription(dev, comp_type):
-        log_info(f"Loading Whisper model ({model_size}) on {dev}...")
-        model = WhisperModel(model_size, device=dev, compute_type=comp_type)
+    def _run_transcription(dev, comp_type, threads):
+        # Models are cached process-wide, so only the first job pays the load
+        model = get_model(model_size, device=dev, compute_type=comp_type, cpu_threads=threads)
         log_info("Transcribing...")
-        segments, info = model.transcribe(str(audio_path), word_timestamps=True)
+        segments, info = model.transcribe(audio, word_timestamps=True, language=language)
         
+        nonlocal delivered
         words = []
         for segment in segments:
             if segment.words:
-                for w in segment.words:
-                    words.append(Word(w.word, w.start, w.end, w.probability))
+                segment_words = [Word(w.word, w.start, w.end, w.probability) for w in segment.words]
+                words.extend(segment_words)
+                if on_words:
+                    delivered = True
+                    on_words(segment_words)
+            if progress and info.duration:
+                progress("transcribe", min(segment.end / info.duration, 1.0))
         return words
 
-    try:
-        return _run_transcription(device, compute_type)
-    except Exception as e:
-        log_warning(f"Transcription failed with device='{device}': {e}")
-        if device != "cpu":
-            log_info("Attempting fallback to CPU...")
-            try:
-                # int8 is usually safe and fast enough for CPU
-                return _run_transcription("cpu", "int8")
-            except Exception as e2:
-                log_error(f"Failed to transcribe on CPU: {e2}")
-                raise e2
-        else:
+    def _run_with_fallback(threads):
+        nonlocal delivered
+        try:
+            return _run_transcription(device, compute_type, threads)
+        except JobCancelled:
             raise
+        except Exception as e:
+            log_warning(f"Transcription failed with device='{device}': {e}")
+            if device != "cpu" and (not delivered or on_restart):
+                log_info("Attempting fallback to CPU...")
+                if delivered:
+                    on_restart()
+                    delivered = False
+                try:
+                    # int8 is usually safe and fast enough for CPU
+                    with _claim("cpu") as threads:
+                        return _run_transcription("cpu", "int8", threads)
+                except Exception as e2:
+                    log_error(f"Failed to transcribe on CPU: {e2}")
+                    raise e2
+            else:
+                raise
+
+    with _claim(device) as threads:
+        return _run_with_fallback(threads)
 
 def save_transcript(words: List[Word], output_path: Path):
-    """Saves the transcript to a JSON file."""
-    data = [w.to_dict() for w in words]
+    """Saves the transcript to a JSON file, one word per line.
+
+    Also writes the compact binary timeline next to it (same name, .words).
+    """
+    # Imported here: timeline imports Word from this module
+    from .timeline import WordTimeline
+
+    # One compact object per line keeps the file small but still easy to edit
+    lines = [json.dumps(w.to_dict(), ensure_ascii=False, separators=(",", ":")) for w in words]
     with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("[\n" + ",\n".join(lines) + "\n]\n")
+    WordTimeline.from_words(words).save(output_path.with_suffix(".words"))
     log_info(f"Transcript saved to {output_path}")
+
+def load_transcript(transcript_path: Path):
+    """Loads a transcript written by save_transcript (JSON or binary .words).
+
+    Binary timelines are memory-mapped and returned as a WordTimeline.
+    """
+    from .timeline import WordTimeline, is_timeline_file
+
+    if is_timeline_file(transcript_path):
+        words = WordTimeline.load(transcript_path)
+    else:
+        with open(transcript_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        words = [Word.from_dict(d) for d in data]
+    log_info(f"Loaded {len(words)} words from {transcript_path}")
+    return words
@@ -1,12 +1,31 @@
 import datetime
-import tkinter as tk
-from tkinter import font as tkfont
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 from .chunking import CaptionSegment
+from .fonts import text_width
 from .presets import PresetConfig
 from .utils import log_info
 
+# Distance between stacked caption lines, relative to the font size
+LINE_SPACING = 1.2
+
+# Presets are designed on a 1080x1920 (9:16) canvas. Other sources keep that
+# canvas height and get a width matching their aspect ratio, so font sizes and
+# margins stay the same share of the frame height and text isn't stretched.
+REFERENCE_WIDTH = 1080
+REFERENCE_HEIGHT = 1920
+
+def play_resolution(video_size: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+    """Returns the ASS PlayResX/PlayResY for a video of the given (width, height).
+
+    libass scales the script canvas to whatever frame it draws on, so only the
+    aspect ratio matters; a downscaled preview uses the same script.
+    """
+    if not video_size or not video_size[0] or not video_size[1]:
+        return REFERENCE_WIDTH, REFERENCE_HEIGHT
+    width, height = video_size
+    return max(1, round(REFERENCE_HEIGHT * width / height)), REFERENCE_HEIGHT
+
 def format_time(seconds: float) -> str:
     """Formats seconds into ASS timestamp format: H:MM:SS.cc"""
     td = datetime.timedelta(seconds=seconds)
@@ -20,35 +39,21 @@ def format_time(seconds: float) -> str:
     return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
 
 def get_text_width(text: str, font_family: str, font_size: int) -> int:
-    """Calculates the width of text in pixels using tkinter."""
-    try:
-        # Create a hidden root window if not exists
-        try:
-            root = tk.Tk()
-            root.withdraw()
-        except Exception:
-            # If Tk is already initialized or fails
-            pass
-            
-        # Use negative size for pixels
-        font = tkfont.Font(family=font_family, size=-font_size)
-        return font.measure(text)
-    except Exception:
-        # Fallback estimation if tkinter fails (e.g. headless)
-        # Average char width ~0.5 * size? Very rough.
-        return int(len(text) * font_size * 0.5)
-
-def generate_ass(segments: List[CaptionSegment], config: PresetConfig, output_path: Path):
-    """Generates an ASS subtitle file with word-level highlighting."""
-    log_info(f"Generating ASS file at {output_path}...")
-    
+    """Calculates the width of text in pixels from the font file metrics."""
+    # Styles are rendered bold (Bold=-1), so measure the bold face
+    return text_width(text, font_family, font_size, bold=True)
+
+def ass_header(config: PresetConfig, play_res: Optional[Tuple[int, int]] = None) -> str:
+    """The [Script Info], [V4+ Styles] and [Events] format lines of the ASS file."""
+    play_x, play_y = play_res or (REFERENCE_WIDTH, REFERENCE_HEIGHT)
+
     # ASS Header
     # Note: HighlightBox uses BorderStyle=3 (Opaque Box)
     # BackColour is the box color.
-    header = f"""[Script Info]
+    return f"""[Script Info]
 ScriptType: v4.00+
-PlayResX: 1080
-PlayResY: 1920
+PlayResX: {play_x}
+PlayResY: {play_y}
 WrapStyle: 0
 ScaledBorderAndShadow: yes
 
@@ -61,87 +66,180 @@ Style: HighlightText,{config.font.name},{config.font.size},{config.highlight.tex
 [Events]
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
-    
-    events = []
-    
-    # Screen center X
-    center_x = 1080 // 2
-    screen_height = 1920
-    
-    for seg in segments:
-        start_time = format_time(seg.start)
-        end_time = format_time(seg.end)
-        
-        # Calculate positions
-        # We need to measure each word and the spaces
-        words = seg.words
-        word_widths = []
-        space_width = get_text_width(" ", config.font.name, config.font.size)
-        
-        total_width = 0
-        for i, w in enumerate(words):
-            w_width = get_text_width(w.word, config.font.name, config.font.size)
-            word_widths.append(w_width)
-            total_width += w_width
-            if i < len(words) - 1:
-                total_width += space_width
-                
-        # Starting X position (centered)
-        # Alignment 2 is Bottom Center.
-        # If we use \pos(x, y), x is the center of the text if alignment is center?
-        # No, \pos sets the anchor point.
-        # If Alignment=2 (Bottom Center), \pos(x,y) means the bottom-center of the text is at (x,y).
-        # So if we want to position words left-to-right, we need to calculate their centers.
-        
-        # Start X (Left edge of the line)
-        start_left_x = center_x - (total_width // 2)
-        
-        # Y position calculation
+
+# Segments rendered per write when the whole list is known up front
+WRITE_BATCH = 500
+
+class AssWriter:
+    """Writes an ASS file one caption segment at a time.
+
+    The header goes out when the file is opened and every write() appends
+    the events of the given segments and flushes, so the file on disk is
+    always a valid script of the captions written so far.
+    """
+
+    def __init__(self, output_path: Path, config: PresetConfig,
+                 play_res: Optional[Tuple[int, int]] = None):
+        self.output_path = output_path
+        self.config = config
+        self.events = 0
+        play_x, play_y = play_res or (REFERENCE_WIDTH, REFERENCE_HEIGHT)
+
+        self.compact = config.render_mode == "compact"
+        # Box and text layers can share one event when the text layer adds no outline
+        self.merge_highlight = self.compact and config.highlight.outline_width == 0
+
+        # Screen center X
+        self.center_x = play_x // 2
+        screen_height = play_y
+
+        self.space_width = get_text_width(" ", config.font.name, config.font.size)
+        self.line_height = int(config.font.size * LINE_SPACING)
+
+        # Y position calculation (baseline of the line closest to the margin)
         if config.position == "top":
-            pos_y = config.margin_bottom # Using margin_bottom as margin_top here
+            self.pos_y = config.margin_bottom # Using margin_bottom as margin_top here
         elif config.position == "middle":
-            pos_y = screen_height // 2
+            self.pos_y = screen_height // 2
         else: # bottom
-            pos_y = screen_height - config.margin_bottom
-        
-        current_x = start_left_x
+            self.pos_y = screen_height - config.margin_bottom
+
+        self.file = open(output_path, "w", encoding="utf-8")
+        self.file.write(ass_header(config, play_res))
+        self.file.flush()
+
+    def __enter__(self) -> "AssWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def write(self, segments: List[CaptionSegment]) -> int:
+        """Appends the events of the segments; returns how many were written."""
+        events = []
+        for seg in segments:
+            self._segment_events(seg, events)
+        if events:
+            self.file.write("\n".join(events) + "\n")
+            self.file.flush()
+        self.events += len(events)
+        return len(events)
+
+    def _segment_events(self, seg: CaptionSegment, events: List[str]):
+        config = self.config
+        compact = self.compact
+        merge_highlight = self.merge_highlight
+        center_x = self.center_x
+        pos_y = self.pos_y
+        space_width = self.space_width
+        line_height = self.line_height
+
+        start_time = format_time(seg.start)
+        end_time = format_time(seg.end)
         
-        for i, word in enumerate(words):
-            w_width = word_widths[i]
+        # Read straight from the timeline columns, no per-word objects
+        timeline = seg.timeline
+        line_ranges = seg.line_ranges()
+        line_count = len(line_ranges)
+        for line_index, (first, last) in enumerate(line_ranges):
+            texts = timeline.texts(first, last)
+            # Stack lines away from the margin: bottom captions grow upwards,
+            # top captions grow downwards, middle captions stay centered
+            if config.position == "top":
+                line_y = pos_y + line_index * line_height
+            elif config.position == "middle":
+                line_y = pos_y + int((line_index - (line_count - 1) / 2) * line_height)
+            else:
+                line_y = pos_y - (line_count - 1 - line_index) * line_height
+
+            # Calculate positions
+            # We need to measure each word and the spaces
+            word_widths = []
+            total_width = 0
+            for i, text in enumerate(texts):
+                w_width = get_text_width(text, config.font.name, config.font.size)
+                word_widths.append(w_width)
+                total_width += w_width
+                if i < len(texts) - 1:
+                    total_width += space_width
+                    
+            # Starting X position (centered)
+            # Alignment 2 is Bottom Center.
+            # If we use \pos(x, y), x is the center of the text if alignment is center?
+            # No, \pos sets the anchor point.
+            # If Alignment=2 (Bottom Center), \pos(x,y) means the bottom-center of the text is at (x,y).
+            # So if we want to position words left-to-right, we need to calculate their centers.
             
-            # Calculate center of this word
-            word_center_x = current_x + (w_width // 2)
+            # Start X (Left edge of the line)
+            start_left_x = center_x - (total_width // 2)
             
-            # Base Event (Layer 0) - Default Style
-            # We use \pos to position it exactly
-            events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{{\\pos({word_center_x},{pos_y})}}{word.word}")
+            current_x = start_left_x
+
+            if compact:
+                # One base event for the whole line, centered where the words would be
+                line_center_x = start_left_x + (total_width // 2)
+                events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{{\\pos({line_center_x},{line_y})}}{' '.join(texts)}")
             
-            if config.highlight.enabled:
-                # Highlight Event (Layer 1) - HighlightBox Style
-                # Only for the duration of the word
-                w_start = format_time(word.start)
-                w_end = format_time(word.end)
+            for i, text in enumerate(texts):
+                w_width = word_widths[i]
                 
-                # Animation Tags
-                anim_tags = ""
-                if hasattr(config.highlight, 'animation') and config.highlight.animation == "pop":
-                    # Pop animation: Scale up to 115% quickly
-                    anim_tags = "\\fscx115\\fscy115"
+                # Calculate center of this word
+                word_center_x = current_x + (w_width // 2)
                 
-                # Layer 1: Box (HighlightBox)
-                # BorderStyle=3 draws a box around the text.
-                # We make the text transparent (\1a&HFF&) so we only see the box.
-                events.append(f"Dialogue: 1,{w_start},{w_end},HighlightBox,,0,0,0,,{{\\pos({word_center_x},{pos_y})\\1a&HFF&{anim_tags}}}{word.word}")
+                # Base Event (Layer 0) - Default Style
+                # We use \pos to position it exactly
+                if not compact:
+                    events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{{\\pos({word_center_x},{line_y})}}{text}")
                 
-                # Layer 2: Text (HighlightText)
-                # Draws the text face and outline on top of the box.
-                events.append(f"Dialogue: 2,{w_start},{w_end},HighlightText,,0,0,0,,{{\\pos({word_center_x},{pos_y}){anim_tags}}}{word.word}")
-            
-            # Advance X
-            current_x += w_width + space_width
+                if config.highlight.enabled:
+                    # Highlight Event (Layer 1) - HighlightBox Style
+                    # Only for the duration of the word
+                    w_start = format_time(float(timeline.starts[first + i]))
+                    w_end = format_time(float(timeline.ends[first + i]))
+                    
+                    # Animation Tags
+                    anim_tags = ""
+                    if hasattr(config.highlight, 'animation') and config.highlight.animation == "pop":
+                        # Pop animation: Scale up to 115% quickly
+                        anim_tags = "\\fscx115\\fscy115"
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(header)
-        f.write("\n".join(events))
-    
-    log_info(f"ASS file generated with {len(events)} events.")
+                    if merge_highlight:
+                        # Box and visible text in one event: HighlightBox already uses the highlight text color
+                        events.append(f"Dialogue: 1,{w_start},{w_end},HighlightBox,,0,0,0,,{{\\pos({word_center_x},{line_y}){anim_tags}}}{text}")
+                        current_x += w_width + space_width
+                        continue
+                    
+                    # Layer 1: Box (HighlightBox)
+                    # BorderStyle=3 draws a box around the text.
+                    # We make the text transparent (\1a&HFF&) so we only see the box.
+                    events.append(f"Dialogue: 1,{w_start},{w_end},HighlightBox,,0,0,0,,{{\\pos({word_center_x},{line_y})\\1a&HFF&{anim_tags}}}{text}")
+                    
+                    # Layer 2: Text (HighlightText)
+                    # Draws the text face and outline on top of the box.
+                    events.append(f"Dialogue: 2,{w_start},{w_end},HighlightText,,0,0,0,,{{\\pos({word_center_x},{line_y}){anim_tags}}}{text}")
+                
+                # Advance X
+                current_x += w_width + space_width
+
+
+def generate_ass(segments: List[CaptionSegment], config: PresetConfig, output_path: Path,
+                 play_res: Optional[Tuple[int, int]] = None) -> int:
+    """Generates an ASS subtitle file with word-level highlighting.
+
+    Returns the number of events written. play_res is the script canvas from
+    play_resolution(); it defaults to the 1080x1920 reference.
+
+    config.render_mode "compact" produces the same look with far fewer events:
+    one base event per line instead of one per word, and a single highlight
+    event per word when the highlighted text has no outline of its own.
+    """
+    log_info(f"Generating ASS file at {output_path}...")
+    with AssWriter(output_path, config, play_res) as writer:
+        # In batches, so the event strings of a long video never all sit in memory
+        for i in range(0, len(segments), WRITE_BATCH):
+            writer.write(segments[i:i + WRITE_BATCH])
+    log_info(f"ASS file generated with {writer.events} events.")
+    return writer.events
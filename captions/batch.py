@@ -0,0 +1,333 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+from .asr import save_transcript
+from .media import AUDIO_EXTENSIONS
+from .batched import BatchedOptions
+from .pipeline import (build_config, decode_input, transcribe_audio, transcribe_files, render_captions,
+                       burn_subtitles, transcript_path_for, ass_path_for, video_play_res)
+from .utils import log_info, log_error, log_success, log_warning, get_output_path
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v"}
+MEDIA_EXTENSIONS = VIDEO_EXTENSIONS | AUDIO_EXTENSIONS
+MANIFEST_EXTENSIONS = {".txt", ".json"}
+
+class BatchJob:
+    """One input file moving through the batch pipeline."""
+
+    def __init__(self, input_path: Path, output_path: Path, preset: Optional[str] = None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.preset = preset
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        self.timings = {}
+
+        # Intermediate results handed from stage to stage
+        self.audio = None
+        self.audio_only = False
+        self.temp_audio: Optional[Path] = None
+        self.words = None
+        self.ass_path: Optional[Path] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "input": str(self.input_path),
+            "output": str(self.output_path),
+            "preset": self.preset,
+            "status": self.status,
+            "failed_stage": self.failed_stage,
+            "error": self.error,
+            "timings": {k: round(v, 3) for k, v in self.timings.items()},
+        }
+
+def _make_job(input_path: Path, output_dir: Optional[Path], output: Optional[str] = None,
+              preset: Optional[str] = None) -> BatchJob:
+    if output:
+        output_path = Path(output)
+    elif output_dir:
+        output_path = output_dir / f"{input_path.stem}_out.mp4"
+    else:
+        output_path = get_output_path(str(input_path))
+    return BatchJob(input_path, output_path, preset)
+
+def _unique_outputs(jobs: List[BatchJob]) -> List[BatchJob]:
+    """Numbers the outputs that collide, e.g. a.mp4 and a.mov in one folder,
+    which would otherwise overwrite each other: a_out.mp4, a_out_2.mp4, ..."""
+    taken = set()
+    for job in jobs:
+        path = job.output_path
+        n = 1
+        while os.path.normcase(path.resolve()) in taken:
+            n += 1
+            path = job.output_path.with_name(f"{job.output_path.stem}_{n}{job.output_path.suffix}")
+        if path != job.output_path:
+            log_warning(f"{job.input_path}: {job.output_path.name} is taken by another input, writing {path.name}")
+            job.output_path = path
+        taken.add(os.path.normcase(path.resolve()))
+    return jobs
+
+def collect_jobs(source: str, output_dir: Optional[str] = None) -> List[BatchJob]:
+    """Builds the job list from a directory, a glob pattern or a manifest file.
+
+    Manifests are either .txt (one input per line, # comments allowed) or .json
+    (a list of paths or of {"input", "output", "preset"} objects). Relative
+    paths in a manifest are resolved against the manifest's folder. Outputs
+    that would collide are numbered.
+    """
+    return _unique_outputs(_collect_jobs(source, output_dir))
+
+def _collect_jobs(source: str, output_dir: Optional[str] = None) -> List[BatchJob]:
+    out_dir = Path(output_dir) if output_dir else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    path = Path(source)
+    if path.is_dir():
+        inputs = sorted(p for p in path.iterdir() if p.suffix.lower() in MEDIA_EXTENSIONS)
+        return [_make_job(p, out_dir) for p in inputs]
+
+    if path.is_file() and path.suffix.lower() in MANIFEST_EXTENSIONS:
+        base = path.parent
+        jobs = []
+        with open(path, "r", encoding="utf-8") as f:
+            if path.suffix.lower() == ".json":
+                entries = json.load(f)
+            else:
+                entries = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {"input": entry}
+            input_path = base / entry["input"]
+            output = entry.get("output")
+            jobs.append(_make_job(input_path, out_dir, str(base / output) if output else None,
+                                  entry.get("preset")))
+        return jobs
+
+    if path.is_file():
+        return [_make_job(path, out_dir)]
+
+    inputs = sorted(Path(p) for p in glob.glob(source, recursive=True))
+    return [_make_job(p, out_dir) for p in inputs if p.suffix.lower() in MEDIA_EXTENSIONS]
+
+def _run_stage(name: str, func: Callable[[BatchJob], None], inbox: queue.Queue,
+               outbox: queue.Queue, workers: int = 1) -> List[threading.Thread]:
+    """Starts worker threads that apply func to every job from inbox.
+
+    Failed jobs are passed through untouched so the report sees them. The
+    None sentinel is forwarded once all workers of this stage have finished.
+    """
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            job = inbox.get()
+            if job is None:
+                # Let sibling workers see the sentinel too
+                inbox.put(None)
+                with lock:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        outbox.put(None)
+                return
+            if job.status != "failed":
+                started = time.perf_counter()
+                try:
+                    func(job)
+                except Exception as e:
+                    job.status = "failed"
+                    job.failed_stage = name
+                    job.error = str(e)
+                    log_error(f"[{job.input_path.name}] {name} failed: {e}")
+                job.timings[name] = time.perf_counter() - started
+            outbox.put(job)
+
+    threads = [threading.Thread(target=worker, name=f"batch-{name}-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    return threads
+
+def _run_group_stage(name: str, func: Callable[[List[BatchJob]], None], inbox: queue.Queue,
+                     outbox: queue.Queue, max_group: int) -> threading.Thread:
+    """Like _run_stage with one worker, but hands func every job already
+    waiting in inbox (up to max_group) at once. A failure fails the group.
+    """
+    def worker():
+        ended = False
+        while not ended:
+            group = [inbox.get()]
+            while len(group) < max_group and group[-1] is not None:
+                try:
+                    group.append(inbox.get_nowait())
+                except queue.Empty:
+                    break
+            if group[-1] is None:
+                group.pop()
+                ended = True
+            ready = [job for job in group if job.status != "failed"]
+            if ready:
+                started = time.perf_counter()
+                try:
+                    func(ready)
+                except Exception as e:
+                    for job in ready:
+                        job.status = "failed"
+                        job.failed_stage = name
+                        job.error = str(e)
+                    log_error(f"{name} failed for {', '.join(j.input_path.name for j in ready)}: {e}")
+                for job in ready:
+                    job.timings[name] = time.perf_counter() - started
+            for job in group:
+                outbox.put(job)
+        outbox.put(None)
+
+    thread = threading.Thread(target=worker, name=f"batch-{name}", daemon=True)
+    thread.start()
+    return thread
+
+def run_batch(jobs: List[BatchJob], preset: str = "tiktok", model: str = "medium", device: str = "auto",
+              dry_run: bool = False, style_options: dict = None, compute_type: str = "default",
+              language: str = None, use_cache: bool = True, in_memory_audio: bool = True,
+              queue_size: int = 2, burn_workers: int = 1,
+              report_path: Optional[Path] = None,
+              batched: Optional[BatchedOptions] = None) -> List[BatchJob]:
+    """Runs jobs through extract -> transcribe -> chunk/ASS -> burn as a pipeline.
+
+    Every stage runs in its own thread(s) connected by bounded queues, so the
+    next file is decoded and transcribed while the previous one is encoding,
+    and a slow stage throttles the ones in front of it instead of piling up
+    decoded audio in memory. With batched, up to batched.files decoded files
+    are transcribed together in one batched Whisper pass.
+    """
+    configs = {}
+
+    def extract(job: BatchJob):
+        if not job.input_path.exists():
+            raise FileNotFoundError(f"Input file not found: {job.input_path}")
+        # Load the preset early so a bad preset fails before the expensive stages
+        name = job.preset or preset
+        if name not in configs:
+            configs[name] = build_config(name, style_options)
+        log_info(f"[{job.input_path.name}] Decoding audio...")
+        job.audio, job.audio_only, job.temp_audio = decode_input(job.input_path, in_memory_audio)
+
+    def transcribe_stage(job: BatchJob):
+        log_info(f"[{job.input_path.name}] Transcribing...")
+        try:
+            job.words = transcribe_audio(job.audio, model=model, device=device, compute_type=compute_type,
+                                         language=language, use_cache=use_cache)
+        finally:
+            # Decoded audio is the biggest thing we hold, drop it as soon as possible
+            job.audio = None
+            _cleanup_temp_audio(job)
+        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+        save_transcript(job.words, transcript_path_for(job.output_path))
+
+    def transcribe_group(group: List[BatchJob]):
+        log_info(f"Transcribing {len(group)} file(s) in one batched pass...")
+        try:
+            results = transcribe_files([job.audio for job in group], model=model, device=device,
+                                       compute_type=compute_type, language=language,
+                                       use_cache=use_cache, options=batched)
+        finally:
+            for job in group:
+                job.audio = None
+                _cleanup_temp_audio(job)
+        for job, words in zip(group, results):
+            job.words = words
+            job.output_path.parent.mkdir(parents=True, exist_ok=True)
+            save_transcript(job.words, transcript_path_for(job.output_path))
+
+    def render(job: BatchJob):
+        play_res = None if job.audio_only else video_play_res(job.input_path)
+        job.ass_path = render_captions(job.words, configs[job.preset or preset], ass_path_for(job.output_path),
+                                       play_res=play_res)
+        job.words = None
+
+    def burn(job: BatchJob):
+        if dry_run:
+            return
+        if job.audio_only:
+            log_warning(f"[{job.input_path.name}] Input is audio only, ASS file is ready.")
+            return
+        log_info(f"[{job.input_path.name}] Burning captions...")
+        burn_subtitles(job.input_path, job.ass_path, job.output_path)
+
+    log_info(f"Batch: {len(jobs)} files")
+    started = time.perf_counter()
+
+    q_extract = queue.Queue()
+    # A batched pass can only group the files already decoded and waiting
+    q_transcribe = queue.Queue(maxsize=max(queue_size, batched.files) if batched else queue_size)
+    q_render = queue.Queue(maxsize=queue_size)
+    q_burn = queue.Queue(maxsize=queue_size)
+    q_done = queue.Queue()
+
+    _run_stage("extract", extract, q_extract, q_transcribe)
+    # One transcription worker keeps a single warm model busy
+    if batched:
+        _run_group_stage("transcribe", transcribe_group, q_transcribe, q_render, max(1, batched.files))
+    else:
+        _run_stage("transcribe", transcribe_stage, q_transcribe, q_render)
+    _run_stage("render", render, q_render, q_burn)
+    _run_stage("burn", burn, q_burn, q_done, workers=max(1, burn_workers))
+
+    for job in jobs:
+        q_extract.put(job)
+    q_extract.put(None)
+
+    finished = 0
+    while True:
+        job = q_done.get()
+        if job is None:
+            break
+        finished += 1
+        _cleanup_temp_audio(job)
+        job.audio = job.words = None
+        if job.status != "failed":
+            job.status = "done"
+            log_success(f"[{finished}/{len(jobs)}] {job.input_path.name} done")
+        else:
+            log_error(f"[{finished}/{len(jobs)}] {job.input_path.name} failed")
+
+    _report(jobs, time.perf_counter() - started, report_path)
+    return jobs
+
+def _cleanup_temp_audio(job: BatchJob):
+    if job.temp_audio and job.temp_audio.exists():
+        try:
+            job.temp_audio.unlink()
+        except OSError:
+            pass
+    job.temp_audio = None
+
+def _report(jobs: List[BatchJob], elapsed: float, report_path: Optional[Path]):
+    done = [j for j in jobs if j.status == "done"]
+    failed = [j for j in jobs if j.status == "failed"]
+
+    log_info("Batch report:")
+    for job in jobs:
+        stages = ", ".join(f"{k} {v:.1f}s" for k, v in job.timings.items())
+        if job.status == "done":
+            log_success(f"  OK    {job.input_path.name} ({stages})")
+        else:
+            log_error(f"  FAIL  {job.input_path.name} at {job.failed_stage}: {job.error}")
+    log_info(f"{len(done)} succeeded, {len(failed)} failed in {elapsed:.1f}s")
+
+    if report_path:
+        report = {
+            "elapsed": round(elapsed, 3),
+            "succeeded": len(done),
+            "failed": len(failed),
+            "jobs": [j.to_dict() for j in jobs],
+        }
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        log_info(f"Batch report saved to {report_path}")
@@ -0,0 +1,112 @@
+"""Throughput mode: batched Whisper decoding over windows of one or more files.
+
+The regular path decodes one 30 s window after another with beam search.
+Here every input is cut at pauses into windows of at most 30 s, the windows
+of several queued files are laid end to end, and faster-whisper's
+BatchedInferencePipeline decodes them batch_size at a time, with clip
+timestamps that never cross a file boundary. Decoding a batch keeps the
+CPU's vector units far busier than a single window does, at the cost of
+memory and of the context carried between windows (every window is decoded
+on its own, like the long-form chunks).
+"""
+import bisect
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel
+from .asr import SAMPLE_RATE, Word
+from .longform import find_split_points
+from .models import get_model
+from .utils import ProgressCallback, log_info, log_success
+
+# The pipeline class, imported on first use like models.WhisperModel.
+# Benchmarks may replace it.
+BatchedInferencePipeline = None
+
+# Whisper's input length; longer clips are truncated by the pipeline
+MAX_WINDOW_SECONDS = 30.0
+# How far a window boundary may move to land in a pause
+WINDOW_SEARCH_SECONDS = 5.0
+# Windows shorter than this hold no speech worth a decoder slot
+MIN_WINDOW_SECONDS = 0.2
+
+class BatchedOptions(BaseModel):
+    batch_size: int = 8        # Windows decoded together
+    beam_size: int = 1         # Greedy by default; the regular path uses 5
+    cpu_threads: int = 0       # CTranslate2 threads, 0 for a share of the CPU budget
+    files: int = 4             # Queued files transcribed in one pass in batch mode
+
+def batched_pipeline_class():
+    """Returns faster_whisper.BatchedInferencePipeline, importing it on first use."""
+    global BatchedInferencePipeline
+    if BatchedInferencePipeline is None:
+        from faster_whisper import BatchedInferencePipeline as pipeline_class
+        BatchedInferencePipeline = pipeline_class
+    return BatchedInferencePipeline
+
+def speech_windows(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, int]]:
+    """Cuts audio at pauses into [start, end) sample ranges of at most 30 s."""
+    # Aim short of the limit so the pause search can only push a boundary up to it
+    chunk = MAX_WINDOW_SECONDS - WINDOW_SEARCH_SECONDS
+    bounds = [0] + find_split_points(audio, chunk, WINDOW_SEARCH_SECONDS, sample_rate) + [len(audio)]
+    min_samples = int(MIN_WINDOW_SECONDS * sample_rate)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b - a >= min_samples]
+
+def _detect_language(model, audio: np.ndarray) -> str:
+    language, _, _ = model.detect_language(audio[:int(MAX_WINDOW_SECONDS * SAMPLE_RATE)])
+    return language
+
+def transcribe_batched(audios: List[np.ndarray], model_size: str = "medium", device: str = "auto",
+                       compute_type: str = "default", language: Optional[str] = None,
+                       options: Optional[BatchedOptions] = None,
+                       progress: Optional[ProgressCallback] = None) -> List[List[Word]]:
+    """Transcribes several 16 kHz buffers in one batched pass; returns the words of each.
+
+    Without a language, it is detected per file and files are decoded in one
+    pass per language, since a batch shares its language token.
+    """
+    options = options or BatchedOptions()
+    model = get_model(model_size, device=device, compute_type=compute_type,
+                      cpu_threads=options.cpu_threads)
+    pipeline = batched_pipeline_class()(model)
+
+    groups: Dict[str, List[int]] = {}
+    for i, audio in enumerate(audios):
+        lang = language or (_detect_language(model, audio) if len(audio) else "en")
+        groups.setdefault(lang, []).append(i)
+
+    results: List[List[Word]] = [[] for _ in audios]
+    total = sum(len(a) for a in audios) / SAMPLE_RATE or 1.0
+    covered = 0.0
+    for lang, indices in groups.items():
+        offsets = []      # start of each file in the joined buffer, in seconds
+        clips = []
+        position = 0
+        for i in indices:
+            offsets.append(position / SAMPLE_RATE)
+            clips += [{"start": (position + a) / SAMPLE_RATE, "end": (position + b) / SAMPLE_RATE}
+                      for a, b in speech_windows(audios[i])]
+            position += len(audios[i])
+        if not clips:
+            continue
+        joined = np.concatenate([audios[i] for i in indices]) if len(indices) > 1 else audios[indices[0]]
+        log_info(f"Batched decoding: {len(indices)} file(s), {len(clips)} windows, "
+                 f"batch size {options.batch_size}, beam size {options.beam_size}, language {lang}")
+
+        segments, _ = pipeline.transcribe(joined, language=lang, word_timestamps=True,
+                                          clip_timestamps=clips, batch_size=options.batch_size,
+                                          beam_size=options.beam_size)
+        group_seconds = position / SAMPLE_RATE
+        for segment in segments:
+            # Clips never cross files, so the segment's midpoint tells which file it came
+            # from. Not its start: the pipeline rounds it to the millisecond, which can
+            # put a segment at the very start of a file just before that file's offset.
+            k = bisect.bisect_right(offsets, (segment.start + segment.end) / 2) - 1
+            offset = offsets[k]
+            results[indices[k]].extend(Word(w.word, w.start - offset, w.end - offset, w.probability)
+                                       for w in segment.words or [])
+            if progress:
+                progress("transcribe", min((covered + segment.end) / total, 1.0))
+        covered += group_seconds
+
+    log_success(f"Transcribed {sum(len(w) for w in results)} words from {len(audios)} file(s)")
+    return results
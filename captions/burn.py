@@ -0,0 +1,365 @@
+import bisect
+import hashlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from .media import probe_format, probe_video_frames, run_ffmpeg
+from .utils import ProgressCallback, log_info, log_success, log_warning
+
+# Encoder settings shared by the single-process and segmented burns, so the
+# parts of a segmented burn match what a normal burn would produce
+X264_ARGS = ["-c:v", "libx264", "-preset", "fast", "-crf", "23"]
+
+# Ranges shorter than this aren't worth an extra ffmpeg process
+MIN_RANGE_SECONDS = 2.0
+
+class BurnRange:
+    """A [start, end) slice of the source that starts on a keyframe."""
+
+    def __init__(self, index: int, start: float, end: Optional[float], frames: int):
+        self.index = index
+        self.start = start
+        # None for the last range, which runs to the end of the input
+        self.end = end
+        self.frames = frames
+
+    def __repr__(self):
+        return f"BurnRange({self.index}, {self.start:.3f}-{self.end}, {self.frames} frames)"
+
+def thread_budget(threads: Optional[int] = None) -> int:
+    """Total encoder threads to use; defaults to all CPU cores."""
+    return max(1, threads or os.cpu_count() or 1)
+
+def plan_ranges(frames: List[float], keyframes: List[float], segments: int,
+                duration: float) -> List[BurnRange]:
+    """Splits the video into up to `segments` ranges at the keyframes closest
+    to equal-length cut points.
+
+    Every range starts on a keyframe, so an input-seeked ffmpeg lands on its
+    first frame exactly, and its frame count is taken from the probed frame
+    times so the parts add up to the source frame for frame.
+    """
+    if not frames:
+        return []
+    duration = duration or frames[-1]
+    cuts = [0.0]
+    for i in range(1, segments):
+        target = duration * i / segments
+        nearest = min(keyframes, key=lambda k: abs(k - target), default=None)
+        if nearest is None:
+            break
+        if nearest - cuts[-1] >= MIN_RANGE_SECONDS and duration - nearest >= MIN_RANGE_SECONDS:
+            cuts.append(nearest)
+
+    ranges = []
+    for i, start in enumerate(cuts):
+        end = cuts[i + 1] if i + 1 < len(cuts) else None
+        # The first range also takes any frames timed before zero
+        lo = 0 if i == 0 else bisect.bisect_left(frames, start)
+        hi = len(frames) if end is None else bisect.bisect_left(frames, end)
+        count = hi - lo
+        ranges.append(BurnRange(i, start, end, count))
+    return ranges
+
+def _burn_range(input_path: Path, ass_path: Path, burn_range: BurnRange, part_path: Path,
+                threads: int, on_progress: Optional[Callable[[Dict[str, str]], None]] = None
+                ) -> Dict[str, float]:
+    # After input seeking, frames start at 0; shift them back to source time so
+    # the unmodified ASS file lines up, then rebase the part to start at 0
+    video_filter = (f"setpts=PTS+{burn_range.start:.6f}/TB,"
+                    f"ass={ass_path.name},setpts=PTS-STARTPTS")
+    cmd = ["ffmpeg", "-y", "-v", "error"]
+    if burn_range.start > 0:
+        cmd += ["-ss", f"{burn_range.start:.6f}"]
+    cmd += ["-i", str(input_path.resolve()), "-map", "0:v:0", "-vf", video_filter]
+    if burn_range.end is not None:
+        cmd += ["-frames:v", str(burn_range.frames)]
+    cmd += ["-an", *X264_ARGS, "-threads", str(threads), str(part_path.resolve())]
+    return run_ffmpeg(cmd, cwd=ass_path.parent, on_progress=on_progress)
+
+def _concat_parts(input_path: Path, ranges: List[BurnRange], parts: List[Path],
+                  work_dir: Path, output_path: Path):
+    list_path = work_dir / "parts.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for burn_range, part in zip(ranges, parts):
+            f.write(f"file '{part.name}'\n")
+            if burn_range.end is not None:
+                # Place the next part exactly at its source keyframe
+                f.write(f"duration {burn_range.end - burn_range.start:.6f}\n")
+
+    # Stream copy the burned video and the untouched audio of the source
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "concat", "-safe", "0", "-i", str(list_path.resolve()),
+        "-i", str(input_path.resolve()),
+        "-map", "0:v", "-map", "1:a:0?",
+        "-c", "copy",
+        str(output_path.resolve())
+    ]
+    subprocess.run(cmd, check=True)
+
+def plan_segmented_burn(input_path: Path, segments: int,
+                        range_seconds: Optional[float] = None) -> List[BurnRange]:
+    """Probes the input and returns its burn ranges, or [] when it can't be split.
+
+    With range_seconds the video is cut into at least duration / range_seconds ranges.
+    """
+    if segments < 2 and not range_seconds:
+        return []
+    if not shutil.which("ffprobe"):
+        log_warning("ffprobe not found, segmented burn disabled.")
+        return []
+    try:
+        frames, keyframes = probe_video_frames(input_path)
+        duration = probe_format(input_path)["duration"]
+    except (subprocess.CalledProcessError, ValueError) as e:
+        log_warning(f"Could not probe video frames, segmented burn disabled: {e}")
+        return []
+    if range_seconds:
+        segments = max(segments, math.ceil((duration or 0) / range_seconds))
+    ranges = plan_ranges(frames, keyframes, segments, duration)
+    return ranges if len(ranges) > 1 else []
+
+def parts_dir_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.stem + "_parts")
+
+def _part_path(work_dir: Path, burn_range: BurnRange) -> Path:
+    return work_dir / f"part{burn_range.index:04d}.mp4"
+
+def _burn_ranges(input_path: Path, ass_path: Path, ranges: List[BurnRange], work_dir: Path,
+                 threads: Optional[int] = None, progress: Optional[ProgressCallback] = None) -> int:
+    """Encodes ranges into their part files in parallel; returns the frames encoded."""
+    budget = thread_budget(threads)
+    concurrent = min(len(ranges), budget)
+    per_process = max(1, budget // concurrent)
+    log_info(f"Burning {len(ranges)} segments, {concurrent} at a time with {per_process} threads each...")
+
+    # Overall progress is the share of source frames encoded across all parts
+    total_frames = sum(r.frames for r in ranges) or 1
+    done_frames = {}
+    done_lock = threading.Lock()
+
+    def part_progress(index: int):
+        def update(values: Dict[str, str]):
+            with done_lock:
+                done_frames[index] = int(values.get("frame", 0) or 0)
+                fraction = min(sum(done_frames.values()) / total_frames, 1.0)
+            progress("burn", fraction)
+        return update if progress else None
+
+    with ThreadPoolExecutor(max_workers=concurrent) as pool:
+        futures = [pool.submit(_burn_range, input_path, ass_path, r, _part_path(work_dir, r),
+                               per_process, part_progress(r.index))
+                   for r in ranges]
+        try:
+            return sum(future.result().get("frame", 0) for future in futures)
+        except BaseException:
+            # Don't start the ranges still waiting for a slot
+            for future in futures:
+                future.cancel()
+            raise
+
+def _encode_stats(frames: int, started: float, ranges: int) -> Dict[str, float]:
+    elapsed = time.perf_counter() - started
+    return {"frame": frames, "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "segments": ranges}
+
+def segmented_burn(input_path: Path, ass_path: Path, output_path: Path,
+                   ranges: List[BurnRange], threads: Optional[int] = None,
+                   progress: Optional[ProgressCallback] = None) -> Dict[str, float]:
+    """Burns each range in its own ffmpeg process and concatenates the parts
+    losslessly, splitting `threads` between the concurrent encoders.
+
+    Returns the combined encode stats (frames and overall fps).
+    """
+    # Not parts_dir_for(): that folder holds the parts an incremental burn keeps
+    work_dir = Path(tempfile.mkdtemp(prefix=f".{output_path.stem}_parts-", dir=output_path.parent))
+    started = time.perf_counter()
+    try:
+        frames = _burn_ranges(input_path, ass_path, ranges, work_dir, threads, progress)
+        _concat_parts(input_path, ranges, [_part_path(work_dir, r) for r in ranges], work_dir, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    log_success(f"Video created: {output_path}")
+    return _encode_stats(frames, started, len(ranges))
+
+# Incremental re-render. The parts of the last burn are kept next to the output
+# with a manifest of what went into each one; a re-run re-encodes only the
+# ranges whose captions changed and stream-copies the rest.
+
+# Target range length when splitting for incremental re-renders. Shorter ranges
+# mean less to re-encode per edit but more parts to keep around.
+INCREMENTAL_RANGE_SECONDS = 30.0
+MANIFEST_VERSION = 1
+
+def parse_ass_time(value: str) -> float:
+    """Parses an ASS H:MM:SS.cc timestamp into seconds."""
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def read_ass_events(ass_path: Path) -> Tuple[str, List[Tuple[float, float, str]]]:
+    """Returns (hash of everything before [Events], [(start, end, line)]) for an ASS file.
+
+    The header holds the styles and play resolution, so it stands in for the
+    layout config; the event lines carry the words, timings and positions.
+    """
+    header = hashlib.sha1()
+    events = []
+    in_events = False
+    with open(ass_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not in_events:
+                header.update(line.encode("utf-8"))
+                in_events = line.strip() == "[Events]"
+                continue
+            if line.startswith("Dialogue:"):
+                _, start, end, _ = line.split(",", 3)
+                events.append((parse_ass_time(start), parse_ass_time(end), line.rstrip("\n")))
+    events.sort(key=lambda e: e[0])
+    return header.hexdigest(), events
+
+def range_hashes(ranges: List[BurnRange], header_hash: str,
+                 events: List[Tuple[float, float, str]]) -> List[str]:
+    """Hashes the header and the events visible in each range.
+
+    An event spanning a cut counts for both ranges. Events start up to a
+    centisecond before their word (ASS rounds times down), so ranges are
+    widened by that much.
+    """
+    hashes = [hashlib.sha1(header_hash.encode("ascii")) for _ in ranges]
+    starts = [r.start for r in ranges]
+    for start, end, line in events:
+        i = max(bisect.bisect_right(starts, start - 0.01) - 1, 0)
+        while i < len(ranges) and ranges[i].start < end + 0.01:
+            range_end = ranges[i].end
+            if range_end is None or start < range_end + 0.01:
+                hashes[i].update(line.encode("utf-8"))
+            i += 1
+    return [h.hexdigest() for h in hashes]
+
+def source_fingerprint(input_path: Path) -> dict:
+    stat = input_path.stat()
+    return {"path": str(input_path.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _load_manifest(path: Path) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+def _write_manifest(path: Path, source: dict, ranges: List[BurnRange], hashes: Dict[int, str]):
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "source": source,
+        "encoder": X264_ARGS,
+        "ranges": [{"index": r.index, "start": r.start, "end": r.end, "frames": r.frames,
+                    "hash": hashes.get(r.index)} for r in ranges],
+    }
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+def incremental_burn(input_path: Path, ass_path: Path, output_path: Path,
+                     segments: int = 1, threads: Optional[int] = None,
+                     progress: Optional[ProgressCallback] = None) -> Optional[Dict[str, float]]:
+    """Burns like segmented_burn but keeps the parts, and on later runs re-encodes
+    only the ranges whose ASS events changed.
+
+    The ranges of the first run are reused as long as the source file and the
+    encoder settings are unchanged, so every part still starts on the same
+    keyframe and the splice stays frame accurate. Returns None when the video
+    can't be split (no ffprobe), in which case the caller burns normally.
+    """
+    work_dir = parts_dir_for(output_path)
+    manifest_path = work_dir / "manifest.json"
+    source = source_fingerprint(input_path)
+    manifest = _load_manifest(manifest_path)
+
+    if manifest and manifest["source"] == source and manifest["encoder"] == X264_ARGS:
+        ranges = [BurnRange(r["index"], r["start"], r["end"], r["frames"]) for r in manifest["ranges"]]
+        previous = {r["index"]: r["hash"] for r in manifest["ranges"]}
+    else:
+        ranges = plan_segmented_burn(input_path, segments, INCREMENTAL_RANGE_SECONDS)
+        if not ranges:
+            return None
+        previous = {}
+        # Parts of another source or encoder setup can't be spliced in
+        shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    header_hash, events = read_ass_events(ass_path)
+    hashes = dict(zip((r.index for r in ranges), range_hashes(ranges, header_hash, events)))
+    dirty = [r for r in ranges
+             if previous.get(r.index) != hashes[r.index] or not _part_path(work_dir, r).exists()]
+    log_info(f"Incremental burn: {len(dirty)} of {len(ranges)} ranges changed.")
+
+    started = time.perf_counter()
+    frames = 0
+    if dirty:
+        # Forget the hashes of the parts about to be overwritten, in case we are interrupted
+        kept = {i: h for i, h in previous.items() if i not in {r.index for r in dirty}}
+        _write_manifest(manifest_path, source, ranges, kept)
+        frames = _burn_ranges(input_path, ass_path, dirty, work_dir, threads, progress)
+    _concat_parts(input_path, ranges, [_part_path(work_dir, r) for r in ranges], work_dir, output_path)
+    _write_manifest(manifest_path, source, ranges, hashes)
+
+    log_success(f"Video created: {output_path}")
+    stats = _encode_stats(frames, started, len(ranges))
+    stats["reused_segments"] = len(ranges) - len(dirty)
+    return stats
+
+def burn_command(input_path: Path, ass_path: Path, output_path: Path,
+                 threads: Optional[int] = None) -> List[str]:
+    """The single-process burn: ffmpeg -i input.mp4 -vf ass=file.ass -c:a copy output.mp4"""
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", str(input_path.resolve()),
+        "-vf", f"ass={ass_path.name}",
+        *X264_ARGS,
+        "-c:a", "copy",
+    ]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd.append(str(output_path.resolve()))
+    return cmd
+
+# Characters with a meaning in ffmpeg filtergraphs; the ASS paths are put in unquoted
+FILTER_SPECIAL = set(":,;[]'\\=")
+
+def fanout_burn_command(input_path: Path, targets: List[Tuple[Path, Path]], cwd: Path,
+                        threads: Optional[int] = None) -> List[str]:
+    """One ffmpeg run burning several ASS files into their own outputs.
+
+    targets are (ass_path, output_path) pairs. The source is decoded once and
+    split in the filter graph into one ass filter and encoder per target;
+    the audio is copied into every output. ASS paths are given relative to
+    cwd, where ffmpeg must be run. Raises ValueError when a path can't be
+    written into the filter graph.
+    """
+    labels = [f"v{i}" for i in range(len(targets))]
+    chains = [f"[0:v]split={len(targets)}" + "".join(f"[{label}]" for label in labels)]
+    for i, (ass_path, _) in enumerate(targets):
+        relative = Path(os.path.relpath(ass_path.resolve(), cwd.resolve())).as_posix()
+        if FILTER_SPECIAL & set(relative):
+            raise ValueError(f"Can't reference {ass_path} in a filter graph")
+        chains.append(f"[{labels[i]}]ass={relative}[out{i}]")
+
+    # Each encoder gets its share of the thread budget
+    per_encoder = max(1, thread_budget(threads) // len(targets))
+    cmd = ["ffmpeg", "-y", "-i", str(input_path.resolve()), "-filter_complex", ";".join(chains)]
+    for i, (_, output_path) in enumerate(targets):
+        cmd += ["-map", f"[out{i}]", "-map", "0:a:0?", *X264_ARGS, "-c:a", "copy",
+                "-threads", str(per_encoder), str(output_path.resolve())]
+    return cmd
+
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+from .asr import Word
+from .timeline import WordTimeline
+from .utils import log_info, log_warning
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# The regular path: faster-whisper's default beam search over consecutive windows
+SEQUENTIAL_DECODING = "sequential|beam5"
+
+def default_cache_dir() -> Path:
+    """Returns the transcript cache directory (CAPTIONS_CACHE_DIR overrides it)."""
+    override = os.environ.get("CAPTIONS_CACHE_DIR")
+    if override:
+        return Path(override)
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        return Path(os.environ["LOCALAPPDATA"]) / "autocaptions" / "transcripts"
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg) if xdg else Path.home() / ".cache"
+    return base / "autocaptions" / "transcripts"
+
+def hash_audio_file(audio_path: Path) -> str:
+    """Returns the sha256 of an audio file's contents."""
+    digest = hashlib.sha256()
+    with open(audio_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_audio(audio: Union[Path, np.ndarray]) -> str:
+    """Returns the sha256 of a decoded audio buffer, or of a file's contents."""
+    if isinstance(audio, np.ndarray):
+        return hashlib.sha256(memoryview(np.ascontiguousarray(audio)).cast("B")).hexdigest()
+    return hash_audio_file(audio)
+
+class TranscriptCache:
+    """Content-addressed on-disk cache of transcribed word lists.
+
+    Entries are keyed by the decoded audio plus the settings that change the
+    ASR output. The directory is kept under max_bytes by deleting the least
+    recently used entries; hits refresh an entry's mtime.
+    """
+
+    # Cache folders already checked for legacy entries in this process
+    _checked_dirs = set()
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if self.cache_dir not in self._checked_dirs:
+            self._checked_dirs.add(self.cache_dir)
+            self._drop_legacy_entries()
+
+    def _drop_legacy_entries(self):
+        # JSON entries from before the binary .words format. Their keys lack
+        # the decoding, so they can never be hit again; they would only sit
+        # there uncounted by the size limit. Only names that are a cache key
+        # are touched, the directory may be shared with other files.
+        legacy = [p for p in self.cache_dir.glob("*.json") if re.fullmatch(r"[0-9a-f]{64}", p.stem)]
+        for path in legacy:
+            path.unlink(missing_ok=True)
+        if legacy:
+            log_info(f"Removed {len(legacy)} transcript cache entries in the old JSON format.")
+
+    def make_key(self, audio_digest: str, model_size: str, compute_type: str = "default",
+                 language: Optional[str] = None, decoding: str = SEQUENTIAL_DECODING) -> str:
+        """Combines the audio hash and ASR settings into a cache key.
+
+        decoding names the decode mode and beam size, e.g. "batched|beam1".
+        """
+        settings = f"{audio_digest}|{model_size}|{compute_type}|{language or 'auto'}|{decoding}"
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.words"
+
+    def _entries(self) -> List[Path]:
+        return list(self.cache_dir.glob("*.words"))
+
+    def get(self, key: str) -> Optional[WordTimeline]:
+        """Returns the cached word timeline for a key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            # Not memory-mapped: Windows can't replace or evict a mapped file
+            words = WordTimeline.load(path, mmap=False)
+        except FileNotFoundError:
+            self._bump("misses")
+            return None
+        except (OSError, ValueError) as e:
+            log_warning(f"Ignoring corrupt cache entry {path.name}: {e}")
+            self._bump("misses")
+            return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self._bump("hits")
+        return words
+
+    def put(self, key: str, words: List[Word]):
+        """Stores words under a key and enforces the size limit."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        WordTimeline.from_words(words).save(tmp_path)
+        # Atomic so concurrent readers never see a half-written entry
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> int:
+        """Deletes least recently used entries until the cache fits. Returns the count removed."""
+        entries = []
+        total = 0
+        for path in self._entries():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            self._bump("evictions", removed)
+        return removed
+
+    def _stats_path(self) -> Path:
+        return self.cache_dir / "stats.json"
+
+    def stats(self) -> dict:
+        """Returns hit/miss/eviction counters plus the current size of the cache."""
+        data = {"hits": 0, "misses": 0, "evictions": 0}
+        try:
+            with open(self._stats_path(), "r", encoding="utf-8") as f:
+                data.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        entries = self._entries()
+        data["entries"] = len(entries)
+        data["bytes"] = sum(p.stat().st_size for p in entries if p.exists())
+        lookups = data["hits"] + data["misses"]
+        data["hit_rate"] = data["hits"] / lookups if lookups else 0.0
+        return data
+
+    def _bump(self, counter: str, amount: int = 1):
+        with self._lock:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                data = {}
+                try:
+                    with open(self._stats_path(), "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    pass
+                data[counter] = data.get(counter, 0) + amount
+                tmp_path = self._stats_path().with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self._stats_path())
+            except OSError:
+                # Stats are best effort, never fail a job because of them
+                pass
+
+def log_cache_stats(cache: TranscriptCache):
+    stats = cache.stats()
+    log_info(f"Transcript cache: {stats['hits']} hits, {stats['misses']} misses "
+             f"({stats['hit_rate']:.0%}), {stats['entries']} entries, "
+             f"{stats['bytes'] / (1024 * 1024):.1f} MB")
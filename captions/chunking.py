@@ -1,61 +1,298 @@
-from typing import List
+from typing import List, Optional, Sequence, Tuple, Union
 from .asr import Word
 from .presets import ChunkingConfig
+from .timeline import WordTimeline
 
 class CaptionSegment:
-    def __init__(self, words: List[Word]):
-        self.words = words
-        self.start = words[0].start if words else 0.0
-        self.end = words[-1].end if words else 0.0
-        self.text = " ".join([w.word for w in words])
-
-    def update_times(self):
-        if self.words:
-            self.start = self.words[0].start
-            self.end = self.words[-1].end
-            self.text = " ".join([w.word for w in self.words])
+    """A caption on screen: a range of words from a timeline, split into lines.
+
+    Holds indices into the timeline instead of Word objects; .words and
+    .lines build Words on demand for callers that want them.
+    """
+
+    def __init__(self, timeline: WordTimeline, first: int, last: int,
+                 line_breaks: Sequence[int] = ()):
+        self.timeline = timeline
+        # Words [first, last) of the timeline
+        self.first = first
+        self.last = last
+        # Indices where a new line starts, strictly inside (first, last)
+        self.line_breaks = list(line_breaks)
+        self.start = float(timeline.starts[first]) if last > first else 0.0
+        self.end = float(timeline.ends[last - 1]) if last > first else 0.0
+
+    @classmethod
+    def from_words(cls, words: List[Word]) -> "CaptionSegment":
+        return cls(WordTimeline.from_words(words), 0, len(words))
+
+    def line_ranges(self) -> List[Tuple[int, int]]:
+        """Returns the [start, end) timeline indices of every line."""
+        bounds = [self.first] + self.line_breaks + [self.last]
+        return list(zip(bounds, bounds[1:]))
+
+    @property
+    def words(self) -> List[Word]:
+        return [self.timeline[i] for i in range(self.first, self.last)]
+
+    @property
+    def lines(self) -> List[List[Word]]:
+        return [[self.timeline[i] for i in range(a, b)] for a, b in self.line_ranges()]
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.timeline.texts(self.first, self.last))
 
 def is_punctuation(char: str) -> bool:
     return char in ".?!,;:"
 
-def chunk_words(words: List[Word], config: ChunkingConfig) -> List[CaptionSegment]:
-    """Groups words into caption segments based on constraints."""
-    segments = []
-    current_words = []
-    
-    for i, word in enumerate(words):
-        current_words.append(word)
-        
-        # Check constraints
-        current_text = " ".join([w.word for w in current_words])
-        char_count = len(current_text)
-        word_count = len(current_words)
-        
-        # Look ahead for punctuation or gap
-        is_last_word = (i == len(words) - 1)
-        has_punctuation = is_punctuation(word.word[-1]) if word.word else False
-        
-        # Time gap check
-        next_word_start = words[i+1].start if not is_last_word else word.end
-        time_gap = next_word_start - word.end
-        
-        should_split = False
-        
+# Line-break scoring weights. Costs are in units of (chars / max_chars)^2, so a
+# bonus of 0.3 is worth a line imbalance of about half the line width.
+PUNCTUATION_BONUS = 0.3
+PAUSE_BONUS = 0.3
+
+def break_lines(lengths: Sequence[int], punctuation: Sequence[bool], gaps: Sequence[float],
+                max_chars: int, max_lines: int) -> List[int]:
+    """Chooses line breaks for one segment.
+
+    lengths[k] is the char count of word k, punctuation[k] whether it ends with
+    punctuation and gaps[k] the pause before word k + 1. Returns the indices
+    (relative to the segment) where new lines start.
+
+    Uses the fewest lines that fit max_chars, then picks the break points with a
+    DP that minimizes line-length imbalance and rewards breaking after
+    punctuation or at a pause. A single word longer than max_chars gets its
+    own line.
+    """
+    n = len(lengths)
+    if n <= 1 or max_lines <= 1:
+        return []
+
+    # Greedy fill gives the minimum number of lines
+    line_count = 1
+    current = lengths[0]
+    for length in lengths[1:]:
+        if current + 1 + length <= max_chars:
+            current += 1 + length
+        else:
+            line_count += 1
+            current = length
+    if line_count == 1:
+        return []
+    line_count = min(line_count, max_lines, n)
+
+    # prefix[i] = chars of words[:i] including one space after each word
+    prefix = [0] * (n + 1)
+    for i, length in enumerate(lengths):
+        prefix[i + 1] = prefix[i] + length + 1
+
+    def line_chars(i: int, j: int) -> int:
+        return prefix[j] - prefix[i] - 1
+
+    total = line_chars(0, n)
+    target = total / line_count
+    scale = float(max_chars * max_chars)
+
+    def break_bonus(j: int) -> float:
+        # Bonus for breaking between word j - 1 and word j
+        bonus = PUNCTUATION_BONUS if punctuation[j - 1] else 0.0
+        gap = gaps[j - 1]
+        if gap > 0:
+            bonus += PAUSE_BONUS * min(gap / 0.5, 1.0)
+        return bonus
+
+    inf = float("inf")
+    # cost[l][j]: best score for words[:j] laid out on l lines
+    cost = [[inf] * (n + 1) for _ in range(line_count + 1)]
+    back = [[0] * (n + 1) for _ in range(line_count + 1)]
+    cost[0][0] = 0.0
+    for lines in range(1, line_count + 1):
+        for j in range(lines, n + 1):
+            best = inf
+            best_i = 0
+            # Walk the line start backwards until the line overflows
+            for i in range(j - 1, lines - 2, -1):
+                if cost[lines - 1][i] == inf:
+                    continue
+                chars = line_chars(i, j)
+                if chars > max_chars and j - i > 1:
+                    break
+                score = cost[lines - 1][i] + (chars - target) ** 2 / scale
+                if j < n:
+                    score -= break_bonus(j)
+                if score < best:
+                    best = score
+                    best_i = i
+            cost[lines][j] = best
+            back[lines][j] = best_i
+
+    if cost[line_count][n] == inf:
+        return []
+
+    breaks = []
+    j = n
+    for lines in range(line_count, 1, -1):
+        j = back[lines][j]
+        breaks.append(j)
+    breaks.reverse()
+    return breaks
+
+class SegmentFill:
+    """Running line fill of the segment being built, and the rules for where a
+    segment ends. Shared by chunk_words and StreamingChunker so both split
+    the same way.
+    """
+
+    __slots__ = ("max_chars", "max_words", "max_lines", "gap_threshold",
+                 "char_count", "line_length", "line_count", "word_count")
+
+    def __init__(self, config: ChunkingConfig):
+        self.max_chars = config.max_chars
+        self.max_words = config.max_words
+        self.max_lines = max(1, config.max_lines)
+        self.gap_threshold = config.gap_threshold
+        self.reset()
+
+    def reset(self):
+        self.char_count = 0      # chars of all words joined by spaces
+        self.line_length = 0     # chars on the last greedily filled line
+        self.line_count = 0
+        self.word_count = 0
+
+    def overflows(self, length: int) -> bool:
+        """Would a word of this length need a line beyond max_lines?"""
+        return (self.word_count > 0 and self.line_length + 1 + length > self.max_chars
+                and self.line_count + 1 > self.max_lines)
+
+    def add(self, length: int):
+        if self.word_count == 0:
+            self.char_count = length
+            self.line_length = length
+            self.line_count = 1
+        else:
+            self.char_count += 1 + length
+            if self.line_length + 1 + length <= self.max_chars:
+                self.line_length += 1 + length
+            else:
+                self.line_length = length
+                self.line_count += 1
+        self.word_count += 1
+
+    def should_split(self, punctuation: bool, gap: float) -> bool:
+        """Should the segment end after the word just added? gap is the pause after it."""
         # Hard limits
-        if char_count >= config.max_chars:
-            should_split = True
-        elif word_count >= config.max_words:
-            should_split = True
-        elif time_gap > config.gap_threshold:
-            should_split = True
-        elif has_punctuation:
+        if self.line_count >= self.max_lines and self.line_length >= self.max_chars:
+            return True
+        if self.word_count >= self.max_words:
+            return True
+        if gap > self.gap_threshold:
+            return True
+        if punctuation:
             # Prefer splitting after punctuation if we have enough content
             # But don't split if it's just one short word unless it's a long pause
-            if word_count > 1 or char_count > 5:
-                should_split = True
-        
-        if should_split or is_last_word:
-            segments.append(CaptionSegment(current_words))
-            current_words = []
-            
+            return self.word_count > 1 or self.char_count > 5
+        return False
+
+def chunk_words(words: Union[List[Word], WordTimeline], config: ChunkingConfig) -> List[CaptionSegment]:
+    """Groups words into caption segments based on constraints.
+
+    max_chars limits a single line and a segment may use up to max_lines
+    lines. Runs in linear time: line fill and character counts are tracked
+    incrementally, and the line-breaking DP only ever sees one segment.
+    Accepts a list of Words or a WordTimeline; the columns are read directly.
+    """
+    timeline = WordTimeline.from_words(words)
+    n = len(timeline)
+    if n == 0:
+        return []
+
+    lengths = timeline.char_lengths().tolist()
+    punctuation = timeline.ends_with_punctuation().tolist()
+    starts = timeline.starts.tolist()
+    ends = timeline.ends.tolist()
+    # Pause after each word; the last word has none
+    gaps = [starts[i + 1] - ends[i] for i in range(n - 1)] + [0.0]
+
+    segments = []
+    max_lines = max(1, config.max_lines)
+    fill = SegmentFill(config)
+    first = 0
+
+    def close_segment(last: int):
+        breaks = break_lines(lengths[first:last], punctuation[first:last], gaps[first:last],
+                             config.max_chars, max_lines)
+        segments.append(CaptionSegment(timeline, first, last, [first + b for b in breaks]))
+
+    for i in range(n):
+        length = lengths[i]
+        if fill.overflows(length):
+            # Start a new segment before this word
+            close_segment(i)
+            first = i
+            fill.reset()
+        fill.add(length)
+        if fill.should_split(punctuation[i], gaps[i]) or i == n - 1:
+            close_segment(i + 1)
+            first = i + 1
+            fill.reset()
+
     return segments
+
+class StreamingChunker:
+    """chunk_words for words that arrive one at a time.
+
+    push() returns the segments closed by the new word. Whether a segment
+    ends after a word depends on the pause that follows it, so every word is
+    held back until the next one arrives (or flush() is called at the end of
+    the stream). The segments match what chunk_words makes of the same words.
+    """
+
+    def __init__(self, config: ChunkingConfig):
+        self.config = config
+        self.fill = SegmentFill(config)
+        self.pending: List[Word] = []   # words of the open segment
+        self.held: Optional[Word] = None
+
+    def push(self, word: Word) -> List[CaptionSegment]:
+        closed = []
+        if self.held is not None:
+            closed = self._place(self.held, word.start - self.held.end)
+        self.held = word
+        return closed
+
+    def flush(self) -> List[CaptionSegment]:
+        """Closes the open segment at the end of the stream."""
+        closed = []
+        if self.held is not None:
+            closed = self._place(self.held, 0.0)
+            self.held = None
+        if self.pending:
+            closed.append(self._close())
+        return closed
+
+    @property
+    def open_since(self) -> Optional[float]:
+        """Start time of the oldest word not yet in a closed segment."""
+        if self.pending:
+            return self.pending[0].start
+        return self.held.start if self.held is not None else None
+
+    def _place(self, word: Word, gap: float) -> List[CaptionSegment]:
+        closed = []
+        length = len(word.word)
+        if self.fill.overflows(length):
+            closed.append(self._close())
+        self.fill.add(length)
+        self.pending.append(word)
+        if self.fill.should_split(bool(word.word) and is_punctuation(word.word[-1]), gap):
+            closed.append(self._close())
+        return closed
+
+    def _close(self) -> CaptionSegment:
+        words = self.pending
+        gaps = [b.start - a.end for a, b in zip(words, words[1:])] + [0.0]
+        breaks = break_lines([len(w.word) for w in words],
+                             [bool(w.word) and is_punctuation(w.word[-1]) for w in words],
+                             gaps, self.config.max_chars, max(1, self.config.max_lines))
+        self.pending = []
+        self.fill.reset()
+        return CaptionSegment(WordTimeline.from_words(words), 0, len(words), breaks)
@@ -0,0 +1,166 @@
+"""Splits the machine's CPU cores between the transcriptions and encodes that
+run at the same time.
+
+Every CPU-heavy stage (a Whisper transcription, an ffmpeg burn or preview)
+claims a share for as long as it runs and gets an explicit thread count:
+the cores divided by the number of active claims, in this process and in
+every other captions process of the same user on this machine. Other
+processes are counted through lock files in a temp folder, each held with
+flock by its claim, so a process that dies releases its claim with it.
+
+Counts are handed out when a stage starts; a running ffmpeg keeps its
+count and the next stage to start gets the share at that time, so the split
+follows jobs as they start and finish. Whisper models are the exception:
+the model registry keys models by thread count, so a count that followed
+the other claims would load another copy of the model every time it
+moved. A model is loaded with a fixed count instead, the budget divided by
+the number of jobs this process is configured to run at once, and a
+transcription claims exactly that. Counts are rounded down to 1, 2, 3, 4,
+6, 8, 12, 16, 24, ...
+"""
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from .utils import log_info
+
+try:
+    import fcntl
+except ImportError:  # Windows: only this process's claims are counted
+    fcntl = None
+
+def available_cpus() -> int:
+    """Cores this process may run on (the affinity mask where there is one)."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+def quantize_threads(threads: int) -> int:
+    """Rounds down to 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, ..."""
+    if threads <= 4:
+        return max(1, threads)
+    step = 1 << (threads.bit_length() - 2)
+    return threads - threads % step
+
+def _default_shared_dir() -> Optional[Path]:
+    if fcntl is None:
+        return None
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(tempfile.gettempdir()) / f"captions-cpu-{uid}"
+
+class ThreadBudget:
+    """Fair share of `total` threads between the active claims."""
+
+    def __init__(self, total: Optional[int] = None, shared_dir: Optional[Path] = None, jobs: int = 1):
+        self.total = total or available_cpus()
+        self.shared_dir = shared_dir
+        self.jobs = jobs
+        self._local = 0
+        self._lock = threading.Lock()
+
+    def active(self) -> int:
+        """Claims held right now, in this process and (with a shared_dir) in others."""
+        with self._lock:
+            local = self._local
+        if self.shared_dir is None or not self.shared_dir.is_dir():
+            return local
+        held = 0
+        for path in self.shared_dir.glob("*.claim"):
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                held += 1
+            else:
+                # Nobody holds it: left behind by a process that died
+                path.unlink(missing_ok=True)
+            finally:
+                os.close(fd)
+        return max(held, local)
+
+    def share(self, active: Optional[int] = None) -> int:
+        """Threads for one claim when `active` claims (default: the current ones) run."""
+        active = active or self.active()
+        return quantize_threads(max(1, self.total // max(1, active)))
+
+    def model_threads(self) -> int:
+        """Threads for a Whisper model: the budget split between the configured jobs."""
+        return quantize_threads(max(1, self.total // max(1, self.jobs)))
+
+    @contextmanager
+    def claim(self, stage: str, requested: Optional[int] = None) -> Iterator[int]:
+        """Holds a share while the block runs and yields its thread count.
+
+        An explicit `requested` count is used as is but still counts as a
+        claim, so the stages starting next leave room for it.
+        """
+        holder = self._register()
+        try:
+            threads = requested or self.share()
+            log_info(f"CPU budget: {stage} gets {threads} of {self.total} threads "
+                     f"({self.active()} active)")
+            yield threads
+        finally:
+            self._unregister(holder)
+
+    def _register(self) -> Optional[Tuple[int, Path]]:
+        with self._lock:
+            self._local += 1
+        if self.shared_dir is None:
+            return None
+        try:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+            name = f"{os.getpid()}-{uuid.uuid4().hex}"
+            # Lock under a temporary name and rename, so a counter never sees
+            # (and removes) a claim file before its lock is held
+            tmp = self.shared_dir / f"{name}.tmp"
+            path = self.shared_dir / f"{name}.claim"
+            fd = os.open(tmp, os.O_CREAT | os.O_RDWR, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.rename(tmp, path)
+            return fd, path
+        except OSError:
+            # Without the shared folder only this process's claims are counted
+            return None
+
+    def _unregister(self, holder: Optional[Tuple[int, Path]]):
+        with self._lock:
+            self._local -= 1
+        if holder is None:
+            return
+        fd, path = holder
+        path.unlink(missing_ok=True)
+        os.close(fd)
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+_budget = ThreadBudget(total=_env_int("CAPTIONS_CPU_THREADS"), shared_dir=_default_shared_dir())
+
+def get_cpu_budget() -> ThreadBudget:
+    """Returns the process-wide thread budget."""
+    return _budget
+
+def claim_threads(stage: str, requested: Optional[int] = None):
+    """get_cpu_budget().claim(stage, requested)"""
+    return _budget.claim(stage, requested)
+
+def configure_cpu_budget(total: Optional[int] = None, jobs: Optional[int] = None):
+    """Changes the number of threads the budget splits up, or the number of
+    jobs this process runs at once (which sets the Whisper model threads)."""
+    if total:
+        _budget.total = total
+    if jobs:
+        _budget.jobs = jobs
@@ -0,0 +1,252 @@
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from .utils import log_warning
+
+if TYPE_CHECKING:
+    from fontTools.ttLib import TTFont
+
+FONT_EXTENSIONS = {".ttf", ".otf", ".ttc", ".otc"}
+
+# Families tried (in order) when the requested font isn't installed.
+# This mirrors what fontconfig/libass usually substitute.
+FALLBACK_FAMILIES = ["Arial", "Liberation Sans", "DejaVu Sans", "Helvetica", "Noto Sans"]
+
+def font_dirs() -> List[Path]:
+    """Returns the directories searched for font files on this platform."""
+    dirs = []
+    extra = os.environ.get("CAPTIONS_FONT_DIRS")
+    if extra:
+        dirs.extend(Path(p) for p in extra.split(os.pathsep) if p)
+
+    home = Path.home()
+    if os.name == "nt":
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        dirs.append(Path(windir) / "Fonts")
+        local = os.environ.get("LOCALAPPDATA")
+        if local:
+            dirs.append(Path(local) / "Microsoft" / "Windows" / "Fonts")
+    elif sys.platform == "darwin":
+        dirs.extend([Path("/System/Library/Fonts"), Path("/Library/Fonts"), home / "Library" / "Fonts"])
+    else:
+        dirs.extend([Path("/usr/share/fonts"), Path("/usr/local/share/fonts"),
+                     home / ".fonts", home / ".local" / "share" / "fonts"])
+    return [d for d in dirs if d.is_dir()]
+
+def _face_info(font: "TTFont") -> Tuple[str, str, int]:
+    """Returns (family, subfamily, weight) of a face, preferring the typographic names."""
+    name_table = font["name"]
+    family = name_table.getDebugName(16) or name_table.getDebugName(1) or ""
+    subfamily = name_table.getDebugName(17) or name_table.getDebugName(2) or ""
+    weight = font["OS/2"].usWeightClass if "OS/2" in font else 400
+    return family, subfamily, weight
+
+@lru_cache(maxsize=1)
+def font_index() -> Dict[str, List[Tuple[Path, int, str, int]]]:
+    """Maps lowercase family names to their (path, face index, subfamily, weight) entries.
+
+    Built once per process by reading only the name and OS/2 tables of every font file.
+    """
+    # fontTools is only needed once text is measured
+    from fontTools.ttLib import TTCollection, TTFont
+
+    index: Dict[str, List[Tuple[Path, int, str, int]]] = {}
+    for directory in font_dirs():
+        for path in directory.rglob("*"):
+            if path.suffix.lower() not in FONT_EXTENSIONS:
+                continue
+            try:
+                if path.suffix.lower() in (".ttc", ".otc"):
+                    faces = TTCollection(str(path), lazy=True).fonts
+                else:
+                    faces = [TTFont(str(path), lazy=True)]
+                for i, face in enumerate(faces):
+                    family, subfamily, weight = _face_info(face)
+                    if family:
+                        index.setdefault(family.lower(), []).append((path, i, subfamily.lower(), weight))
+            except Exception:
+                # Broken or unsupported font file, skip it
+                continue
+    return index
+
+def find_font(family: str, bold: bool = True) -> Optional[Tuple[Path, int]]:
+    """Finds the font file for a family name (or accepts a direct path to a font file)."""
+    path = Path(family)
+    if path.suffix.lower() in FONT_EXTENSIONS and path.exists():
+        return path, 0
+
+    faces = font_index().get(family.lower())
+    if not faces:
+        return None
+
+    target_weight = 700 if bold else 400
+
+    def score(face):
+        subfamily, weight = face[2], face[3]
+        is_italic = "italic" in subfamily or "oblique" in subfamily
+        # Prefer upright faces closest to the requested weight
+        return (is_italic, abs(weight - target_weight))
+
+    best = min(faces, key=score)
+    return best[0], best[1]
+
+class FontMetrics:
+    """Advance widths and pair kerning read directly from a font file.
+
+    Widths are scaled the way libass does it: the font size maps to the
+    Windows ascent + descent of the face, not to the em square.
+    """
+
+    def __init__(self, path: Path, font_number: int = 0):
+        from fontTools.ttLib import TTFont
+
+        self.path = path
+        font = TTFont(str(path), fontNumber=font_number, lazy=True)
+        self._cmap = font.getBestCmap() or {}
+        self._hmtx = font["hmtx"].metrics
+        self.units_per_em = font["head"].unitsPerEm
+
+        height = 0
+        if "OS/2" in font:
+            os2 = font["OS/2"]
+            height = os2.usWinAscent + os2.usWinDescent
+        if not height and "hhea" in font:
+            height = font["hhea"].ascent - font["hhea"].descent
+        self.height_units = height or self.units_per_em
+
+        self._kern_pairs: Dict[Tuple[str, str], int] = {}
+        self._class_kerning = []
+        self._load_kern_table(font)
+        self._load_gpos_kerning(font)
+
+        self._glyph_cache: Dict[str, Tuple[Optional[str], int]] = {}
+        self._pair_cache: Dict[Tuple[str, str], int] = {}
+        self._word_cache: Dict[Tuple[str, int], int] = {}
+
+    def _load_kern_table(self, font: "TTFont"):
+        if "kern" not in font:
+            return
+        for table in getattr(font["kern"], "kernTables", []):
+            pairs = getattr(table, "kernTable", None)
+            if pairs and getattr(table, "coverage", 1) & 1:
+                self._kern_pairs.update(pairs)
+
+    def _load_gpos_kerning(self, font: "TTFont"):
+        if "GPOS" not in font:
+            return
+        gpos = font["GPOS"].table
+        if not gpos.FeatureList or not gpos.LookupList:
+            return
+        lookup_indices = set()
+        for record in gpos.FeatureList.FeatureRecord:
+            if record.FeatureTag == "kern":
+                lookup_indices.update(record.Feature.LookupListIndex)
+
+        for index in sorted(lookup_indices):
+            lookup = gpos.LookupList.Lookup[index]
+            for subtable in lookup.SubTable:
+                if lookup.LookupType == 9:
+                    subtable = subtable.ExtSubTable
+                if getattr(subtable, "LookupType", 2) != 2:
+                    continue
+                if subtable.Format == 1:
+                    coverage = subtable.Coverage.glyphs
+                    for first, pair_set in zip(coverage, subtable.PairSet):
+                        for record in pair_set.PairValueRecord:
+                            value = getattr(record.Value1, "XAdvance", 0) if record.Value1 else 0
+                            if value:
+                                # GPOS wins over the legacy kern table
+                                self._kern_pairs[(first, record.SecondGlyph)] = value
+                elif subtable.Format == 2:
+                    self._class_kerning.append((
+                        set(subtable.Coverage.glyphs),
+                        subtable.ClassDef1.classDefs,
+                        subtable.ClassDef2.classDefs,
+                        subtable.Class1Record,
+                    ))
+
+    def _glyph(self, char: str) -> Tuple[Optional[str], int]:
+        cached = self._glyph_cache.get(char)
+        if cached is None:
+            glyph = self._cmap.get(ord(char))
+            if glyph is None:
+                # Missing glyph: libass falls back to another font, use notdef width
+                advance = self._hmtx.get(".notdef", (self.units_per_em // 2, 0))[0]
+            else:
+                advance = self._hmtx[glyph][0]
+            cached = (glyph, advance)
+            self._glyph_cache[char] = cached
+        return cached
+
+    def _kerning(self, left: str, right: str) -> int:
+        pair = (left, right)
+        cached = self._pair_cache.get(pair)
+        if cached is not None:
+            return cached
+        value = self._kern_pairs.get(pair, 0)
+        if not value:
+            for coverage, class_def1, class_def2, class1_records in self._class_kerning:
+                if left not in coverage:
+                    continue
+                record = class1_records[class_def1.get(left, 0)].Class2Record[class_def2.get(right, 0)]
+                value = getattr(record.Value1, "XAdvance", 0) if record.Value1 else 0
+                if value:
+                    break
+        self._pair_cache[pair] = value
+        return value
+
+    def width_units(self, text: str) -> int:
+        """Returns the advance width of text in font units, including kerning."""
+        total = 0
+        previous = None
+        for char in text:
+            glyph, advance = self._glyph(char)
+            total += advance
+            if previous is not None and glyph is not None:
+                total += self._kerning(previous, glyph)
+            previous = glyph
+        return total
+
+    def measure(self, text: str, font_size: int) -> int:
+        """Returns the width of text in pixels at the given ASS font size."""
+        key = (text, font_size)
+        width = self._word_cache.get(key)
+        if width is None:
+            width = round(self.width_units(text) * font_size / self.height_units)
+            self._word_cache[key] = width
+        return width
+
+@lru_cache(maxsize=None)
+def get_font_metrics(family: str, bold: bool = True) -> Optional[FontMetrics]:
+    """Returns cached metrics for a family, substituting a fallback font if needed."""
+    found = find_font(family, bold)
+    if found is None:
+        for fallback in FALLBACK_FAMILIES:
+            found = find_font(fallback, bold)
+            if found:
+                log_warning(f"Font '{family}' not found, measuring with '{fallback}' instead.")
+                break
+    if found is None:
+        # Last resort: any installed font is better than a blind guess
+        for faces in font_index().values():
+            found = (faces[0][0], faces[0][1])
+            log_warning(f"Font '{family}' not found, measuring with {found[0].name} instead.")
+            break
+    if found is None:
+        log_warning(f"No fonts found on this system, caption widths for '{family}' are estimated.")
+        return None
+    try:
+        return FontMetrics(*found)
+    except Exception as e:
+        log_warning(f"Failed to read font {found[0]}: {e}")
+        return None
+
+def text_width(text: str, font_family: str, font_size: int, bold: bool = True) -> int:
+    """Returns the rendered width of text in pixels."""
+    metrics = get_font_metrics(font_family, bold)
+    if metrics is None:
+        # Average char width ~0.5 * size, only used without any font files
+        return int(len(text) * font_size * 0.5)
+    return metrics.measure(text, font_size)
@@ -0,0 +1,211 @@
+import itertools
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from .utils import JobCancelled, log_error, log_info, log_success, log_warning
+
+# Share of the overall progress bar each stage takes
+STAGE_WEIGHTS = OrderedDict([
+    ("extract", 0.05),
+    ("draft", 0.05),         # Only with a draft_model; done means the draft captions are on disk
+    ("transcribe", 0.55),
+    ("render", 0.05),
+    ("burn", 0.30),
+])
+
+FINISHED = ("done", "failed", "cancelled")
+
+class QueueFull(Exception):
+    """The job queue is at capacity; the caller should retry later."""
+
+class Job:
+    """A captioning job: its parameters, state and progress.
+
+    Thread safe to read from other threads; only the worker running it
+    updates status and progress. cancel() may be called from anywhere.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, params: Dict[str, Any]):
+        self.id = str(next(self._ids))
+        self.params = params
+        self.status = "queued"   # queued, running, done, failed, cancelled
+        self.stage: Optional[str] = None
+        self.stage_progress = 0.0
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        """Overall progress from 0 to 1, weighted by stage."""
+        if self.status == "done":
+            return 1.0
+        if self.stage not in STAGE_WEIGHTS:
+            return 0.0
+        done = 0.0
+        for stage, weight in STAGE_WEIGHTS.items():
+            if stage == self.stage:
+                return done + weight * self.stage_progress
+            done += weight
+        return done
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.status == "queued":
+            self.status = "cancelled"
+            self.finished = time.time()
+
+    def report_progress(self, stage: str, fraction: float):
+        """Progress callback for process_video; raises JobCancelled once cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} cancelled")
+        self.stage = stage
+        self.stage_progress = max(0.0, min(fraction, 1.0))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 4),
+            "error": self.error,
+            "params": self.params,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+class JobQueue:
+    """Runs jobs on a fixed number of worker threads in this process.
+
+    Workers share the process-wide model registry, so models stay warm from
+    one job to the next. The queue is bounded: submit() raises QueueFull
+    instead of letting work pile up. runner(job) does the actual work and
+    should pass job.report_progress as the progress callback.
+    """
+
+    def __init__(self, runner: Callable[[Job], None], workers: int = 1, max_queued: int = 16,
+                 keep_finished: int = 200):
+        self.runner = runner
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self.resize(workers)
+
+    @property
+    def workers(self) -> int:
+        return len(self._threads)
+
+    def resize(self, workers: int):
+        """Changes the number of worker threads; running jobs are not interrupted."""
+        workers = max(1, workers)
+        with self._lock:
+            while len(self._threads) < workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            # Surplus workers exit once they are idle
+            for thread in self._threads[workers:]:
+                thread.retire = True
+            self._threads = self._threads[:workers]
+
+    def submit(self, params: Dict[str, Any]) -> Job:
+        job = Job(params)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise QueueFull(f"{self.max_queued} jobs already queued")
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        log_info(f"Job {job.id} queued: {params.get('input_file')}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+        return job
+
+    def forget_finished(self):
+        """Drops done, failed and cancelled jobs from the job list."""
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.status in FINISHED]:
+                del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        jobs = self.list()
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "queued": self._queue.qsize(),
+                "max_queued": self.max_queued, "jobs": counts}
+
+    def shutdown(self, cancel_running: bool = True):
+        """Cancels queued (and optionally running) jobs and stops the workers."""
+        for job in self.list():
+            if job.status == "queued" or (cancel_running and job.status == "running"):
+                job.cancel()
+        with self._lock:
+            threads = list(self._threads)
+            self._threads = []
+        for thread in threads:
+            thread.retire = True
+        for thread in threads:
+            thread.join()
+
+    def _prune(self):
+        # Forget the oldest finished jobs; the caller holds the lock
+        finished = [j.id for j in self._jobs.values() if j.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        thread = threading.current_thread()
+        while not getattr(thread, "retire", False):
+            try:
+                job = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job.cancelled:
+                job.status = "cancelled"
+                continue
+            job.status = "running"
+            job.started = time.time()
+            try:
+                self.runner(job)
+                job.status = "done"
+                log_success(f"Job {job.id} done")
+            except JobCancelled:
+                job.status = "cancelled"
+                log_warning(f"Job {job.id} cancelled")
+            except BaseException as e:
+                # SystemExit included: check_ffmpeg exits when ffmpeg is missing
+                job.status = "failed"
+                job.error = str(e) or type(e).__name__
+                log_error(f"Job {job.id} failed: {job.error}")
+                log_error(traceback.format_exc())
+            finally:
+                job.finished = time.time()
@@ -0,0 +1,335 @@
+"""Live captioning of a continuous audio stream.
+
+Audio comes from ffmpeg reading stdin, a pipe, a URL or a file that is still
+being written. Every `step` seconds of new audio the current window is
+re-transcribed; words are committed once two consecutive transcriptions
+agree on them (LocalAgreement-2), or once they are older than the latency
+budget. Committed words go through StreamingChunker and each closed caption
+segment is appended to the ASS/SRT/WebVTT outputs straight away.
+
+Latency is measured per word, from the moment its audio arrived to the
+moment its caption was written.
+"""
+import bisect
+import os
+import queue
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel
+from .asr import SAMPLE_RATE, Word, whisper_threads
+from .chunking import CaptionSegment, StreamingChunker
+from .models import get_model
+from .presets import PresetConfig
+from .subtitles import check_caption_format, open_caption_writer
+from .utils import log_info, log_success, log_warning
+
+# ffmpeg output read per chunk: 0.1 s of 16-bit mono PCM
+READ_BYTES = SAMPLE_RATE // 10 * 2
+
+# Most of ffmpeg's stderr reported when the stream ends
+STDERR_TAIL_BYTES = 64 * 1024
+
+# Committed words passed to Whisper as the prompt for the next window
+PROMPT_WORDS = 40
+
+class LiveOptions(BaseModel):
+    latency: float = 3.0        # Seconds from speech to caption before words are committed unconfirmed
+    step: float = 1.0           # Re-transcribe after this much new audio
+    max_buffer: float = 20.0    # Longest window handed to Whisper
+    realtime: bool = False      # Read file inputs at playback speed, to simulate a live source
+    follow: bool = False        # Keep reading a file that is still being written
+    idle_timeout: float = 10.0  # With follow, stop after this long without new data
+
+def audio_stream_command(source: str, options: LiveOptions) -> List[str]:
+    """ffmpeg command decoding the source to 16 kHz mono s16le on stdout."""
+    cmd = ["ffmpeg", "-v", "error"]
+    if source == "-":
+        source = "pipe:0"
+    else:
+        cmd.append("-nostdin")
+    if options.realtime:
+        cmd.append("-re")
+    if options.follow:
+        cmd += ["-follow", "1", "-rw_timeout", str(int(options.idle_timeout * 1_000_000))]
+    cmd += ["-i", source, "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1"]
+    return cmd
+
+class AudioStream:
+    """Runs ffmpeg and collects its PCM output on a background thread."""
+
+    def __init__(self, cmd: List[str]):
+        self.cmd = cmd
+        self.process: Optional[subprocess.Popen] = None
+        self._chunks: "queue.Queue[Optional[Tuple[np.ndarray, float]]]" = queue.Queue()
+        self._pump_thread: Optional[threading.Thread] = None
+        self._stderr = None
+
+    def start(self):
+        # stderr goes to a file: nobody reads a pipe until the end, and a long
+        # stream of decode errors would fill it and stall ffmpeg.
+        # stdin is inherited so "-" reads this process's stdin.
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=self._stderr)
+        self._pump_thread = threading.Thread(target=self._pump, daemon=True)
+        self._pump_thread.start()
+
+    def _pump(self):
+        pending = b""
+        while True:
+            data = self.process.stdout.read1(READ_BYTES)
+            if not data:
+                break
+            data = pending + data
+            # Keep a trailing odd byte for the next read
+            whole = len(data) - len(data) % 2
+            pending = data[whole:]
+            samples = np.frombuffer(data[:whole], dtype=np.int16).astype(np.float32) / 32768.0
+            self._chunks.put((samples, time.monotonic()))
+        self._chunks.put(None)
+
+    def read(self, timeout: float) -> Tuple[List[Tuple[np.ndarray, float]], bool]:
+        """Waits up to timeout seconds for audio; returns ([(samples, arrival time)],
+        reached end of stream). The list is empty if nothing arrived in time.
+        """
+        try:
+            chunks = [self._chunks.get(timeout=timeout)]
+        except queue.Empty:
+            return [], False
+        while True:
+            try:
+                chunks.append(self._chunks.get_nowait())
+            except queue.Empty:
+                break
+        ended = chunks[-1] is None
+        return [c for c in chunks if c is not None], ended
+
+    def close(self) -> str:
+        """Stops ffmpeg; returns the end of what it wrote to stderr."""
+        if self.process is None:
+            return ""
+        if self.process.poll() is None:
+            self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        # stdout belongs to the pump thread, which stops at the end of the output
+        self._pump_thread.join(timeout=5)
+        self._stderr.seek(0, os.SEEK_END)
+        self._stderr.seek(max(0, self._stderr.tell() - STDERR_TAIL_BYTES))
+        stderr = self._stderr.read()
+        self._stderr.close()
+        return stderr.decode(errors="replace").strip()
+
+class LatencyTracker:
+    """Remembers when each part of the stream arrived and how long after that
+    the words in it were captioned."""
+
+    def __init__(self):
+        self._stream_ends: List[float] = []
+        self._arrivals: List[float] = []
+        self.latencies: List[float] = []
+
+    def received(self, stream_end: float, arrival: float):
+        self._stream_ends.append(stream_end)
+        self._arrivals.append(arrival)
+
+    def received_by(self, wall_time: float) -> float:
+        """Stream time of all audio that had arrived by wall_time."""
+        i = bisect.bisect_right(self._arrivals, wall_time)
+        return self._stream_ends[i - 1] if i else 0.0
+
+    def arrival(self, stream_time: float) -> float:
+        """Wall clock time at which the audio at stream_time had arrived."""
+        i = bisect.bisect_left(self._stream_ends, stream_time)
+        return self._arrivals[min(i, len(self._arrivals) - 1)]
+
+    def emitted(self, segment: CaptionSegment, when: float):
+        ends = segment.timeline.ends
+        for i in range(segment.first, segment.last):
+            self.latencies.append(max(0.0, when - self.arrival(float(ends[i]))))
+
+    def summary(self) -> Dict[str, float]:
+        if not self.latencies:
+            return {"words": 0}
+        ordered = sorted(self.latencies)
+        return {
+            "words": len(ordered),
+            "mean_s": round(statistics.fmean(ordered), 3),
+            "p50_s": round(ordered[len(ordered) // 2], 3),
+            "p90_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 3),
+            "max_s": round(ordered[-1], 3),
+        }
+
+def _same_word(a: Word, b: Word) -> bool:
+    return a.word.lower().strip(".,?!;:") == b.word.lower().strip(".,?!;:")
+
+class LocalAgreement:
+    """Commits the words two consecutive hypotheses agree on (LocalAgreement-2).
+
+    Hypotheses are word lists with absolute times; only words after the
+    committed ones count.
+    """
+
+    def __init__(self):
+        self.pending: List[Word] = []
+        self.committed_end = 0.0
+
+    def update(self, hypothesis: List[Word]) -> List[Word]:
+        # Re-transcribed words may shift a little; skip those already committed
+        new = [w for w in hypothesis
+               if w.start >= self.committed_end - 0.1 and w.end > self.committed_end]
+        agreed = []
+        for previous, current in zip(self.pending, new):
+            if not _same_word(previous, current):
+                break
+            agreed.append(current)
+        self.pending = new[len(agreed):]
+        self._commit(agreed)
+        return agreed
+
+    def commit_until(self, stream_time: float) -> List[Word]:
+        """Commits unconfirmed words that ended before stream_time."""
+        count = 0
+        while count < len(self.pending) and self.pending[count].end <= stream_time:
+            count += 1
+        words, self.pending = self.pending[:count], self.pending[count:]
+        self._commit(words)
+        return words
+
+    def flush(self) -> List[Word]:
+        words, self.pending = self.pending, []
+        self._commit(words)
+        return words
+
+    def _commit(self, words: List[Word]):
+        if words:
+            self.committed_end = words[-1].end
+
+def _transcribe_window(model, audio: np.ndarray, offset: float, prompt: str,
+                       language: Optional[str]) -> Tuple[List[Word], str]:
+    segments, info = model.transcribe(audio, word_timestamps=True, language=language,
+                                      initial_prompt=prompt or None,
+                                      condition_on_previous_text=False)
+    words = []
+    for segment in segments:
+        for w in segment.words or []:
+            words.append(Word(w.word, offset + w.start, offset + w.end, w.probability))
+    return words, info.language
+
+def run_live(source: str, output_paths: List[Path], config: PresetConfig,
+             model: str = "medium", device: str = "auto", compute_type: str = "default",
+             language: Optional[str] = None, options: Optional[LiveOptions] = None,
+             play_res: Optional[Tuple[int, int]] = None) -> Dict[str, float]:
+    """Captions a live source until it ends (or Ctrl+C); returns the latency summary."""
+    # Fail on a bad extension before the model loads, ffmpeg starts or any file is created
+    for path in output_paths:
+        check_caption_format(path)
+    # Holds a share of the CPU budget for the whole stream
+    with whisper_threads(device) as threads:
+        whisper = get_model(model, device=device, compute_type=compute_type, cpu_threads=threads)
+        return _run_live(source, output_paths, config, whisper, language, options or LiveOptions(), play_res)
+
+def _run_live(source: str, output_paths: List[Path], config: PresetConfig, whisper,
+              language: Optional[str], options: LiveOptions,
+              play_res: Optional[Tuple[int, int]]) -> Dict[str, float]:
+    writers = []
+    stream = AudioStream(audio_stream_command(source, options))
+    chunker = StreamingChunker(config.chunking)
+    agreement = LocalAgreement()
+    tracker = LatencyTracker()
+    committed: List[Word] = []
+
+    buffer = np.zeros(0, dtype=np.float32)
+    buffer_start = 0.0      # stream time of buffer[0]
+    stream_time = 0.0       # seconds of audio received
+    transcribed_at = 0.0
+    segments_written = 0
+
+    def emit(segments: List[CaptionSegment]):
+        nonlocal segments_written
+        if not segments:
+            return
+        for writer in writers:
+            writer.write(segments)
+        now = time.monotonic()
+        for segment in segments:
+            tracker.emitted(segment, now)
+        segments_written += len(segments)
+
+    def commit(words: List[Word]):
+        committed.extend(words)
+        del committed[:-PROMPT_WORDS]
+        for word in words:
+            emit(chunker.push(word))
+
+    log_info(f"Live captioning {source} -> {', '.join(str(p) for p in output_paths)} "
+             f"(latency budget {options.latency:.1f}s)")
+    stream.start()
+    try:
+        for path in output_paths:
+            writers.append(open_caption_writer(path, config, play_res))
+        ended = False
+        while not ended:
+            chunks, ended = stream.read(timeout=options.step)
+            for samples, arrival in chunks:
+                buffer = np.concatenate([buffer, samples])
+                stream_time += len(samples) / SAMPLE_RATE
+                tracker.received(stream_time, arrival)
+            # Re-transcribe after `step` of new audio, or on whatever is left when the source stalls
+            stalled = not chunks and stream_time > transcribed_at
+            if ended or stalled or stream_time - transcribed_at >= options.step:
+                transcribed_at = stream_time
+                if len(buffer):
+                    prompt = " ".join(w.word for w in committed)
+                    hypothesis, detected = _transcribe_window(whisper, buffer, buffer_start, prompt, language)
+                    # Keep the first detected language instead of re-detecting on every window
+                    language = language or detected
+                    commit(agreement.update(hypothesis))
+            if ended:
+                commit(agreement.flush())
+                emit(chunker.flush())
+                break
+
+            # Latency bound, on the wall clock so it holds while the source is quiet:
+            # stop waiting for agreement, then for the open segment to fill up
+            overdue = tracker.received_by(time.monotonic() - options.latency)
+            commit(agreement.commit_until(overdue))
+            if chunker.open_since is not None and chunker.open_since < overdue:
+                emit(chunker.flush())
+
+            # Drop audio that is already captioned once the window gets long
+            if stream_time - buffer_start > options.max_buffer:
+                cut = max(agreement.committed_end, stream_time - options.max_buffer)
+                drop = int((cut - buffer_start) * SAMPLE_RATE)
+                if drop > 0:
+                    buffer = buffer[drop:]
+                    buffer_start += drop / SAMPLE_RATE
+    except KeyboardInterrupt:
+        log_warning("Live captioning interrupted, writing the captions received so far.")
+        commit(agreement.flush())
+        emit(chunker.flush())
+    finally:
+        for writer in writers:
+            writer.close()
+        errors = stream.close()
+        if errors:
+            log_warning(f"ffmpeg: {errors}")
+
+    stats = tracker.summary()
+    stats["segments"] = segments_written
+    stats["stream_seconds"] = round(stream_time, 2)
+    if stats["words"]:
+        log_success(f"Live captioning done: {segments_written} captions, latency "
+                    f"p50 {stats['p50_s']:.2f}s, p90 {stats['p90_s']:.2f}s, max {stats['max_s']:.2f}s")
+    else:
+        log_warning("Live captioning done, no speech captioned.")
+    return stats
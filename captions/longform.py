@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+from .asr import Word, SAMPLE_RATE, transcribe
+from .models import get_model
+from .utils import JobCancelled, ProgressCallback, log_info, log_success
+
+# Analysis window for finding pauses
+FRAME_SECONDS = 0.03
+# A pause has to be quiet for roughly this long to count as a split point
+PAUSE_SECONDS = 0.3
+
+def find_split_points(audio: np.ndarray, chunk_seconds: float = 300.0, search_seconds: float = 30.0,
+                      sample_rate: int = SAMPLE_RATE) -> List[int]:
+    """Returns sample offsets where the audio can be cut, each at the quietest
+    pause within search_seconds of a multiple of chunk_seconds."""
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = len(audio) // frame
+    if n_frames == 0 or len(audio) <= chunk_seconds * sample_rate:
+        return []
+
+    # Frame energy smoothed over the pause length, so we land inside a pause
+    # rather than on a single quiet frame between two syllables
+    energy = np.square(audio[:n_frames * frame].reshape(n_frames, frame)).mean(axis=1)
+    width = max(1, int(PAUSE_SECONDS / FRAME_SECONDS))
+    smoothed = np.convolve(energy, np.ones(width) / width, mode="same")
+
+    frames_per_chunk = int(chunk_seconds / FRAME_SECONDS)
+    search = min(int(search_seconds / FRAME_SECONDS), frames_per_chunk // 3)
+    points = []
+    target = frames_per_chunk
+    while target < n_frames - search:
+        lo = max(target - search, points[-1] // frame + 1 if points else 1)
+        hi = min(target + search, n_frames - 1)
+        best = lo + int(np.argmin(smoothed[lo:hi]))
+        points.append(best * frame + frame // 2)
+        target = best + frames_per_chunk
+    return points
+
+def split_audio(audio: np.ndarray, chunk_seconds: float = 300.0,
+                sample_rate: int = SAMPLE_RATE) -> List[Tuple[float, np.ndarray]]:
+    """Splits audio at pauses into (offset_seconds, samples) chunks."""
+    bounds = [0] + find_split_points(audio, chunk_seconds, sample_rate=sample_rate) + [len(audio)]
+    return [(start / sample_rate, audio[start:end]) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+# Per-process settings, filled in by the pool initializer
+_worker_settings = {}
+
+def _init_worker(model_size: str, device: str, compute_type: str, cpu_threads: int):
+    _worker_settings.update(model_size=model_size, device=device,
+                            compute_type=compute_type, cpu_threads=cpu_threads)
+    # Load eagerly so every worker pays the load once, in parallel
+    get_model(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+def _detect_language(audio: np.ndarray) -> Optional[str]:
+    model = get_model(_worker_settings["model_size"], device=_worker_settings["device"],
+                      compute_type=_worker_settings["compute_type"],
+                      cpu_threads=_worker_settings["cpu_threads"])
+    language, _, _ = model.detect_language(audio)
+    return language
+
+def _transcribe_chunk(offset: float, audio: np.ndarray, language: Optional[str]) -> List[Word]:
+    words = transcribe(audio, language=language, **_worker_settings)
+    for w in words:
+        w.start += offset
+        w.end += offset
+    return words
+
+def default_workers(cpu_count: Optional[int] = None) -> int:
+    """CTranslate2 scales well up to ~4 threads per model, so use one worker per 4 cores."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // 4)
+
+def _terminate_pool(pool: ProcessPoolExecutor):
+    """Stops a pool without waiting for the chunks that are still decoding."""
+    pool.shutdown(wait=False, cancel_futures=True)
+    # The executor has no public way to kill busy workers
+    for process in list(getattr(pool, "_processes", {}).values()):
+        process.terminate()
+
+def transcribe_long(audio: np.ndarray, model_size: str = "medium", device: str = "auto",
+                    compute_type: str = "default", language: Optional[str] = None,
+                    workers: Optional[int] = None, chunk_seconds: float = 300.0,
+                    progress: Optional[ProgressCallback] = None, threads: int = 0) -> List[Word]:
+    """Transcribes long audio by splitting it at pauses and decoding the chunks in a process pool.
+
+    Each worker owns its own WhisperModel and an equal share of `threads`
+    (default: all CPU cores). Word timestamps are shifted back onto the
+    original timeline and merged in order.
+    """
+    threads = threads or os.cpu_count() or 1
+    chunks = split_audio(audio, chunk_seconds)
+    workers = min(workers or default_workers(threads), len(chunks))
+    if workers <= 1:
+        return transcribe(audio, model_size=model_size, device=device, compute_type=compute_type,
+                          language=language, cpu_threads=threads, progress=progress)
+
+    cpu_threads = max(1, threads // workers)
+    log_info(f"Long-form mode: {len(chunks)} chunks on {workers} workers ({cpu_threads} threads each)")
+
+    # spawn: forking a process that already holds CTranslate2 state is not safe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(model_size, device, compute_type, cpu_threads)) as pool:
+        if language is None:
+            # Detect once like the sequential path does, so every chunk agrees
+            language = pool.submit(_detect_language, audio[:30 * SAMPLE_RATE]).result()
+            log_info(f"Detected language: {language}")
+
+        futures = [pool.submit(_transcribe_chunk, offset, samples, language) for offset, samples in chunks]
+        words = []
+        try:
+            for i, future in enumerate(futures):
+                words.extend(future.result())
+                log_info(f"Chunk {i + 1}/{len(chunks)} done")
+                if progress:
+                    progress("transcribe", (i + 1) / len(chunks))
+        except JobCancelled:
+            _terminate_pool(pool)
+            raise
+
+    words.sort(key=lambda w: w.start)
+    log_success(f"Transcribed {len(words)} words from {len(chunks)} chunks")
+    return words
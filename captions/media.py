@@ -0,0 +1,162 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Used only when ffprobe is unavailable
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".aac", ".flac", ".ogg", ".opus", ".wma"}
+
+def ffprobe_streams(input_path: Path) -> List[Dict[str, Any]]:
+    """Returns the stream descriptions reported by ffprobe."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "stream=index,codec_type,width,height,duration:stream_disposition=attached_pic",
+        "-of", "json",
+        str(input_path)
+    ]
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return json.loads(result.stdout.decode() or "{}").get("streams", [])
+
+def has_video_stream(input_path: Path) -> bool:
+    """Checks whether the input has a real video stream (cover art doesn't count)."""
+    if shutil.which("ffprobe"):
+        try:
+            for stream in ffprobe_streams(input_path):
+                if stream.get("codec_type") != "video":
+                    continue
+                if stream.get("disposition", {}).get("attached_pic"):
+                    continue
+                return True
+            return False
+        except (subprocess.CalledProcessError, ValueError):
+            pass
+    return input_path.suffix.lower() not in AUDIO_EXTENSIONS
+
+def probe_format(input_path: Path) -> Dict[str, float]:
+    """Returns the container duration and start_time in seconds."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration,start_time",
+        "-of", "json",
+        str(input_path)
+    ]
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    fmt = json.loads(result.stdout.decode() or "{}").get("format", {})
+
+    def number(key):
+        try:
+            return float(fmt.get(key))
+        except (TypeError, ValueError):
+            return 0.0
+
+    return {"duration": number("duration"), "start_time": number("start_time")}
+
+def probe_video_size(input_path: Path) -> Optional[Tuple[int, int]]:
+    """Returns the displayed (width, height) of the first video stream, or None.
+
+    Sources with a 90 degree rotation (phone footage) report their stored
+    size; ffmpeg rotates them before filtering, so the sides are swapped.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:stream_side_data=rotation",
+        "-of", "json",
+        str(input_path)
+    ]
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    streams = json.loads(result.stdout.decode() or "{}").get("streams", [])
+    if not streams or not streams[0].get("width") or not streams[0].get("height"):
+        return None
+    stream = streams[0]
+    width, height = int(stream["width"]), int(stream["height"])
+    rotation = next((int(d.get("rotation", 0)) for d in stream.get("side_data_list", [])
+                     if "rotation" in d), 0)
+    if abs(rotation) % 180 == 90:
+        width, height = height, width
+    return width, height
+
+def probe_video_frames(input_path: Path) -> Tuple[List[float], List[float]]:
+    """Returns (frame times, keyframe times) of the first video stream, both sorted.
+
+    Times are relative to the container start, which is how ffmpeg's -ss and
+    filter timestamps (and therefore the ASS file) see them. Reads packet
+    headers only, so it is fast even for long files.
+    """
+    start_time = probe_format(input_path)["start_time"]
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        str(input_path)
+    ]
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    frames = []
+    keyframes = []
+    for line in result.stdout.decode().splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or parts[0] in ("", "N/A"):
+            continue
+        t = float(parts[0]) - start_time
+        frames.append(t)
+        if "K" in parts[1]:
+            keyframes.append(t)
+    frames.sort()
+    keyframes.sort()
+    return frames, keyframes
+
+def run_ffmpeg(cmd: List[str], cwd: Optional[Path] = None,
+               on_progress: Optional[Callable[[Dict[str, str]], None]] = None) -> Dict[str, float]:
+    """Runs an ffmpeg command and returns its final encode stats.
+
+    Adds -progress so ffmpeg reports frame, fps and speed as key=value lines
+    on stdout; stderr (the usual console output) is left alone. on_progress
+    gets the latest values after every report (about twice a second); if it
+    raises, ffmpeg is terminated and the exception propagates. Raises
+    CalledProcessError like subprocess.run(check=True).
+    """
+    cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+    progress: Dict[str, str] = {}
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, cwd=cwd, text=True)
+    try:
+        for line in process.stdout:
+            key, sep, value = line.strip().partition("=")
+            if not sep:
+                continue
+            progress[key] = value.strip()
+            # "progress" closes each report block
+            if key == "progress" and on_progress:
+                on_progress(progress)
+    except BaseException:
+        process.terminate()
+        process.wait()
+        raise
+    finally:
+        process.stdout.close()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+    stats = {}
+    for key, kind in (("frame", int), ("fps", float)):
+        try:
+            stats[key] = kind(progress[key])
+        except (KeyError, ValueError):
+            pass
+    speed = progress.get("speed", "").rstrip("x")
+    try:
+        stats["speed"] = float(speed)
+    except ValueError:
+        pass
+    return stats
+
+def progress_seconds(progress: Dict[str, str]) -> float:
+    """Output position in seconds from an ffmpeg -progress block."""
+    # out_time_us and (despite its name) out_time_ms are both microseconds
+    for key in ("out_time_us", "out_time_ms"):
+        try:
+            return max(int(progress[key]), 0) / 1_000_000
+        except (KeyError, ValueError):
+            continue
+    return 0.0
@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from .utils import log_info
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Peak resident memory of this process (or of its finished children) in MB.
+
+    This is a high-water mark, so it never goes down between spans. Returns
+    None where the resource module is unavailable.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class Span:
+    """Timing and resource usage of one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        # CPU time of subprocesses (ffmpeg) that finished during the span
+        self.child_cpu = 0.0
+        # CPU times are process-wide: set when spans of other threads (other
+        # jobs, or the stages of one job that overlap) ran at the same time
+        self.cpu_shared = False
+        self.peak_rss_mb: Optional[float] = None
+        self.info: Dict[str, Any] = {}
+
+    def to_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "wall_s": round(self.wall, 3),
+            "cpu_s": round(self.cpu, 3),
+            "child_cpu_s": round(self.child_cpu, 3),
+            "cpu_shared": self.cpu_shared,
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+        }
+        data.update(self.info)
+        return data
+
+# Spans being timed in this process, with the thread timing each one
+_open_spans: List[tuple] = []
+_open_lock = threading.Lock()
+
+def _open_span(span: Span):
+    thread = threading.get_ident()
+    with _open_lock:
+        for other_thread, other in _open_spans:
+            if other_thread != thread:
+                other.cpu_shared = span.cpu_shared = True
+        _open_spans.append((thread, span))
+
+def _close_span(span: Span):
+    with _open_lock:
+        _open_spans[:] = [entry for entry in _open_spans if entry[1] is not span]
+
+class RunReport:
+    """Collects spans and run-level numbers for one process_video run."""
+
+    def __init__(self, **info):
+        self.spans: List[Span] = []
+        self.info: Dict[str, Any] = dict(info)
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, **info):
+        """Times the enclosed block; the yielded Span's .info can be filled in."""
+        span = Span(name)
+        span.info.update(info)
+        _open_span(span)
+        wall = time.perf_counter()
+        times = os.times()
+        try:
+            yield span
+        finally:
+            end = os.times()
+            _close_span(span)
+            span.wall = time.perf_counter() - wall
+            span.cpu = (end.user - times.user) + (end.system - times.system)
+            # Only populated on Unix
+            span.child_cpu = ((end.children_user - times.children_user)
+                              + (end.children_system - times.children_system))
+            span.peak_rss_mb = peak_rss_mb()
+            self.spans.append(span)
+
+    def set(self, key: str, value: Any):
+        self.info[key] = value
+
+    def get_span(self, name: str) -> Optional[Span]:
+        for span in self.spans:
+            if span.name == name:
+                return span
+        return None
+
+    def to_dict(self) -> dict:
+        data = dict(self.info)
+        data["total_wall_s"] = round(time.perf_counter() - self.started, 3)
+        data["peak_rss_mb"] = peak_rss_mb()
+        data["peak_child_rss_mb"] = peak_rss_mb(children=True)
+
+        audio_duration = self.info.get("audio_duration_s")
+        transcribe = self.get_span("transcribe")
+        # A cache hit records no transcribe span, so there is no factor either
+        if audio_duration and transcribe:
+            # Real-time factor: seconds of processing per second of audio
+            data["real_time_factor"] = round(transcribe.wall / audio_duration, 4)
+
+        data["spans"] = [span.to_dict() for span in self.spans]
+        return data
+
+    def write(self, path: Path) -> Path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    def log_summary(self):
+        data = self.to_dict()
+        log_info(f"Run finished in {data['total_wall_s']:.1f}s:")
+        for span in self.spans:
+            line = f"  {span.name:<12} {span.wall:7.2f}s wall {span.cpu + span.child_cpu:7.2f}s cpu"
+            if span.cpu_shared:
+                line += " (shared)"
+            extras = [f"{k}={v}" for k, v in span.info.items()]
+            if extras:
+                line += "  " + " ".join(extras)
+            log_info(line)
+        if "real_time_factor" in data:
+            log_info(f"  Real-time factor: {data['real_time_factor']:.3f}")
+        if data["peak_rss_mb"] is not None:
+            log_info(f"  Peak memory: {data['peak_rss_mb']:.0f} MB (ffmpeg {data['peak_child_rss_mb']:.0f} MB)")
+
+def span(report: Optional[RunReport], name: str, **info):
+    """report.span(...), or a detached Span when the caller isn't collecting a report."""
+    if report is None:
+        detached = Span(name)
+        detached.info.update(info)
+        return nullcontext(detached)
+    return report.span(name, **info)
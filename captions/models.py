@@ -0,0 +1,181 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+from .utils import log_info
+
+# The model class, imported on first load: faster_whisper pulls in ctranslate2,
+# which dominates startup time. Tests and benchmarks may replace it.
+WhisperModel = None
+
+# Approximate parameter counts (millions) used to estimate the memory footprint
+# of a loaded model. Exact numbers don't matter, the cap only needs a rough size.
+MODEL_PARAMS_M = {
+    "tiny": 39,
+    "base": 74,
+    "small": 244,
+    "medium": 769,
+    "large": 1550,
+    "turbo": 809,
+}
+
+# Bytes per weight for the common CTranslate2 compute types.
+BYTES_PER_PARAM = {
+    "float32": 4,
+    "float16": 2,
+    "bfloat16": 2,
+    "int8_float32": 1,
+    "int8_float16": 1,
+    "int8_bfloat16": 1,
+    "int8": 1,
+}
+
+ModelKey = Tuple[str, str, str, int]
+
+def whisper_model_class():
+    """Returns faster_whisper.WhisperModel, importing it on first use."""
+    global WhisperModel
+    if WhisperModel is None:
+        from faster_whisper import WhisperModel as model_class
+        WhisperModel = model_class
+    return WhisperModel
+
+@lru_cache(maxsize=None)
+def uses_gpu(device: str) -> bool:
+    """True if a model loaded on `device` runs on a GPU ("auto" picks CUDA when there is one)."""
+    if device != "auto":
+        return device == "cuda"
+    try:
+        import ctranslate2
+    except ImportError:
+        return False
+    return ctranslate2.get_cuda_device_count() > 0
+
+def estimate_model_mb(model_size: str, compute_type: str) -> int:
+    """Roughly estimates the resident size of a model in megabytes."""
+    base_name = model_size.split(".")[0]
+    params = None
+    for name, count in MODEL_PARAMS_M.items():
+        if base_name.startswith(name) or base_name.endswith(name):
+            params = count
+            break
+    if params is None:
+        # Unknown model or local path, assume the medium size
+        params = MODEL_PARAMS_M["medium"]
+    # "default"/"auto" usually end up as float32 on CPU
+    bytes_per_param = BYTES_PER_PARAM.get(compute_type, 4)
+    return int(params * bytes_per_param)
+
+class ModelRegistry:
+    """Process-wide LRU cache of loaded WhisperModel instances.
+
+    Models are keyed by (model_size, device, compute_type, cpu_threads) and
+    evicted least-recently-used first once either the model count or the
+    estimated memory cap is exceeded. The model that was just requested is
+    never evicted, so a single model larger than the cap still works.
+    """
+
+    def __init__(self, max_models: int = 2, max_memory_mb: Optional[int] = None):
+        self.max_models = max_models
+        self.max_memory_mb = max_memory_mb
+        self._models: "OrderedDict[ModelKey, WhisperModel]" = OrderedDict()
+        self._sizes: dict = {}
+        self._lock = threading.Lock()
+        # One lock per key so two threads asking for the same model load it once
+        self._load_locks: dict = {}
+
+    def get(self, model_size: str, device: str = "auto", compute_type: str = "default",
+            cpu_threads: int = 0) -> "WhisperModel":
+        """Returns a warm model, loading it on first use."""
+        key = (model_size, device, compute_type, cpu_threads)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            log_info(f"Loading Whisper model ({model_size}) on {device}...")
+            model = whisper_model_class()(model_size, device=device, compute_type=compute_type,
+                                          cpu_threads=cpu_threads)
+
+            with self._lock:
+                self._models[key] = model
+                self._sizes[key] = estimate_model_mb(model_size, compute_type)
+                self._evict()
+                self._load_locks.pop(key, None)
+            return model
+
+    def release(self, model_size: str, device: str = "auto", compute_type: str = "default",
+                cpu_threads: int = 0) -> bool:
+        """Drops a model from the cache. Returns True if it was loaded."""
+        key = (model_size, device, compute_type, cpu_threads)
+        with self._lock:
+            self._sizes.pop(key, None)
+            return self._models.pop(key, None) is not None
+
+    def clear(self):
+        """Drops every cached model."""
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+
+    def loaded(self) -> list:
+        """Returns the keys of the loaded models, least recently used first."""
+        with self._lock:
+            return list(self._models.keys())
+
+    def memory_mb(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _evict(self):
+        # Caller holds self._lock. Never evict the most recently used model.
+        while len(self._models) > 1:
+            over_count = len(self._models) > self.max_models
+            over_memory = (self.max_memory_mb is not None
+                           and sum(self._sizes.values()) > self.max_memory_mb)
+            if not (over_count or over_memory):
+                break
+            key, _ = self._models.popitem(last=False)
+            self._sizes.pop(key, None)
+            log_info(f"Evicted Whisper model ({key[0]}, {key[1]}, {key[2]}) from cache.")
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+_registry = ModelRegistry(
+    max_models=_env_int("CAPTIONS_MAX_MODELS") or 2,
+    max_memory_mb=_env_int("CAPTIONS_MODEL_MEMORY_MB"),
+)
+
+def get_registry() -> ModelRegistry:
+    """Returns the process-wide model registry."""
+    return _registry
+
+def get_model(model_size: str, device: str = "auto", compute_type: str = "default",
+              cpu_threads: int = 0) -> "WhisperModel":
+    """Returns a warm WhisperModel from the process-wide registry."""
+    return _registry.get(model_size, device, compute_type, cpu_threads)
+
+def configure_model_cache(max_models: Optional[int] = None, max_memory_mb: Optional[int] = None):
+    """Adjusts the limits of the process-wide registry."""
+    with _registry._lock:
+        if max_models is not None:
+            _registry.max_models = max_models
+        if max_memory_mb is not None:
+            _registry.max_memory_mb = max_memory_mb
+        _registry._evict()
@@ -0,0 +1,558 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+import numpy as np
+from .asr import SAMPLE_RATE, Word, extract_audio, load_audio, save_transcript, transcribe, whisper_threads
+from .ass_renderer import WRITE_BATCH, AssWriter, generate_ass, play_resolution
+from .batched import BatchedOptions, transcribe_batched
+from .burn import burn_command, fanout_burn_command, incremental_burn, plan_segmented_burn, segmented_burn
+from .cache import SEQUENTIAL_DECODING, TranscriptCache, hash_audio, log_cache_stats
+from .chunking import StreamingChunker, chunk_words
+from .cpu import claim_threads
+from .media import has_video_stream, probe_format, probe_video_size, progress_seconds, run_ffmpeg
+from .metrics import RunReport, span
+from .models import get_model
+from .presets import PresetConfig, load_preset
+from .preview import PreviewOptions, preview_command, preview_path_for, preview_window, segments_in_window
+from .timeline import WordTimeline
+from .utils import JobCancelled, ProgressCallback, log_info, log_error, log_success, log_warning
+
+# The stages process_video runs, split out so batch runners can pipeline them.
+
+def build_config(preset: str, style_options: Optional[dict] = None) -> PresetConfig:
+    """Loads a preset and applies GUI/CLI style overrides on top of it."""
+    config = load_preset(preset)
+    log_info(f"Loaded preset: {preset}")
+
+    # Apply style overrides
+    if style_options:
+        log_info("Applying style overrides...")
+        if 'font_name' in style_options and style_options['font_name']:
+            config.font.name = style_options['font_name']
+        if 'font_size' in style_options and style_options['font_size']:
+            config.font.size = int(style_options['font_size'])
+        if 'color' in style_options and style_options['color']:
+            config.font.color = style_options['color']
+        if 'outline_color' in style_options and style_options['outline_color']:
+            config.font.outline_color = style_options['outline_color']
+            config.highlight.outline_color = style_options['outline_color']
+        if 'highlight_color' in style_options and style_options['highlight_color']:
+            config.highlight.color = style_options['highlight_color']
+        if 'highlight_text_color' in style_options and style_options['highlight_text_color']:
+            config.highlight.text_color = style_options['highlight_text_color']
+        if 'position' in style_options and style_options['position']:
+            config.position = style_options['position']
+        if 'render_mode' in style_options and style_options['render_mode']:
+            config.render_mode = style_options['render_mode']
+    return config
+
+def variant_output_path(output_path: Path, preset: str) -> Path:
+    """video_out.mp4 + clean -> video_out_clean.mp4"""
+    return output_path.with_name(f"{output_path.stem}_{Path(preset).stem}{output_path.suffix}")
+
+def plan_renders(preset: str, style_options: Optional[dict], output_path: Path,
+                 variants: Optional[List[dict]] = None) -> List[Tuple[str, PresetConfig, Path]]:
+    """Returns (preset, config, output path) for the main render and each variant.
+
+    A variant is {"preset": ..., "output": ..., "style": {...}}; only the
+    preset is required and the output defaults to variant_output_path().
+    """
+    renders = [(preset, build_config(preset, style_options), output_path)]
+    for variant in variants or []:
+        name = variant["preset"]
+        output = Path(variant["output"]) if variant.get("output") else variant_output_path(output_path, name)
+        renders.append((name, build_config(name, variant.get("style")), output))
+    outputs = [r[2].resolve() for r in renders]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("Each preset variant needs its own output file")
+    return renders
+
+def decode_input(input_path: Path, in_memory_audio: bool = True
+                 ) -> Tuple[Union[Path, np.ndarray], bool, Optional[Path]]:
+    """Prepares the audio for transcription.
+
+    Returns (audio, audio_only, temp_audio) where audio is a float32 buffer or a
+    file path, and temp_audio is the extracted WAV the caller must clean up.
+    """
+    audio_only = not has_video_stream(input_path)
+    if in_memory_audio:
+        # Decode straight into memory, works the same for audio and video inputs
+        return load_audio(input_path), audio_only, None
+    if audio_only:
+        log_info("Input is audio file, skipping extraction.")
+        return input_path, audio_only, None
+    temp_audio = input_path.with_suffix(".wav")
+    return extract_audio(input_path, temp_audio), audio_only, temp_audio
+
+def transcribe_audio(audio: Union[Path, np.ndarray], model: str = "medium", device: str = "auto",
+                     compute_type: str = "default", language: Optional[str] = None,
+                     use_cache: bool = True, long_form: bool = False,
+                     workers: Optional[int] = None, report: Optional[RunReport] = None,
+                     progress: Optional[ProgressCallback] = None,
+                     captions: Optional["CaptionStream"] = None,
+                     batched: Optional[BatchedOptions] = None) -> List[Word]:
+    """Transcribes audio, reusing a cached transcript of the same audio when possible.
+
+    With captions, words are chunked and written to the ASS files while
+    Whisper is still decoding; cached, long-form and batched transcripts are
+    handed over in one go.
+    """
+    if batched:
+        words = transcribe_files([audio], model=model, device=device, compute_type=compute_type,
+                                 language=language, use_cache=use_cache, options=batched,
+                                 report=report, progress=progress)[0]
+        if captions:
+            captions.write_all(words)
+        return words
+
+    cache = TranscriptCache() if use_cache else None
+    if cache:
+        with span(report, "cache_lookup") as lookup:
+            # Chunked decoding gives different words at the chunk edges
+            decoding = f"longform|workers{workers or 'auto'}" if long_form else SEQUENTIAL_DECODING
+            cache_key = cache.make_key(hash_audio(audio), model, compute_type, language, decoding)
+            words = cache.get(cache_key)
+            lookup.info["hit"] = words is not None
+        if words is not None:
+            log_success("Transcript cache hit, skipping transcription.")
+            log_cache_stats(cache)
+            if captions:
+                captions.write_all(words)
+            return words
+
+    if long_form:
+        from .longform import transcribe_long
+
+        # The chunk splitter needs samples, decode the WAV if we extracted one
+        samples = load_audio(audio) if isinstance(audio, Path) else audio
+        # Each worker process loads its own model, so there is no separate load span
+        with whisper_threads(device) as threads, \
+                span(report, "transcribe", long_form=True, threads=threads) as stage:
+            words = transcribe_long(samples, model_size=model, device=device, compute_type=compute_type,
+                                    language=language, workers=workers, progress=progress, threads=threads)
+            stage.info["words"] = len(words)
+        if captions:
+            captions.write_all(words)
+    else:
+        # One share of the CPU budget for loading and running the model
+        with whisper_threads(device) as threads:
+            with span(report, "model_load", model=model, threads=threads):
+                try:
+                    get_model(model, device=device, compute_type=compute_type, cpu_threads=threads)
+                except Exception:
+                    # transcribe() reports the error and retries on CPU
+                    pass
+            with span(report, "transcribe") as stage:
+                words = transcribe(audio, model_size=model, device=device,
+                                   compute_type=compute_type, language=language, cpu_threads=threads,
+                                   progress=progress, on_words=captions.feed if captions else None,
+                                   on_restart=captions.reset if captions else None)
+                stage.info["words"] = len(words)
+
+    if cache:
+        cache.put(cache_key, words)
+        log_cache_stats(cache)
+    return words
+
+def transcribe_files(audios: List[Union[Path, np.ndarray]], model: str = "medium", device: str = "auto",
+                     compute_type: str = "default", language: Optional[str] = None,
+                     use_cache: bool = True, options: Optional[BatchedOptions] = None,
+                     report: Optional[RunReport] = None,
+                     progress: Optional[ProgressCallback] = None) -> List[List[Word]]:
+    """Transcribes several inputs in one batched pass (see captions.batched).
+
+    Cached transcripts are reused; only the misses are decoded, together.
+    """
+    options = options or BatchedOptions()
+    # Windows are cut from samples, decode the WAV if we extracted one
+    samples = [load_audio(a) if isinstance(a, Path) else a for a in audios]
+    results: List[Optional[List[Word]]] = [None] * len(samples)
+    cache = TranscriptCache() if use_cache else None
+    keys = []
+    if cache:
+        with span(report, "cache_lookup") as lookup:
+            decoding = f"batched|beam{options.beam_size}"
+            keys = [cache.make_key(hash_audio(a), model, compute_type, language, decoding) for a in samples]
+            results = [cache.get(key) for key in keys]
+            lookup.info["hits"] = sum(r is not None for r in results)
+        if any(r is not None for r in results):
+            log_success(f"Transcript cache hit for {sum(r is not None for r in results)} of {len(results)} input(s).")
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        with whisper_threads(device, options.cpu_threads) as threads:
+            options = BatchedOptions(batch_size=options.batch_size, beam_size=options.beam_size,
+                                     cpu_threads=threads, files=options.files)
+            with span(report, "model_load", model=model, threads=threads):
+                get_model(model, device=device, compute_type=compute_type, cpu_threads=threads)
+            with span(report, "transcribe", batched=True, batch_size=options.batch_size,
+                      beam_size=options.beam_size, files=len(missing)) as stage:
+                decoded = transcribe_batched([samples[i] for i in missing], model_size=model, device=device,
+                                             compute_type=compute_type, language=language,
+                                             options=options, progress=progress)
+                stage.info["words"] = sum(len(w) for w in decoded)
+        for i, words in zip(missing, decoded):
+            results[i] = words
+            if cache:
+                cache.put(keys[i], words)
+        if cache:
+            log_cache_stats(cache)
+    return results
+
+class CaptionStream:
+    """Chunks words as they are transcribed and appends each finished caption to
+    the ASS file of every render, so ASS generation overlaps transcription and
+    a partial ASS file survives a failed run.
+    """
+
+    def __init__(self, renders: List[Tuple[PresetConfig, Path]],
+                 play_res: Optional[Tuple[int, int]] = None):
+        self.renders = renders
+        self.play_res = play_res
+        self.outputs = []
+        self._open()
+
+    def _open(self):
+        self.outputs = []
+        self.segments = 0
+        try:
+            for config, ass_path in self.renders:
+                log_info(f"Writing ASS file at {ass_path} as words are transcribed...")
+                self.outputs.append((config, StreamingChunker(config.chunking),
+                                     AssWriter(ass_path, config, self.play_res)))
+        except BaseException:
+            self.close()
+            raise
+
+    def reset(self):
+        """Drops everything written so far, for a transcription that starts over."""
+        for _, _, writer in self.outputs:
+            writer.close()
+        self._open()
+
+    def feed(self, words: List[Word]):
+        """Words in transcript order, as they are decoded."""
+        for _, chunker, writer in self.outputs:
+            closed = []
+            for word in words:
+                closed.extend(chunker.push(word))
+            writer.write(closed)
+            self.segments += len(closed)
+
+    def write_all(self, words: Union[List[Word], WordTimeline]):
+        """The whole transcript at once (cache hit or long-form), chunked in one pass."""
+        for config, _, writer in self.outputs:
+            segments = chunk_words(words, config.chunking)
+            for i in range(0, len(segments), WRITE_BATCH):
+                writer.write(segments[i:i + WRITE_BATCH])
+            self.segments += len(segments)
+
+    def close(self) -> List[Path]:
+        """Writes the captions still open and closes the files; returns the ASS paths."""
+        for _, chunker, writer in self.outputs:
+            if not writer.file.closed:
+                closed = chunker.flush()
+                writer.write(closed)
+                writer.close()
+                self.segments += len(closed)
+        return [writer.output_path for _, _, writer in self.outputs]
+
+    @property
+    def events(self) -> int:
+        return sum(writer.events for _, _, writer in self.outputs)
+
+def staged_path(path: Path) -> Path:
+    """video_out.ass -> video_out.partial.ass, where an artifact is written before publish()."""
+    return path.with_name(f"{path.stem}.partial{path.suffix}")
+
+def publish(paths: List[Path]):
+    """Moves the staged version of each path over it. os.replace is atomic, so
+    readers see either the old file or the new one, never a partial write."""
+    for path in paths:
+        staged = staged_path(path)
+        if staged.exists():
+            os.replace(staged, path)
+
+def transcript_files(transcript_path: Path) -> List[Path]:
+    """The JSON transcript and the binary timeline save_transcript writes next to it."""
+    return [transcript_path, transcript_path.with_suffix(".words")]
+
+def transcribe_two_pass(audio: Union[Path, np.ndarray], renders: List[Tuple[PresetConfig, Path]],
+                        transcript_path: Path, draft_model: str, model: str = "medium",
+                        device: str = "auto", compute_type: str = "default",
+                        language: Optional[str] = None, use_cache: bool = True,
+                        play_res: Optional[Tuple[int, int]] = None,
+                        report: Optional[RunReport] = None,
+                        progress: Optional[ProgressCallback] = None,
+                        on_draft: Optional[Callable[[List[Word]], None]] = None) -> List[Word]:
+    """Draft captions from a small model first, then the final ones from `model`.
+
+    renders are (config, ASS path). The draft pass writes the transcript and
+    every ASS file, then on_draft(words) runs (e.g. a preview) while the
+    final pass transcribes the same decoded buffer on a background thread.
+    Both passes write under staged names and publish() the finished set, so
+    the files always hold a complete draft or a complete final version.
+    """
+    started = report.started if report else time.perf_counter()
+    # Decode once for both passes, also when the audio was extracted to a WAV
+    samples = load_audio(audio) if isinstance(audio, Path) else audio
+    artifacts = transcript_files(transcript_path) + [ass_path for _, ass_path in renders]
+
+    def run_pass(pass_model: str, pass_report: Optional[RunReport],
+                 pass_progress: Optional[ProgressCallback]) -> List[Word]:
+        try:
+            captions = CaptionStream([(config, staged_path(ass_path)) for config, ass_path in renders],
+                                     play_res)
+            try:
+                words = transcribe_audio(samples, model=pass_model, device=device, compute_type=compute_type,
+                                         language=language, use_cache=use_cache, report=pass_report,
+                                         progress=pass_progress, captions=captions)
+            finally:
+                captions.close()
+            save_transcript(words, staged_path(transcript_path))
+        except BaseException:
+            # The published files stay as they were
+            for path in artifacts:
+                staged_path(path).unlink(missing_ok=True)
+            raise
+        publish(artifacts)
+        return words
+
+    with span(report, "draft", model=draft_model) as stage:
+        # Draft spans stay out of the report so "transcribe" is the final pass
+        draft = run_pass(draft_model, None, None)
+        stage.info["words"] = len(draft)
+    first = time.perf_counter() - started
+    if report:
+        report.set("time_to_first_captions_s", round(first, 3))
+    log_success(f"Draft captions ready after {first:.1f}s ({draft_model}), refining with {model}...")
+    if progress:
+        progress("draft", 1.0)
+
+    stop = threading.Event()
+
+    def final_progress(stage: str, fraction: float):
+        if stop.is_set():
+            raise JobCancelled()
+        if progress:
+            progress(stage, fraction)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="final-pass") as pool:
+        final = pool.submit(run_pass, model, report, final_progress)
+        try:
+            if on_draft:
+                try:
+                    on_draft(draft)
+                except (JobCancelled, KeyboardInterrupt):
+                    raise
+                except Exception as e:
+                    # A failed preview of the draft is no reason to drop the final pass
+                    log_warning(f"Draft callback failed, still waiting for the final captions: {e}")
+            words = final.result()
+        except BaseException:
+            # Stop the final pass at its next segment instead of waiting for it
+            stop.set()
+            raise
+    done = time.perf_counter() - started
+    if report:
+        report.set("time_to_final_s", round(done, 3))
+    log_success(f"Final captions ready after {done:.1f}s, replaced the draft.")
+    return words
+
+def render_captions(words: List[Word], config: PresetConfig, ass_path: Path,
+                    report: Optional[RunReport] = None,
+                    play_res: Optional[Tuple[int, int]] = None) -> Path:
+    """Chunks words into caption segments and writes the ASS file."""
+    with span(report, "chunking") as stage:
+        segments = chunk_words(words, config.chunking)
+        stage.info["segments"] = len(segments)
+    log_info(f"Generated {len(segments)} caption segments.")
+    with span(report, "ass") as stage:
+        stage.info["events"] = generate_ass(segments, config, ass_path, play_res)
+    return ass_path
+
+def render_preview(input_path: Path, words: List[Word], config: PresetConfig, output_path: Path,
+                   options: PreviewOptions, threads: Optional[int] = None,
+                   report: Optional[RunReport] = None,
+                   progress: Optional[ProgressCallback] = None) -> Path:
+    """Burns a short, downscaled preview of the captions to <output>_preview.mp4.
+
+    The preview and its ASS file are written under staged names and moved
+    into place when done, so a preview that is open in a player is only
+    ever swapped for a complete one.
+    """
+    preview_path = preview_path_for(output_path)
+    with span(report, "chunking") as stage:
+        segments = chunk_words(words, config.chunking)
+        stage.info["segments"] = len(segments)
+    start, end = preview_window(options, segments)
+    segments = segments_in_window(segments, start, end)
+    ass_path = ass_path_for(preview_path)
+    with span(report, "ass") as stage:
+        stage.info["events"] = generate_ass(segments, config, staged_path(ass_path), video_play_res(input_path))
+
+    log_info(f"Rendering preview of {start:.1f}s-{end:.1f}s ({len(segments)} caption segments)...")
+
+    def on_progress(values):
+        progress("burn", min(progress_seconds(values) / (end - start), 1.0))
+
+    try:
+        with claim_threads("preview", threads) as threads, \
+                span(report, "preview", start=start, end=end, threads=threads) as stage:
+            cmd = preview_command(input_path, staged_path(ass_path), staged_path(preview_path), start, end,
+                                  options, threads)
+            stage.info.update(run_ffmpeg(cmd, cwd=ass_path.parent,
+                                         on_progress=on_progress if progress else None))
+        publish([ass_path, preview_path])
+    except subprocess.CalledProcessError as e:
+        log_error(f"Failed to render preview: {e}")
+        raise
+    finally:
+        # Only left behind when cancelled or failed, publish() moved them otherwise
+        for path in (ass_path, preview_path):
+            staged_path(path).unlink(missing_ok=True)
+    log_success(f"Preview created: {preview_path}")
+    return preview_path
+
+def video_play_res(input_path: Optional[Path]) -> Tuple[int, int]:
+    """ASS canvas matching the input's aspect ratio; the 9:16 reference if unknown."""
+    size = None
+    if input_path is not None and shutil.which("ffprobe"):
+        try:
+            size = probe_video_size(input_path)
+        except (subprocess.CalledProcessError, ValueError):
+            pass
+    return play_resolution(size)
+
+def burn_subtitles(input_path: Path, ass_path: Path, output_path: Path,
+                   burn_segments: int = 1, threads: Optional[int] = None,
+                   report: Optional[RunReport] = None, progress: Optional[ProgressCallback] = None,
+                   duration: Optional[float] = None, incremental: bool = False):
+    """Burns the ASS file into the video with ffmpeg.
+
+    With burn_segments > 1 the video is split at keyframes and the ranges are
+    encoded in parallel, sharing a total budget of `threads` encoder threads.
+    duration (seconds) turns ffmpeg's position into progress; it is probed
+    when not given.
+
+    With incremental the encoded ranges are kept next to the output, and a
+    re-run only re-encodes the ranges whose captions changed.
+    """
+    log_info("Burning captions into video...")
+    try:
+        with claim_threads("burn", threads) as threads, span(report, "burn", threads=threads) as stage:
+            stats = None
+            if incremental:
+                stats = incremental_burn(input_path, ass_path, output_path, burn_segments, threads, progress)
+            if stats is None:
+                stats = _burn_whole(input_path, ass_path, output_path, burn_segments, threads, progress, duration)
+            stage.info.update(stats)
+    except JobCancelled:
+        # ffmpeg was stopped mid-encode, the output is unusable
+        output_path.unlink(missing_ok=True)
+        raise
+    except subprocess.CalledProcessError as e:
+        log_error(f"Failed to burn subtitles: {e}")
+        raise e
+
+def burn_renders(input_path: Path, targets: List[Tuple[Path, Path]], burn_segments: int = 1,
+                 threads: Optional[int] = None, report: Optional[RunReport] = None,
+                 progress: Optional[ProgressCallback] = None, duration: Optional[float] = None,
+                 incremental: bool = False):
+    """Burns one (ass_path, output_path) target, or several in a single decode."""
+    if len(targets) == 1:
+        ass_path, output_path = targets[0]
+        burn_subtitles(input_path, ass_path, output_path, burn_segments=burn_segments, threads=threads,
+                       report=report, progress=progress, duration=duration, incremental=incremental)
+        return
+    if burn_segments > 1 or incremental:
+        log_warning("Segmented and incremental burns apply to single outputs; "
+                    "burning the preset variants in one pass instead.")
+    burn_fanout(input_path, targets, threads=threads, report=report, progress=progress, duration=duration)
+
+def burn_fanout(input_path: Path, targets: List[Tuple[Path, Path]], threads: Optional[int] = None,
+                report: Optional[RunReport] = None, progress: Optional[ProgressCallback] = None,
+                duration: Optional[float] = None):
+    """Burns several (ass_path, output_path) targets with one ffmpeg run that
+    decodes the source once. Falls back to one burn per target if the ASS
+    paths can't be put in a filter graph.
+    """
+    cwd = targets[0][0].parent
+    if progress and not duration:
+        duration = audio_duration(input_path)
+
+    def on_progress(values):
+        progress("burn", min(progress_seconds(values) / duration, 1.0) if duration else 0.0)
+
+    try:
+        with claim_threads("burn", threads) as claimed:
+            try:
+                cmd = fanout_burn_command(input_path, targets, cwd, claimed)
+            except ValueError as e:
+                log_warning(f"{e}, burning the outputs one at a time.")
+                cmd = None
+            if cmd:
+                log_info(f"Burning captions into {len(targets)} videos in one pass...")
+                with span(report, "burn", outputs=len(targets), threads=claimed) as stage:
+                    stage.info.update(run_ffmpeg(cmd, cwd=cwd, on_progress=on_progress if progress else None))
+    except JobCancelled:
+        for _, output_path in targets:
+            output_path.unlink(missing_ok=True)
+        raise
+    except subprocess.CalledProcessError as e:
+        log_error(f"Failed to burn subtitles: {e}")
+        raise
+
+    if cmd is None:
+        # Outside the claim above, each burn claims its own threads
+        for ass_path, output_path in targets:
+            burn_subtitles(input_path, ass_path, output_path, threads=threads, report=report,
+                           progress=progress, duration=duration)
+        return
+    for _, output_path in targets:
+        log_success(f"Video created: {output_path}")
+
+def _burn_whole(input_path: Path, ass_path: Path, output_path: Path, burn_segments: int,
+                threads: Optional[int], progress: Optional[ProgressCallback],
+                duration: Optional[float]) -> dict:
+    ranges = plan_segmented_burn(input_path, burn_segments)
+    if ranges:
+        return segmented_burn(input_path, ass_path, output_path, ranges, threads, progress)
+
+    if progress and not duration:
+        duration = audio_duration(input_path)
+
+    def on_progress(values):
+        progress("burn", min(progress_seconds(values) / duration, 1.0) if duration else 0.0)
+
+    # Note: We need to re-encode video to burn subtitles.
+    cmd = burn_command(input_path, ass_path, output_path, threads)
+    # Run ffmpeg in the directory of the ass file to avoid escaping issues with full paths in filter
+    stats = run_ffmpeg(cmd, cwd=ass_path.parent, on_progress=on_progress if progress else None)
+    log_success(f"Video created: {output_path}")
+    return stats
+
+def audio_duration(audio: Union[Path, np.ndarray]) -> Optional[float]:
+    """Length of the decoded audio in seconds, or None if it can't be determined."""
+    if isinstance(audio, np.ndarray):
+        return len(audio) / SAMPLE_RATE
+    if shutil.which("ffprobe"):
+        try:
+            return probe_format(audio)["duration"] or None
+        except (subprocess.CalledProcessError, ValueError):
+            pass
+    return None
+
+def transcript_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.stem + "_transcript.json")
+
+def ass_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.stem + ".ass")
+
+def report_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.stem + "_report.json")
@@ -3,7 +3,6 @@ import sys
 from pathlib import Path
 from typing import Optional
 from pydantic import BaseModel, Field
-import yaml
 
 class FontConfig(BaseModel):
     name: str = "Arial"
@@ -47,6 +46,7 @@ class PresetConfig(BaseModel):
     margin_bottom: int = 150
     position: str = "bottom" # "bottom", "middle", "top"
     clean_fillers: bool = False
+    render_mode: str = "words" # "words" (one event per word), "compact" (fewer events, faster burn)
 
 def load_preset(name_or_path: str) -> PresetConfig:
     """Loads a preset from a name (in presets/) or a file path."""
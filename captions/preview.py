@@ -0,0 +1,69 @@
+"""Quick low-resolution previews for trying out presets.
+
+A preview burns only a short window of the video, downscaled and at a lower
+frame rate with the ultrafast x264 preset, so a style change can be checked
+in a few seconds instead of waiting for a full-quality burn.
+"""
+from pathlib import Path
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field
+from .chunking import CaptionSegment
+
+PREVIEW_X264_ARGS = ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "28"]
+
+# Keep the last previewed caption on screen for a moment
+SEGMENT_PADDING = 0.5
+
+class PreviewOptions(BaseModel):
+    start: float = 0.0                                  # Seconds into the video
+    duration: float = Field(10.0, gt=0)                 # Window length, unless segments is set
+    segments: Optional[int] = Field(None, gt=0)         # Preview the first N caption segments after start instead
+    height: int = Field(480, gt=0)                      # Output height; smaller sources are not upscaled
+    fps: float = Field(15.0, gt=0)
+
+def preview_window(options: PreviewOptions, segments: List[CaptionSegment]) -> Tuple[float, float]:
+    """Returns the (start, end) seconds of the source to preview."""
+    start = max(0.0, options.start)
+    if options.segments:
+        upcoming = [seg for seg in segments if seg.end > start][:options.segments]
+        if upcoming:
+            return start, upcoming[-1].end + SEGMENT_PADDING
+    return start, start + options.duration
+
+def segments_in_window(segments: List[CaptionSegment], start: float, end: float) -> List[CaptionSegment]:
+    return [seg for seg in segments if seg.end > start and seg.start < end]
+
+def preview_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.stem + "_preview.mp4")
+
+def preview_command(input_path: Path, ass_path: Path, output_path: Path, start: float, end: float,
+                    options: PreviewOptions, threads: Optional[int] = None) -> List[str]:
+    """ffmpeg command burning [start, end) of the input at preview quality."""
+    # Drop frames and pixels before libass draws on them. The ASS canvas only
+    # has to match the aspect ratio, so the captions scale with the frame.
+    # As in the segmented burn, frames are shifted back to source time for the
+    # ASS file and rebased to 0 afterwards.
+    video_filter = ",".join([
+        f"fps={options.fps:g}",
+        f"scale=-2:'min({options.height},ih)'",
+        f"setpts=PTS+{start:.6f}/TB",
+        f"ass={ass_path.name}",
+        "setpts=PTS-STARTPTS",
+    ])
+    cmd = ["ffmpeg", "-y", "-v", "error"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.6f}"]
+    cmd += [
+        "-i", str(input_path.resolve()),
+        "-t", f"{end - start:.6f}",
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", video_filter,
+        # The setpts after fps drops the frame rate, pin it so the muxer doesn't duplicate frames
+        "-r", f"{options.fps:g}",
+        *PREVIEW_X264_ARGS,
+        "-c:a", "aac", "-b:a", "96k",
+    ]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd.append(str(output_path.resolve()))
+    return cmd
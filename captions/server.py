@@ -0,0 +1,182 @@
+"""Local HTTP job server.
+
+Keeps one process (and its warm Whisper models) alive and runs captioning
+jobs from a bounded queue. Listens on localhost only; there is no
+authentication, so don't expose it to a network.
+
+    POST /jobs               submit {"input": ..., "output", "preset", "style", "variants", ...}
+                             202 with the job, 429 when the queue is full
+    GET  /jobs               all known jobs
+    GET  /jobs/<id>          one job with status, stage and progress
+    POST /jobs/<id>/cancel   cancel a queued or running job (DELETE /jobs/<id> works too)
+    GET  /health             worker and queue counts, loaded models
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from .jobs import FINISHED, Job, JobQueue, QueueFull
+from .models import get_registry
+from .utils import log_info
+
+# Request field -> process_video keyword argument
+JOB_FIELDS = {
+    "input": "input_file",
+    "output": "output_file",
+    "preset": "preset",
+    "style": "style_options",
+    "model": "model",
+    "device": "device",
+    "compute_type": "compute_type",
+    "language": "language",
+    "dry_run": "dry_run",
+    "long_form": "long_form",
+    "burn_segments": "burn_segments",
+    "threads": "threads",
+    "use_cache": "use_cache",
+    "variants": "variants",
+    "draft_model": "draft_model",
+}
+
+VARIANT_FIELDS = {"preset", "output", "style"}
+
+RETRY_AFTER_SECONDS = 5
+MAX_BODY_BYTES = 1024 * 1024
+
+def parse_job(body: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Validates a submission and maps it onto process_video arguments."""
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object")
+    unknown = sorted(set(body) - set(JOB_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if not body.get("input"):
+        raise ValueError("'input' is required")
+    if not Path(body["input"]).exists():
+        raise ValueError(f"Input file not found: {body['input']}")
+    if "style" in body and not isinstance(body["style"], dict):
+        raise ValueError("'style' must be an object")
+    for variant in body.get("variants") or []:
+        if not isinstance(variant, dict) or not variant.get("preset"):
+            raise ValueError("Each of 'variants' must be an object with a 'preset'")
+        unknown = sorted(set(variant) - VARIANT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown variant fields: {', '.join(unknown)}")
+        if "style" in variant and not isinstance(variant["style"], dict):
+            raise ValueError("A variant's 'style' must be an object")
+
+    params = dict(defaults)
+    for field, value in body.items():
+        params[JOB_FIELDS[field]] = value
+    return params
+
+class JobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, jobs: JobQueue, defaults: Dict[str, Any]):
+        super().__init__(address, JobRequestHandler)
+        self.jobs = jobs
+        self.defaults = defaults
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    server: JobServer
+
+    def log_message(self, format, *args):
+        # Route access logs through our logger instead of stderr
+        log_info(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status: int, data: Any, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_json(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        self.send_json(status, {"error": message}, headers)
+
+    def path_parts(self):
+        return [p for p in self.path.split("?")[0].split("/") if p]
+
+    def find_job(self, job_id: str) -> Optional[Job]:
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            self.send_error_json(404, f"No job {job_id}")
+        return job
+
+    def do_GET(self):
+        parts = self.path_parts()
+        if parts == ["health"]:
+            stats = self.server.jobs.stats()
+            stats["models"] = [list(key) for key in get_registry().loaded()]
+            self.send_json(200, stats)
+        elif parts == ["jobs"]:
+            self.send_json(200, [job.to_dict() for job in self.server.jobs.list()])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job:
+                self.send_json(200, job.to_dict())
+        else:
+            self.send_error_json(404, "Not found")
+
+    def do_POST(self):
+        parts = self.path_parts()
+        if parts == ["jobs"]:
+            self.submit()
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            self.cancel(parts[1])
+        else:
+            self.send_error_json(404, "Not found")
+
+    def do_DELETE(self):
+        parts = self.path_parts()
+        if len(parts) == 2 and parts[0] == "jobs":
+            self.cancel(parts[1])
+        else:
+            self.send_error_json(404, "Not found")
+
+    def submit(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.send_error_json(413, "Request body too large")
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            params = parse_job(body, self.server.defaults)
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+        try:
+            job = self.server.jobs.submit(params)
+        except QueueFull as e:
+            self.send_error_json(429, str(e), {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+        self.send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+    def cancel(self, job_id: str):
+        job = self.find_job(job_id)
+        if job is None:
+            return
+        if job.status in FINISHED:
+            self.send_error_json(409, f"Job {job_id} already {job.status}")
+            return
+        job.cancel()
+        self.send_json(202, job.to_dict())
+
+def serve(runner: Callable[[Job], None], host: str = "127.0.0.1", port: int = 8765,
+          workers: int = 1, max_queued: int = 16, defaults: Optional[Dict[str, Any]] = None):
+    """Runs the job server until interrupted."""
+    jobs = JobQueue(runner, workers=workers, max_queued=max_queued)
+    server = JobServer((host, port), jobs, defaults or {})
+    log_info(f"Job server listening on http://{host}:{server.server_port} "
+             f"({workers} worker(s), up to {max_queued} queued jobs)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log_info("Shutting down job server...")
+    finally:
+        server.server_close()
+        jobs.shutdown()
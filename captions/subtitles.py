@@ -0,0 +1,98 @@
+"""Incremental caption writers for SRT and WebVTT, alongside the ASS writer.
+
+All writers share AssWriter's interface: write(segments) appends the cues of
+closed caption segments and flushes, close() ends the file. SRT and WebVTT
+carry plain text (one cue per segment, lines as chosen by the chunker); the
+word highlighting only exists in ASS.
+"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Tuple
+from .ass_renderer import AssWriter
+from .chunking import CaptionSegment
+from .presets import PresetConfig
+
+def _clock(seconds: float, separator: str) -> str:
+    millis = int(round(max(seconds, 0.0) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def format_srt_time(seconds: float) -> str:
+    """HH:MM:SS,mmm"""
+    return _clock(seconds, ",")
+
+def format_vtt_time(seconds: float) -> str:
+    """HH:MM:SS.mmm"""
+    return _clock(seconds, ".")
+
+def segment_text(seg: CaptionSegment) -> str:
+    return "\n".join(" ".join(seg.timeline.texts(a, b)) for a, b in seg.line_ranges())
+
+class TextCaptionWriter(ABC):
+    """Base for the plain-text formats: one numbered cue per segment."""
+
+    header = ""
+
+    def __init__(self, output_path: Path):
+        self.output_path = output_path
+        self.events = 0
+        self.file = open(output_path, "w", encoding="utf-8")
+        if self.header:
+            self.file.write(self.header)
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    @abstractmethod
+    def format_cue(self, index: int, seg: CaptionSegment) -> str:
+        """The text of cue number index (from 1), ending in a blank line."""
+
+    def write(self, segments: List[CaptionSegment]) -> int:
+        cues = []
+        for seg in segments:
+            self.events += 1
+            cues.append(self.format_cue(self.events, seg))
+        if cues:
+            self.file.write("".join(cues))
+            self.file.flush()
+        return len(cues)
+
+class SrtWriter(TextCaptionWriter):
+    def format_cue(self, index: int, seg: CaptionSegment) -> str:
+        return (f"{index}\n{format_srt_time(seg.start)} --> {format_srt_time(seg.end)}\n"
+                f"{segment_text(seg)}\n\n")
+
+class VttWriter(TextCaptionWriter):
+    header = "WEBVTT\n\n"
+
+    def format_cue(self, index: int, seg: CaptionSegment) -> str:
+        return (f"{index}\n{format_vtt_time(seg.start)} --> {format_vtt_time(seg.end)}\n"
+                f"{segment_text(seg)}\n\n")
+
+CAPTION_FORMATS = ("ass", "srt", "vtt")
+
+def check_caption_format(output_path: Path):
+    """Raises ValueError unless the extension is a supported caption format."""
+    if output_path.suffix.lower().lstrip(".") not in CAPTION_FORMATS:
+        raise ValueError(f"Unsupported caption format '{output_path.suffix}', use one of: "
+                         f"{', '.join('.' + f for f in CAPTION_FORMATS)}")
+
+def open_caption_writer(output_path: Path, config: PresetConfig,
+                        play_res: Optional[Tuple[int, int]] = None):
+    """Opens the writer matching the file extension (.ass, .srt or .vtt)."""
+    check_caption_format(output_path)
+    suffix = output_path.suffix.lower().lstrip(".")
+    if suffix == "ass":
+        return AssWriter(output_path, config, play_res)
+    if suffix == "srt":
+        return SrtWriter(output_path)
+    return VttWriter(output_path)
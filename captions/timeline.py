@@ -0,0 +1,151 @@
+import struct
+from pathlib import Path
+from typing import Iterable, Iterator, List, Union
+import numpy as np
+from .asr import Word
+
+# File layout (little endian):
+#   magic (8 bytes) | word count (u64) | text bytes (u64)
+#   starts  float64[n]
+#   ends    float64[n]
+#   offsets int64[n + 1]   byte offsets into the text buffer
+#   probs   float32[n]
+#   text    utf-8 bytes, words concatenated without separators
+MAGIC = b"CAPWORD1"
+HEADER = struct.Struct("<8sQQ")
+
+PUNCTUATION_BYTES = np.frombuffer(b".?!,;:", dtype=np.uint8)
+
+class WordTimeline:
+    """Columnar word timeline: timings and probabilities in NumPy arrays and
+    the words in one UTF-8 buffer indexed by offsets.
+
+    Indexing returns a Word for compatibility, but chunking and ASS generation
+    read the columns directly so long transcripts never become one Python
+    object per word.
+    """
+
+    __slots__ = ("starts", "ends", "probabilities", "offsets", "text")
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, probabilities: np.ndarray,
+                 offsets: np.ndarray, text: Union[bytes, np.ndarray]):
+        self.starts = starts
+        self.ends = ends
+        self.probabilities = probabilities
+        self.offsets = offsets
+        # bytes, or a uint8 array when memory-mapped
+        self.text = text
+
+    @classmethod
+    def from_words(cls, words: Iterable[Word]) -> "WordTimeline":
+        if isinstance(words, WordTimeline):
+            return words
+        words = list(words)
+        encoded = [w.word.encode("utf-8") for w in words]
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(
+            np.fromiter((w.start for w in words), dtype=np.float64, count=len(words)),
+            np.fromiter((w.end for w in words), dtype=np.float64, count=len(words)),
+            np.fromiter((w.probability for w in words), dtype=np.float32, count=len(words)),
+            offsets,
+            b"".join(encoded),
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def word(self, i: int) -> str:
+        """Returns the text of word i without building a Word."""
+        return bytes(self.text[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def texts(self, i: int = 0, j: int = None) -> List[str]:
+        """Returns the texts of words[i:j], decoding the buffer once."""
+        j = len(self) if j is None else j
+        if i >= j:
+            return []
+        base = int(self.offsets[i])
+        chunk = bytes(self.text[base:int(self.offsets[j])])
+        bounds = (self.offsets[i:j + 1] - base).tolist()
+        return [chunk[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+
+    def char_lengths(self) -> np.ndarray:
+        """Returns the length of every word in characters (not bytes)."""
+        buffer = np.frombuffer(self.text, dtype=np.uint8) if isinstance(self.text, bytes) else self.text
+        # Count UTF-8 lead bytes, i.e. everything except 10xxxxxx continuation bytes
+        leads = np.zeros(len(buffer) + 1, dtype=np.int64)
+        np.cumsum((buffer & 0xC0) != 0x80, out=leads[1:])
+        return leads[self.offsets[1:]] - leads[self.offsets[:-1]]
+
+    def ends_with_punctuation(self) -> np.ndarray:
+        """Returns a bool array, True where a word ends with . ? ! , ; or :"""
+        buffer = np.frombuffer(self.text, dtype=np.uint8) if isinstance(self.text, bytes) else self.text
+        result = np.zeros(len(self), dtype=bool)
+        non_empty = self.offsets[1:] > self.offsets[:-1]
+        last_bytes = buffer[self.offsets[1:][non_empty] - 1]
+        result[non_empty] = np.isin(last_bytes, PUNCTUATION_BYTES)
+        return result
+
+    def __getitem__(self, i: int) -> Word:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("word index out of range")
+        return Word(self.word(i), float(self.starts[i]), float(self.ends[i]), float(self.probabilities[i]))
+
+    def __iter__(self) -> Iterator[Word]:
+        starts = self.starts.tolist()
+        ends = self.ends.tolist()
+        probabilities = self.probabilities.tolist()
+        for i, text in enumerate(self.texts()):
+            yield Word(text, starts[i], ends[i], probabilities[i])
+
+    def to_words(self) -> List[Word]:
+        return list(self)
+
+    def save(self, path: Path):
+        """Writes the compact binary format."""
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self), len(self.text)))
+            f.write(np.ascontiguousarray(self.starts, dtype="<f8").tobytes())
+            f.write(np.ascontiguousarray(self.ends, dtype="<f8").tobytes())
+            f.write(np.ascontiguousarray(self.offsets, dtype="<i8").tobytes())
+            f.write(np.ascontiguousarray(self.probabilities, dtype="<f4").tobytes())
+            f.write(bytes(self.text))
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "WordTimeline":
+        """Reads the binary format. With mmap the columns are views on the file."""
+        with open(path, "rb") as f:
+            magic, count, text_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a word timeline file")
+
+        if mmap:
+            data = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            data = np.fromfile(path, dtype=np.uint8)
+
+        pos = HEADER.size
+        def take(dtype, n):
+            nonlocal pos
+            size = np.dtype(dtype).itemsize * n
+            column = data[pos:pos + size].view(dtype)
+            pos += size
+            return column
+
+        starts = take("<f8", count)
+        ends = take("<f8", count)
+        offsets = take("<i8", count + 1)
+        probabilities = take("<f4", count)
+        text = data[pos:pos + text_size]
+        if len(text) != text_size:
+            raise ValueError(f"{path} is truncated")
+        return cls(starts, ends, probabilities, offsets, text)
+
+def is_timeline_file(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
@@ -2,11 +2,20 @@ import logging
 import shutil
 import sys
 from pathlib import Path
+from typing import Callable
 from colorama import Fore, Style, init
 
 # Initialize colorama
 init(autoreset=True)
 
+# Progress callbacks receive the stage name ("extract", "transcribe", "render",
+# "burn") and the fraction of that stage done. Raising JobCancelled from the
+# callback aborts the job; running ffmpeg processes are terminated.
+ProgressCallback = Callable[[str, float], None]
+
+class JobCancelled(Exception):
+    """Raised from a progress callback to abort a running job."""
+
 def setup_logging():
     """Configures logging with colored output."""
     logging.basicConfig(
@@ -0,0 +1,303 @@
+"""Work sharing between processes and machines through a shared job directory.
+
+Every job is a folder in the queue directory:
+
+    <queue>/<job id>/job.json       the submission (same fields as the job server)
+    <queue>/<job id>/lease.<n>      who is working on it; its mtime is the heartbeat
+    <queue>/<job id>/attempts.log   one line per claim
+    <queue>/<job id>/result.json    written once the job is done, failed or given up
+    <queue>/<job id>/<stem>_out.*   the video, transcript, ASS files and run report
+
+Leases are numbered and the highest one holds the job. A worker claims a
+job by creating the next lease (lease.1 for a new job) with O_CREAT | O_EXCL,
+so exactly one process wins, and touches it every few seconds while the job
+runs. A lease that hasn't been touched for lease_seconds belongs to a
+worker that died, and the job can be claimed again by creating the lease
+after it. Leases are never removed or renamed, so no two workers can hold
+the same number. A worker that finds a newer lease than its own stops its
+job at the next progress update, so a worker that was paused for longer
+than the lease (a suspended VM) may briefly write alongside the new owner;
+keep lease_seconds well above any pause you expect. Any filesystem with
+atomic O_EXCL create and rename works: a local directory, or NFS v3+/SMB
+shared by several machines with synchronised clocks.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .server import parse_job
+from .utils import JobCancelled, ProgressCallback, log_error, log_info, log_success, log_warning
+
+JOB_FILE = "job.json"
+LEASE_FILE = "lease"
+ATTEMPTS_FILE = "attempts.log"
+RESULT_FILE = "result.json"
+
+LEASE_SECONDS = 120.0
+HEARTBEAT_SECONDS = 10.0
+POLL_SECONDS = 5.0
+MAX_ATTEMPTS = 3
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def write_json_atomic(path: Path, data: Any):
+    """Writes JSON next to path and renames it into place."""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def submit_job(queue_dir: Path, body: Dict[str, Any]) -> Path:
+    """Adds a job to the queue; returns its folder.
+
+    body holds job server fields. The input is stored as an absolute path,
+    which every worker has to be able to open. Relative outputs are placed
+    in the job folder.
+    """
+    body = dict(body)
+    body["input"] = str(Path(body["input"]).resolve())
+    parse_job(body, {})
+    # Folder names sort in submission order
+    job_dir = Path(queue_dir) / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+    job_dir.mkdir(parents=True)
+    # Workers skip folders without a job.json, so it is written last and atomically
+    write_json_atomic(job_dir / JOB_FILE, body)
+    return job_dir
+
+def lease_path(job_dir: Path, generation: int) -> Path:
+    return job_dir / f"{LEASE_FILE}.{generation}"
+
+def latest_lease(job_dir: Path) -> Tuple[int, Optional[Path]]:
+    """The highest lease generation in a job folder and its file; (0, None) without one."""
+    generation, path = 0, None
+    for candidate in job_dir.glob(f"{LEASE_FILE}.*"):
+        number = candidate.name[len(LEASE_FILE) + 1:]
+        if number.isdigit() and int(number) > generation:
+            generation, path = int(number), candidate
+    return generation, path
+
+def lease_expired(path: Path, lease_seconds: float = LEASE_SECONDS) -> bool:
+    try:
+        return time.time() - path.stat().st_mtime >= lease_seconds
+    except FileNotFoundError:
+        return True
+
+class Lease:
+    """A claim on one job folder: generation N of its lease files, identified
+    by a random token. The highest generation holds the job."""
+
+    def __init__(self, job_dir: Path, generation: int, worker: str, token: str):
+        self.job_dir = job_dir
+        self.generation = generation
+        self.path = lease_path(job_dir, generation)
+        self.worker = worker
+        self.token = token
+
+    @classmethod
+    def acquire(cls, job_dir: Path, worker: str, lease_seconds: float = LEASE_SECONDS) -> Optional["Lease"]:
+        """Claims the job unless a live lease holds it; None if another worker has it."""
+        generation, current = latest_lease(job_dir)
+        previous = None
+        if current is not None:
+            if not lease_expired(current, lease_seconds):
+                return None
+            previous = current
+        token = uuid.uuid4().hex
+        # Of all the workers that saw the same lease expire, exactly one creates the next one
+        try:
+            fd = os.open(lease_path(job_dir, generation + 1), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"worker": worker, "token": token, "acquired": time.time()}, f)
+        lease = cls(job_dir, generation + 1, worker, token)
+        if not lease.held():
+            # A slow claim on an old generation, overtaken by a newer lease
+            return None
+        if previous is not None and previous.stat().st_mtime > 0:
+            # Released leases are dated to the epoch; anything else belonged to a worker that stopped
+            log_warning(f"Took over expired lease of {job_dir.name} from {_lease_owner(previous) or 'an unknown worker'}")
+        return lease
+
+    def held(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                if json.load(f).get("token") != self.token:
+                    return False
+        except (OSError, ValueError):
+            return False
+        return latest_lease(self.job_dir)[0] == self.generation
+
+    def heartbeat(self) -> bool:
+        """Renews the lease; False once it was lost to another worker."""
+        if not self.held():
+            return False
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self):
+        """Expires the lease so the next worker can claim the job at once.
+
+        The file stays, so generations keep counting up and a lease is never
+        created twice.
+        """
+        if self.held():
+            os.utime(self.path, (0, 0))
+
+def _lease_owner(path: Path) -> Optional[str]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("worker")
+    except (OSError, ValueError):
+        return None
+
+def pending_jobs(queue_dir: Path) -> List[Path]:
+    """Job folders without a result, oldest first."""
+    if not queue_dir.is_dir():
+        return []
+    return sorted(d for d in queue_dir.iterdir()
+                  if d.is_dir() and (d / JOB_FILE).exists() and not (d / RESULT_FILE).exists())
+
+def queue_status(queue_dir: Path) -> Dict[str, int]:
+    """Counts of queued, running and finished jobs by result status."""
+    counts: Dict[str, int] = {}
+    for job_dir in sorted(queue_dir.iterdir()) if queue_dir.is_dir() else []:
+        if not (job_dir / JOB_FILE).exists():
+            continue
+        if (job_dir / RESULT_FILE).exists():
+            try:
+                status = json.loads((job_dir / RESULT_FILE).read_text(encoding="utf-8")).get("status", "done")
+            except (OSError, ValueError):
+                status = "done"
+        else:
+            _, lease = latest_lease(job_dir)
+            status = "running" if lease and not lease_expired(lease) else "queued"
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+class QueueWorker:
+    """Claims jobs from a queue directory one at a time and runs them.
+
+    runner(params, progress) does the work with process_video arguments;
+    params come from job.json on top of the worker's defaults, with the
+    output placed in the job folder unless the job names one.
+    """
+
+    def __init__(self, queue_dir: Path, runner: Callable[[Dict[str, Any], ProgressCallback], None],
+                 defaults: Optional[Dict[str, Any]] = None, lease_seconds: float = LEASE_SECONDS,
+                 heartbeat_seconds: float = HEARTBEAT_SECONDS, poll_seconds: float = POLL_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.queue_dir = Path(queue_dir)
+        self.runner = runner
+        self.defaults = defaults or {}
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = min(heartbeat_seconds, lease_seconds / 3)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.worker = worker_id()
+        self.processed = 0
+
+    def claim(self) -> Optional[Lease]:
+        for job_dir in pending_jobs(self.queue_dir):
+            lease = Lease.acquire(job_dir, self.worker, self.lease_seconds)
+            # Another worker may have finished it between the listing and the claim
+            if lease and (job_dir / RESULT_FILE).exists():
+                lease.release()
+                continue
+            if lease:
+                return lease
+        return None
+
+    def run(self, drain: bool = False):
+        """Processes jobs until interrupted, or until none is left with drain."""
+        counts = queue_status(self.queue_dir)
+        log_info(f"Worker {self.worker} watching {self.queue_dir} "
+                 f"({', '.join(f'{n} {s}' for s, n in counts.items()) or 'empty'})")
+        while True:
+            lease = self.claim()
+            if lease is None:
+                if drain and not pending_jobs(self.queue_dir):
+                    break
+                time.sleep(self.poll_seconds)
+                continue
+            self.run_job(lease)
+        log_info(f"Worker {self.worker} done, {self.processed} job(s) processed")
+
+    def run_job(self, lease: Lease):
+        job_dir = lease.job_dir
+        with open(job_dir / ATTEMPTS_FILE, "a", encoding="utf-8") as f:
+            f.write(f"{time.time():.3f} {self.worker}\n")
+        attempts = len((job_dir / ATTEMPTS_FILE).read_text(encoding="utf-8").splitlines())
+        result = {"worker": self.worker, "attempt": attempts, "started": time.time()}
+        if attempts > self.max_attempts:
+            log_error(f"[{job_dir.name}] Giving up after {attempts - 1} attempts")
+            self._finish(lease, dict(result, status="failed",
+                                     error=f"Gave up after {attempts - 1} attempts"))
+            return
+
+        lost = threading.Event()
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(self.heartbeat_seconds):
+                if not lease.heartbeat():
+                    lost.set()
+                    return
+
+        def progress(stage: str, fraction: float):
+            if lost.is_set():
+                raise JobCancelled(f"Lease on {job_dir.name} lost")
+
+        beat = threading.Thread(target=heartbeat, name=f"lease-{job_dir.name}", daemon=True)
+        beat.start()
+        try:
+            with open(job_dir / JOB_FILE, "r", encoding="utf-8") as f:
+                body = json.load(f)
+            # Relative paths in a job are relative to its folder
+            body["input"] = str(job_dir / body["input"])
+            body.setdefault("output", f"{Path(body['input']).stem}_out.mp4")
+            body["output"] = str(job_dir / body["output"])
+            params = parse_job(body, self.defaults)
+            result["output"] = params["output_file"]
+            log_info(f"[{job_dir.name}] Claimed {params['input_file']} (attempt {attempts})")
+            self.runner(params, progress)
+            result["status"] = "done"
+        except KeyboardInterrupt:
+            # Let another worker take it right away instead of waiting for the lease to expire
+            stopped.set()
+            lease.release()
+            raise
+        except JobCancelled:
+            stopped.set()
+            log_warning(f"[{job_dir.name}] Lost the lease, stopped; another worker has the job")
+            return
+        except BaseException as e:
+            # SystemExit included: check_ffmpeg exits when ffmpeg is missing
+            result["status"] = "failed"
+            result["error"] = str(e) or type(e).__name__
+        finally:
+            stopped.set()
+            beat.join()
+        if not lease.held():
+            log_warning(f"[{job_dir.name}] Lease lost before the result was written, dropping it")
+            return
+        self._finish(lease, result)
+
+    def _finish(self, lease: Lease, result: Dict[str, Any]):
+        result["finished"] = time.time()
+        result["elapsed_s"] = round(result["finished"] - result["started"], 3)
+        write_json_atomic(lease.job_dir / RESULT_FILE, result)
+        lease.release()
+        self.processed += 1
+        if result["status"] == "done":
+            log_success(f"[{lease.job_dir.name}] Done in {result['elapsed_s']:.1f}s")
+        else:
+            log_error(f"[{lease.job_dir.name}] Failed: {result.get('error')}")
@@ -1,13 +1,23 @@
 import customtkinter as ctk
-import threading
+import multiprocessing
 import logging
 import sys
 import os
 import subprocess
+import time
 from pathlib import Path
 from tkinter import filedialog, colorchooser
-from main import process_video
-from captions.utils import setup_logging
+from main import process_video, render_transcript
+from captions.cpu import configure_cpu_budget
+from captions.jobs import FINISHED, JobQueue, QueueFull
+from captions.models import get_registry
+from captions.utils import JobCancelled, setup_logging
+
+# How long closing the window waits for running jobs to stop
+CLOSE_TIMEOUT_SECONDS = 30.0
+
+# Option menu entry that leaves the preset's own setting alone
+PRESET_DEFAULT = "Preset default"
 
 # Configure CustomTkinter
 ctk.set_appearance_mode("Dark")
@@ -41,9 +51,11 @@ class App(ctk.CTk):
         self.tabview.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
         self.tabview.add("General")
         self.tabview.add("Style")
+        self.tabview.add("Queue")
         
         self.setup_general_tab()
         self.setup_style_tab()
+        self.setup_queue_tab()
 
         # Log Output (Bottom)
         self.log_frame = ctk.CTkFrame(self)
@@ -62,6 +74,12 @@ class App(ctk.CTk):
         
         self.last_output_path = None
 
+        # Jobs run on worker threads; the UI polls their progress
+        self.jobs = JobQueue(self.run_job, workers=1, max_queued=100)
+        self.job_rows = {}
+        self.after(300, self.refresh_queue)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def setup_general_tab(self):
         tab = self.tabview.tab("General")
         tab.grid_columnconfigure(0, weight=1)
@@ -86,10 +104,20 @@ class App(ctk.CTk):
         self.output_entry.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
         ctk.CTkButton(self.output_frame, text="Save As", command=self.browse_output).grid(row=0, column=2, padx=10, pady=10)
 
+        # Transcript (Optional, render-only mode)
+        self.transcript_frame = ctk.CTkFrame(tab)
+        self.transcript_frame.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
+        self.transcript_frame.grid_columnconfigure(1, weight=1)
+
+        ctk.CTkLabel(self.transcript_frame, text="Transcript:").grid(row=0, column=0, padx=10, pady=10)
+        self.transcript_entry = ctk.CTkEntry(self.transcript_frame, placeholder_text="Optional: re-render from a _transcript.json (skips Whisper)")
+        self.transcript_entry.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
+        ctk.CTkButton(self.transcript_frame, text="Browse", command=self.browse_transcript).grid(row=0, column=2, padx=10, pady=10)
+
         # Options Grid
         self.options_frame = ctk.CTkFrame(tab)
-        self.options_frame.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
-        self.options_frame.grid_columnconfigure((0, 1, 2), weight=1)
+        self.options_frame.grid(row=3, column=0, padx=10, pady=10, sticky="ew")
+        self.options_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
 
         # Preset
         ctk.CTkLabel(self.options_frame, text="Preset:").grid(row=0, column=0, padx=10, pady=(10, 0))
@@ -107,18 +135,24 @@ class App(ctk.CTk):
         self.device_option = ctk.CTkOptionMenu(self.options_frame, values=["auto", "cpu", "cuda"])
         self.device_option.grid(row=1, column=2, padx=10, pady=(0, 10))
 
+        # Parallel Jobs
+        ctk.CTkLabel(self.options_frame, text="Parallel Jobs:").grid(row=0, column=3, padx=10, pady=(10, 0))
+        self.parallel_option = ctk.CTkOptionMenu(self.options_frame, values=["1", "2", "3", "4"],
+                                                 command=self.set_parallel_jobs)
+        self.parallel_option.grid(row=1, column=3, padx=10, pady=(0, 10))
+
         # Checkboxes
         self.dry_run_var = ctk.BooleanVar(value=False)
         self.dry_run_check = ctk.CTkCheckBox(tab, text="Dry Run (No Burn-in)", variable=self.dry_run_var)
-        self.dry_run_check.grid(row=3, column=0, padx=20, pady=10)
+        self.dry_run_check.grid(row=4, column=0, padx=20, pady=10)
 
         # Action Buttons
         self.action_frame = ctk.CTkFrame(tab, fg_color="transparent")
-        self.action_frame.grid(row=4, column=0, padx=10, pady=20, sticky="ew")
+        self.action_frame.grid(row=5, column=0, padx=10, pady=20, sticky="ew")
         self.action_frame.grid_columnconfigure(0, weight=1)
         self.action_frame.grid_columnconfigure(1, weight=1)
 
-        self.start_btn = ctk.CTkButton(self.action_frame, text="Start Processing", command=self.start_processing, height=40, font=("Arial", 16, "bold"))
+        self.start_btn = ctk.CTkButton(self.action_frame, text="Add to Queue", command=self.start_processing, height=40, font=("Arial", 16, "bold"))
         self.start_btn.grid(row=0, column=0, padx=10, sticky="ew")
 
         self.open_folder_btn = ctk.CTkButton(self.action_frame, text="Open Output Folder", command=self.open_output_folder, height=40, state="disabled")
@@ -147,6 +181,12 @@ class App(ctk.CTk):
         self.position_option.set("Bottom")
         self.position_option.grid(row=2, column=1, padx=10, pady=10, sticky="ew")
 
+        # Render Mode
+        ctk.CTkLabel(self.font_frame, text="Render Mode:").grid(row=3, column=0, padx=10, pady=10)
+        self.render_mode_option = ctk.CTkOptionMenu(self.font_frame, values=[PRESET_DEFAULT, "Words", "Compact"])
+        self.render_mode_option.set(PRESET_DEFAULT)
+        self.render_mode_option.grid(row=3, column=1, padx=10, pady=10, sticky="ew")
+
         # Colors
         self.color_frame = ctk.CTkFrame(tab)
         self.color_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
@@ -171,6 +211,89 @@ class App(ctk.CTk):
         create_color_row(2, "Highlight Text Color:", "highlight_text_color")
         create_color_row(3, "Outline Color:", "outline_color")
 
+    def setup_queue_tab(self):
+        tab = self.tabview.tab("Queue")
+        tab.grid_columnconfigure(0, weight=1)
+        tab.grid_rowconfigure(1, weight=1)
+
+        ctk.CTkButton(tab, text="Clear Finished", command=self.clear_finished).grid(row=0, column=0, padx=10, pady=10, sticky="e")
+
+        self.queue_frame = ctk.CTkScrollableFrame(tab)
+        self.queue_frame.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="nsew")
+        self.queue_frame.grid_columnconfigure(0, weight=1)
+
+    def add_job_row(self, job):
+        name = Path(job.params.get("input_file") or job.params.get("transcript_file") or "").name
+        row = ctk.CTkFrame(self.queue_frame)
+        row.grid(row=len(self.job_rows), column=0, padx=5, pady=5, sticky="ew")
+        row.grid_columnconfigure(1, weight=1)
+
+        ctk.CTkLabel(row, text=f"#{job.id} {name}", anchor="w").grid(row=0, column=0, padx=10, pady=(5, 0), sticky="w")
+        status = ctk.CTkLabel(row, text=job.status, anchor="e")
+        status.grid(row=0, column=1, padx=10, pady=(5, 0), sticky="e")
+        bar = ctk.CTkProgressBar(row)
+        bar.set(0)
+        bar.grid(row=1, column=0, columnspan=2, padx=10, pady=(0, 8), sticky="ew")
+        cancel = ctk.CTkButton(row, text="Cancel", width=70, command=lambda: self.cancel_job(job))
+        cancel.grid(row=0, column=2, rowspan=2, padx=10, pady=5)
+        self.job_rows[job.id] = (row, status, bar, cancel)
+
+    def refresh_queue(self):
+        """Mirrors job state into the queue tab; runs on the Tk thread."""
+        for job in self.jobs.list():
+            if job.id not in self.job_rows:
+                self.add_job_row(job)
+            _, status, bar, cancel = self.job_rows[job.id]
+            text = job.status
+            if job.status == "running" and job.stage:
+                text = f"{job.stage} {job.progress:.0%}"
+            elif job.status == "failed" and job.error:
+                text = f"failed: {job.error[:60]}"
+            elif job.status == "running" and job.cancelled:
+                text = "cancelling..."
+            status.configure(text=text)
+            bar.set(job.progress)
+            if job.status in FINISHED or job.cancelled:
+                cancel.configure(state="disabled")
+        self.after(300, self.refresh_queue)
+
+    def cancel_job(self, job):
+        job.cancel()
+        self.log(f"Cancelling job #{job.id}...")
+
+    def clear_finished(self):
+        self.jobs.forget_finished()
+        remaining = {job.id for job in self.jobs.list()}
+        for job_id in list(self.job_rows):
+            if job_id not in remaining:
+                self.job_rows.pop(job_id)[0].destroy()
+        for index, (row, _, _, _) in enumerate(self.job_rows.values()):
+            row.grid(row=index)
+
+    def set_parallel_jobs(self, value):
+        self.jobs.resize(int(value))
+        # Models of the next jobs get their share of the CPU threads
+        configure_cpu_budget(jobs=int(value))
+        self.log(f"Running up to {value} job(s) at a time.")
+
+    def on_close(self):
+        # Stop running jobs so their ffmpeg processes don't outlive the window.
+        # Cancelling takes effect at a job's next progress update, which also
+        # terminates its ffmpeg; the worker threads are daemons and die with the
+        # interpreter, so keep it alive (window hidden) until they got there.
+        for job in self.jobs.list():
+            job.cancel()
+        self.withdraw()
+        self.close_deadline = time.monotonic() + CLOSE_TIMEOUT_SECONDS
+        self.finish_close()
+
+    def finish_close(self):
+        running = [job for job in self.jobs.list() if job.status == "running"]
+        if running and time.monotonic() < self.close_deadline:
+            self.after(200, self.finish_close)
+            return
+        self.destroy()
+
     def pick_color(self, entry_widget):
         color = colorchooser.askcolor(title="Choose Color")
         if color[1]: # Hex code
@@ -190,6 +313,12 @@ class App(ctk.CTk):
             self.input_entry.delete(0, "end")
             self.input_entry.insert(0, filename)
 
+    def browse_transcript(self):
+        filename = filedialog.askopenfilename(filetypes=[("Transcript", "*_transcript.json *.json")])
+        if filename:
+            self.transcript_entry.delete(0, "end")
+            self.transcript_entry.insert(0, filename)
+
     def browse_output(self):
         filename = filedialog.asksaveasfilename(defaultextension=".mp4", filetypes=[("MP4 Video", "*.mp4")])
         if filename:
@@ -217,7 +346,8 @@ class App(ctk.CTk):
 
     def start_processing(self):
         input_file = self.input_entry.get()
-        if not input_file:
+        transcript_file = self.transcript_entry.get() or None
+        if not input_file and not transcript_file:
             self.log("Error: Please select an input file.")
             return
 
@@ -241,6 +371,9 @@ class App(ctk.CTk):
         
         position = self.position_option.get()
         if position: style_options['position'] = position.lower()
+
+        render_mode = self.render_mode_option.get()
+        if render_mode and render_mode != PRESET_DEFAULT: style_options['render_mode'] = render_mode.lower()
         
         text_color = self.text_color_entry.get()
         if text_color: style_options['color'] = self.hex_to_ass(text_color)
@@ -254,53 +387,79 @@ class App(ctk.CTk):
         outline_color = self.outline_color_entry.get()
         if outline_color: style_options['outline_color'] = self.hex_to_ass(outline_color)
 
-        self.start_btn.configure(state="disabled", text="Processing...")
-        self.open_folder_btn.configure(state="disabled")
-        self.input_entry.configure(state="disabled")
-        
-        thread = threading.Thread(target=self.run_process, args=(input_file, output_file, preset, model, device, dry_run, style_options))
-        thread.start()
+        params = {
+            "input_file": input_file or None,
+            "output_file": output_file,
+            "preset": preset,
+            "dry_run": dry_run,
+            "style_options": style_options,
+        }
+        if transcript_file:
+            params["transcript_file"] = transcript_file
+        else:
+            params.update(model=model, device=device)
 
-    def run_process(self, input_file, output_file, preset, model, device, dry_run, style_options):
         try:
-            # We need to know the output path to enable the button later
-            # If output_file is None, main.py generates it.
-            # We can guess it or modify main.py to return it.
-            # For now, let's rely on the fact that if output_file is None, it's input_file + _out.mp4
-            
-            process_video(
-                input_file=input_file,
-                output_file=output_file,
-                preset=preset,
-                model=model,
-                device=device,
-                dry_run=dry_run,
-                style_options=style_options
-            )
-            
-            # Determine output path for the button
-            if output_file:
-                self.last_output_path = output_file
+            job = self.jobs.submit(params)
+        except QueueFull as e:
+            self.log(f"Error: Queue is full ({e}).")
+            return
+        self.log(f"Added job #{job.id} to the queue.")
+
+    def run_job(self, job):
+        """Runs one queued job on a worker thread."""
+        params = dict(job.params)
+        transcript_file = params.pop("transcript_file", None)
+        input_file = params["input_file"]
+        output_file = params["output_file"]
+        try:
+            if transcript_file:
+                # Render-only: reuse the transcript, burn only if an input video is set
+                render_transcript(transcript_file=transcript_file, progress=job.report_progress, **params)
             else:
-                # Replicate logic from utils.py roughly
-                p = Path(input_file)
-                self.last_output_path = str(p.with_name(f"{p.stem}_out.mp4"))
-
-            self.log("Processing Complete!")
-            self.after(0, lambda: self.open_folder_btn.configure(state="normal"))
-            
-        except Exception as e:
-            self.log(f"Error: {e}")
-        finally:
-            self.after(0, self.reset_ui)
-
-    def reset_ui(self):
-        self.start_btn.configure(state="normal", text="Start Processing")
-        self.input_entry.configure(state="normal")
+                process_video(progress=job.report_progress, **params)
+        except JobCancelled:
+            self.release_model(job)
+            raise
+
+        # Determine output path for the button
+        if output_file:
+            self.last_output_path = output_file
+        elif not input_file:
+            self.last_output_path = transcript_file
+        else:
+            # Replicate logic from utils.py roughly
+            p = Path(input_file)
+            self.last_output_path = str(p.with_name(f"{p.stem}_out.mp4"))
+
+        self.log(f"Job #{job.id} complete!")
+        self.after(0, lambda: self.open_folder_btn.configure(state="normal"))
+
+    def release_model(self, job):
+        """Frees a cancelled job's model unless another running job still uses it."""
+        model = job.params.get("model")
+        device = job.params.get("device")
+        if not model:
+            return
+        for other in self.jobs.list():
+            if (other is not job and other.status == "running"
+                    and other.params.get("model") == model and other.params.get("device") == device):
+                return
+        registry = get_registry()
+        # Whatever compute type and thread count it was loaded with, plus the
+        # CPU fallback transcribe() may have loaded
+        released = False
+        for key in registry.loaded():
+            if key[0] == model and (key[1] == device or key[1:3] == ("cpu", "int8")):
+                released |= registry.release(*key)
+        if released:
+            self.log(f"Released Whisper model ({model}).")
 
     def log(self, message):
         logging.info(message)
 
 if __name__ == "__main__":
+    # Needed for the long-form worker processes in the frozen executable
+    multiprocessing.freeze_support()
     app = App()
     app.mainloop()
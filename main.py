@@ -1,16 +1,43 @@
 import argparse
 import sys
-import subprocess
 from pathlib import Path
-from captions.utils import setup_logging, log_info, log_error, log_success, log_warning, check_ffmpeg, get_output_path
-from captions.presets import load_preset
-from captions.asr import extract_audio, transcribe, save_transcript
-from captions.chunking import chunk_words
-from captions.ass_renderer import generate_ass
+from captions.utils import (setup_logging, log_info, log_error, log_success, log_warning, check_ffmpeg,
+                            get_output_path, JobCancelled)
+
+# The pipeline modules (numpy, pydantic, fontTools, faster_whisper) are imported
+# inside the functions that use them, so --help and the GUI window come up fast.
 
 def process_video(input_file: str, output_file: str = None, preset: str = "tiktok", 
                   model: str = "medium", device: str = "auto", dry_run: bool = False,
-                  style_options: dict = None):
+                  style_options: dict = None, compute_type: str = "default",
+                  language: str = None, use_cache: bool = True, in_memory_audio: bool = True,
+                  long_form: bool = False, workers: int = None, burn_segments: int = 1,
+                  threads: int = None, incremental: bool = False, preview=None, variants: list = None,
+                  batched=None, draft_model: str = None, progress=None):
+    """Runs the whole pipeline for one input.
+
+    progress(stage, fraction) is called as stages advance; raising
+    JobCancelled from it stops the run and any ffmpeg it started.
+    preview (a PreviewOptions) renders a short low-resolution clip to
+    <output>_preview.mp4 instead of the full burn.
+    variants ([{"preset", "output", "style"}]) are extra presets rendered from
+    the same transcript and burned in the same ffmpeg run as the main output.
+    batched (a BatchedOptions) transcribes with batched Whisper decoding.
+    draft_model first writes draft captions (and the preview) with a small
+    model, then replaces them with the ones from `model` (see
+    pipeline.transcribe_two_pass).
+    """
+    from captions.asr import save_transcript
+    from captions.metrics import RunReport
+    from captions.pipeline import (plan_renders, decode_input, transcribe_audio, transcribe_two_pass,
+                                   CaptionStream, render_preview, burn_renders, audio_duration,
+                                   video_play_res, transcript_path_for, ass_path_for, report_path_for)
+    from captions.preview import preview_path_for
+
+    def step(stage: str, fraction: float):
+        if progress:
+            progress(stage, fraction)
+
     # 1. Checks
     check_ffmpeg()
     
@@ -21,117 +48,479 @@ def process_video(input_file: str, output_file: str = None, preset: str = "tikto
         
     output_path = get_output_path(input_file, output_file)
     
-    # 2. Load Preset
+    # 2. Load Preset (and any variants)
     try:
-        config = load_preset(preset)
-        log_info(f"Loaded preset: {preset}")
-        
-        # Apply style overrides
-        if style_options:
-            log_info("Applying style overrides...")
-            if 'font_name' in style_options and style_options['font_name']:
-                config.font.name = style_options['font_name']
-            if 'font_size' in style_options and style_options['font_size']:
-                config.font.size = int(style_options['font_size'])
-            if 'color' in style_options and style_options['color']:
-                config.font.color = style_options['color']
-            if 'outline_color' in style_options and style_options['outline_color']:
-                config.font.outline_color = style_options['outline_color']
-                config.highlight.outline_color = style_options['outline_color']
-            if 'highlight_color' in style_options and style_options['highlight_color']:
-                config.highlight.color = style_options['highlight_color']
-            if 'highlight_text_color' in style_options and style_options['highlight_text_color']:
-                config.highlight.text_color = style_options['highlight_text_color']
-            if 'position' in style_options and style_options['position']:
-                config.position = style_options['position']
-                
+        renders = plan_renders(preset, style_options, output_path, variants)
     except Exception as e:
         log_error(str(e))
         raise
         
+    # Per-stage timings and resource usage, written next to the output
+    report = RunReport(input=str(input_path), output=str(output_path), preset=preset,
+                       model=model, device=device, compute_type=compute_type)
+    if variants:
+        report.set("variants", [{"preset": name, "output": str(out)} for name, _, out in renders[1:]])
+    report.set("status", "failed")
+
     # 3. Audio Extraction
-    temp_audio = input_path.with_suffix(".wav")
-    if input_path.suffix.lower() in [".mp3", ".wav", ".m4a"]:
-        # Input is audio
-        temp_audio = input_path
-        log_info("Input is audio file, skipping extraction.")
-    else:
-        # Input is video
-        try:
-            extract_audio(input_path, temp_audio)
-        except Exception as e:
-            raise e
-            
-    # 4. Transcribe
+    step("extract", 0.0)
+    with report.span("extract", in_memory=in_memory_audio):
+        audio, audio_only, temp_audio = decode_input(input_path, in_memory_audio)
+    duration = audio_duration(audio)
+    report.set("audio_duration_s", duration)
+
     try:
-        words = transcribe(temp_audio, model_size=model, device=device)
-        transcript_path = output_path.with_name(output_path.stem + "_transcript.json")
-        save_transcript(words, transcript_path)
-    except Exception as e:
-        raise e
-        
-    # 5. Chunking
-    segments = chunk_words(words, config.chunking)
-    log_info(f"Generated {len(segments)} caption segments.")
-    
-    # 6. Generate ASS
-    ass_path = output_path.with_name(output_path.stem + ".ass")
-    generate_ass(segments, config, ass_path)
-    
-    # 7. Burn-in
-    if dry_run:
-        log_success("Dry run complete. Artifacts generated.")
-        return
+        # 4-6. Transcribe (or reuse a cached transcript of the same audio). Captions are
+        # chunked and appended to each ASS file while Whisper is still decoding.
+        step("transcribe", 0.0)
+        play_res = None if audio_only else video_play_res(input_path)
+        if draft_model:
+            def preview_draft(draft_words):
+                # Runs while the final pass transcribes
+                if preview and not audio_only:
+                    for _, config, target in renders:
+                        render_preview(input_path, draft_words, config, target, preview, threads=threads)
 
-    log_info("Burning captions into video...")
-    # ffmpeg -i input.mp4 -vf "ass=file.ass" -c:a copy output.mp4
-    # Note: We need to re-encode video to burn subtitles.
-    
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", str(input_path),
-        "-vf", f"ass={ass_path.name}",
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-crf", "23",
-        "-c:a", "copy",
-        str(output_path)
-    ]
-    
-    # If input was audio, we can't just burn subs into audio.
-    # We would need a background image or video.
-    # For this MVP, we assume if input is audio, user might want just the ASS or we fail.
-    if input_path.suffix.lower() in [".mp3", ".wav", ".m4a"]:
-        log_warning("Input is audio only. Cannot burn subtitles into audio file. ASS file is ready.")
-        return
+            words = transcribe_two_pass(audio, [(config, ass_path_for(target)) for _, config, target in renders],
+                                        transcript_path_for(output_path), draft_model, model=model,
+                                        device=device, compute_type=compute_type, language=language,
+                                        use_cache=use_cache, play_res=play_res, report=report,
+                                        progress=progress, on_draft=preview_draft)
+        else:
+            captions = None
+            if not preview:
+                captions = CaptionStream([(config, ass_path_for(target)) for _, config, target in renders],
+                                         play_res)
+            try:
+                words = transcribe_audio(audio, model=model, device=device, compute_type=compute_type,
+                                         language=language, use_cache=use_cache,
+                                         long_form=long_form, workers=workers, report=report,
+                                         progress=progress, captions=captions, batched=batched)
+            finally:
+                if captions:
+                    # On failure this still leaves valid ASS files of the captions so far
+                    with report.span("ass", streamed=True) as stage:
+                        captions.close()
+                        stage.info["segments"] = captions.segments
+                        stage.info["events"] = captions.events
+            save_transcript(words, transcript_path_for(output_path))
+        report.set("words", len(words))
 
-    try:
-        # Run ffmpeg in the directory of the ass file to avoid escaping issues with full paths in filter
-        subprocess.run(cmd, check=True, cwd=ass_path.parent)
-        log_success(f"Video created: {output_path}")
-    except subprocess.CalledProcessError as e:
-        log_error(f"Failed to burn subtitles: {e}")
-        raise e
+        if preview:
+            if audio_only:
+                log_warning("Input is audio only, nothing to preview.")
+            else:
+                for _, config, target in renders:
+                    render_preview(input_path, words, config, target, preview, threads=threads,
+                                   report=report, progress=progress)
+            report.set("status", "done")
+            return
+
+        targets = [(ass_path_for(target), target) for _, _, target in renders]
+        if not draft_model:
+            log_info(f"Generated {captions.segments} caption segments, {captions.events} ASS events.")
+        step("render", 1.0)
+
+        # 7. Burn-in
+        if dry_run:
+            report.set("status", "done")
+            log_success("Dry run complete. Artifacts generated.")
+            return
+
+        # If input was audio, we can't just burn subs into audio.
+        # We would need a background image or video.
+        # For this MVP, we assume if input is audio, user might want just the ASS or we fail.
+        if audio_only:
+            report.set("status", "done")
+            log_warning("Input is audio only. Cannot burn subtitles into audio file. ASS file is ready.")
+            return
+
+        burn_renders(input_path, targets, burn_segments=burn_segments, threads=threads,
+                     report=report, progress=progress, duration=duration, incremental=incremental)
+        report.set("status", "done")
+    except JobCancelled:
+        report.set("status", "cancelled")
+        log_warning("Job cancelled.")
+        raise
     finally:
         # Cleanup temp audio if we extracted it
-        if input_path.suffix.lower() not in [".mp3", ".wav", ".m4a"] and temp_audio.exists():
+        if temp_audio and temp_audio.exists():
             try:
                 temp_audio.unlink()
             except:
                 pass
+        report.log_summary()
+        try:
+            report_target = preview_path_for(output_path) if preview else output_path
+            log_info(f"Run report written to {report.write(report_path_for(report_target))}")
+        except OSError as e:
+            log_warning(f"Could not write run report: {e}")
+
+def render_transcript(transcript_file: str, input_file: str = None, output_file: str = None,
+                      preset: str = "tiktok", dry_run: bool = False, style_options: dict = None,
+                      burn_segments: int = 1, threads: int = None, incremental: bool = False,
+                      preview=None, variants: list = None, progress=None):
+    """Re-renders captions from an existing _transcript.json without running Whisper.
+
+    Without an input file only the ASS file is generated. With incremental,
+    only the parts of the video whose captions changed since the last
+    incremental burn are re-encoded. preview renders a short low-resolution
+    clip instead, and variants are rendered alongside (see process_video).
+    """
+    from captions.asr import load_transcript
+    from captions.media import has_video_stream
+    from captions.pipeline import (plan_renders, render_captions, render_preview, burn_renders,
+                                   video_play_res, ass_path_for)
+
+    transcript_path = Path(transcript_file)
+    if not transcript_path.exists():
+        log_error(f"Transcript not found: {transcript_path}")
+        raise FileNotFoundError(f"Transcript not found: {transcript_path}")
+
+    if input_file:
+        input_path = Path(input_file)
+        if not input_path.exists():
+            log_error(f"Input file not found: {input_path}")
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+        output_path = get_output_path(input_file, output_file)
+    else:
+        input_path = None
+        # video_out_transcript.json -> video_out.mp4
+        stem = transcript_path.stem
+        if stem.endswith("_transcript"):
+            stem = stem[:-len("_transcript")]
+        output_path = Path(output_file) if output_file else transcript_path.with_name(f"{stem}.mp4")
+
+    try:
+        renders = plan_renders(preset, style_options, output_path, variants)
+    except Exception as e:
+        log_error(str(e))
+        raise
+
+    words = load_transcript(transcript_path)
+    if preview:
+        if input_path is None:
+            log_error("A preview needs the input video (--input).")
+            raise ValueError("A preview needs the input video")
+        check_ffmpeg()
+        if not has_video_stream(input_path):
+            log_warning("Input is audio only, nothing to preview.")
+            return
+        for _, config, target in renders:
+            render_preview(input_path, words, config, target, preview, threads=threads,
+                           progress=progress)
+        return
+
+    if progress:
+        progress("render", 0.0)
+    has_video = input_path is not None and has_video_stream(input_path)
+    play_res = video_play_res(input_path) if has_video else None
+    targets = [(render_captions(words, config, ass_path_for(target), play_res=play_res), target)
+               for _, config, target in renders]
+    if progress:
+        progress("render", 1.0)
+
+    if dry_run or input_path is None:
+        for ass_path, _ in targets:
+            log_success(f"Captions rendered from transcript: {ass_path}")
+        return
+
+    check_ffmpeg()
+    if not has_video:
+        log_warning("Input is audio only. Cannot burn subtitles into audio file. ASS file is ready.")
+        return
+    burn_renders(input_path, targets, burn_segments=burn_segments, threads=threads,
+                 progress=progress, incremental=incremental)
+
+def job_defaults(args) -> dict:
+    """process_video arguments that server and queue jobs may override."""
+    return {
+        "preset": args.preset,
+        "model": args.model,
+        "device": args.device,
+        "compute_type": args.compute_type,
+        "language": args.language,
+        "burn_segments": args.burn_segments,
+        "threads": args.threads,
+        "use_cache": not args.no_cache,
+    }
+
+def preload_model(args):
+    """Loads the default model up front so the first job doesn't pay for it.
+
+    It gets the budget's model_threads, the count the jobs will ask the
+    registry for, so configure the job concurrency first.
+    """
+    from captions.cpu import get_cpu_budget
+    from captions.models import get_model, uses_gpu
+    cpu_threads = 0 if uses_gpu(args.device) else get_cpu_budget().model_threads()
+    try:
+        get_model(args.model, device=args.device, compute_type=args.compute_type, cpu_threads=cpu_threads)
+    except Exception as e:
+        log_warning(f"Could not preload model '{args.model}': {e}")
+
+def run_server(args):
+    """Serves captioning jobs over HTTP from this process, keeping models warm."""
+    from captions.cpu import configure_cpu_budget
+    from captions.server import serve
+
+    check_ffmpeg()
+    defaults = job_defaults(args)
+    configure_cpu_budget(jobs=args.server_workers)
+    preload_model(args)
+
+    def runner(job):
+        process_video(**job.params, progress=job.report_progress)
+
+    serve(runner, host=args.host, port=args.port, workers=args.server_workers,
+          max_queued=args.max_queued, defaults=defaults)
+
+def run_worker(args):
+    """Claims and runs jobs from a shared queue directory (see captions.workqueue)."""
+    from captions.workqueue import QueueWorker
+
+    check_ffmpeg()
+    preload_model(args)
+
+    def runner(params, progress):
+        process_video(**params, progress=progress)
+
+    worker = QueueWorker(Path(args.worker), runner, defaults=job_defaults(args),
+                         lease_seconds=args.lease_seconds)
+    try:
+        worker.run(drain=args.drain)
+    except KeyboardInterrupt:
+        log_info("Worker stopped.")
+
+def submit_jobs(args, style_options: dict = None, variants: list = None):
+    """Adds --input (or every --batch file) to the queue directory given by --submit."""
+    from captions.workqueue import submit_job
+
+    if args.batch:
+        from captions.batch import collect_jobs
+
+        inputs = [(job.input_path, job.preset) for job in collect_jobs(args.batch)]
+    else:
+        inputs = [(Path(args.input), None)]
+    if not inputs:
+        log_error(f"No input files found for: {args.batch}")
+        sys.exit(1)
+    for input_path, preset in inputs:
+        body = {"input": str(input_path), "preset": preset or args.preset}
+        if args.output and not args.batch:
+            body["output"] = str(Path(args.output).resolve())
+        if style_options:
+            body["style"] = style_options
+        if variants:
+            body["variants"] = variants
+        if args.dry_run:
+            body["dry_run"] = True
+        if args.language:
+            body["language"] = args.language
+        try:
+            job_dir = submit_job(Path(args.submit), body)
+        except ValueError as e:
+            log_error(f"{input_path}: {e}")
+            continue
+        log_success(f"Queued {input_path} as {job_dir}")
+
+def run_live_captions(args, style_options: dict = None):
+    """Captions a live audio source (stdin, pipe, URL or growing file) as it plays."""
+    from captions.live import LiveOptions, run_live
+    from captions.metrics import RunReport
+    from captions.pipeline import build_config, video_play_res, report_path_for
+
+    check_ffmpeg()
+    config = build_config(args.preset, style_options)
+    if args.output:
+        output_path = Path(args.output)
+    elif args.live == "-" or "://" in args.live:
+        output_path = Path("live_captions.ass")
+    else:
+        output_path = Path(args.live).with_name(Path(args.live).stem + "_live.ass")
+    if args.live_formats:
+        output_paths = [output_path.with_suffix("." + f.strip().lstrip(".")) for f in args.live_formats.split(",")]
+    else:
+        output_paths = [output_path]
+
+    # Only a regular file can be probed for its frame size
+    source_file = Path(args.live)
+    play_res = video_play_res(source_file) if args.live != "-" and source_file.is_file() else None
+
+    options = LiveOptions(latency=args.latency, realtime=args.realtime, follow=args.follow)
+    report = RunReport(input=args.live, output=[str(p) for p in output_paths], preset=args.preset,
+                       model=args.model, device=args.device, mode="live", latency_budget_s=args.latency)
+    with report.span("live"):
+        stats = run_live(args.live, output_paths, config, model=args.model, device=args.device,
+                         compute_type=args.compute_type, language=args.language,
+                         options=options, play_res=play_res)
+    report.set("latency", stats)
+    report.set("status", "done")
+    try:
+        log_info(f"Run report written to {report.write(report_path_for(output_paths[0]))}")
+    except OSError as e:
+        log_warning(f"Could not write run report: {e}")
 
 def main():
     setup_logging()
     
     parser = argparse.ArgumentParser(description="Generate CapCut-like captions for videos.")
-    parser.add_argument("--input", required=True, help="Input video/audio file")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--input", help="Input video/audio file")
+    source.add_argument("--live", metavar="SOURCE", help="Caption a live audio source as it plays: '-' for stdin, a pipe, URL or file")
+    source.add_argument("--batch", help="Directory, glob pattern or manifest (.txt/.json) of inputs to process as a batch")
     parser.add_argument("--output", help="Output video file")
-    parser.add_argument("--preset", default="tiktok", help="Preset name or path (default: tiktok)")
+    parser.add_argument("--transcript", help="Render from an existing _transcript.json instead of transcribing (burns only if --input is given)")
+    parser.add_argument("--preset", default="tiktok", help="Preset name or path, or several separated by commas to render each from one transcription and decode (default: tiktok)")
     parser.add_argument("--dry-run", action="store_true", help="Generate artifacts but do not burn video")
     parser.add_argument("--model", default="medium", help="Whisper model size (tiny, base, small, medium, large)")
     parser.add_argument("--device", default="auto", help="Device for Whisper (auto, cpu, cuda)")
+    parser.add_argument("--compute-type", default="default", help="Whisper compute type (default, int8, float16, ...)")
+    parser.add_argument("--language", help="Spoken language code (e.g. en); detected automatically if omitted")
+    parser.add_argument("--compact-ass", action="store_true", help="Emit fewer ASS events (one base line per caption line) for a faster burn")
+    parser.add_argument("--temp-wav", action="store_true", help="Extract audio to a temporary WAV file instead of decoding it in memory")
+    parser.add_argument("--long-form", action="store_true", help="Split long audio at pauses and transcribe the chunks in parallel")
+    parser.add_argument("--workers", type=int, help="Worker processes for --long-form (default: one per 4 CPU cores)")
+    parser.add_argument("--batched", action="store_true", help="Throughput mode: decode 30 s windows in batches (also across --batch files)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Windows decoded together in --batched mode (default: 8)")
+    parser.add_argument("--beam-size", type=int, default=1, help="Beam size in --batched mode (default: 1, greedy)")
+    parser.add_argument("--cpu-threads", type=int, default=0, help="Whisper CPU threads in --batched mode (default: a share of the CPU budget)")
+    parser.add_argument("--batch-files", type=int, default=4, help="Queued --batch files transcribed in one batched pass (default: 4)")
+    parser.add_argument("--draft-model", help="Write draft captions with this small model (e.g. tiny) first, then replace them with --model's")
+    parser.add_argument("--output-dir", help="Output folder for --batch (default: next to each input)")
+    parser.add_argument("--burn-workers", type=int, default=1, help="Parallel ffmpeg burns in --batch mode (default: 1)")
+    parser.add_argument("--burn-segments", type=int, default=1, help="Split the video at keyframes and burn this many ranges in parallel (default: 1)")
+    parser.add_argument("--threads", type=int, help="Total encoder threads for the burn (default: a share of the CPU budget)")
+    parser.add_argument("--incremental", action="store_true", help="Keep the burned parts and on re-runs only re-encode the ranges whose captions changed")
+    parser.add_argument("--preview", action="store_true", help="Render a short low-resolution preview to <output>_preview.mp4 instead of the full video")
+    parser.add_argument("--preview-start", type=float, default=0.0, help="Where the preview starts, in seconds (default: 0)")
+    parser.add_argument("--preview-duration", type=float, default=10.0, help="Preview length in seconds (default: 10)")
+    parser.add_argument("--preview-segments", type=int, help="Preview the first N caption segments instead of a fixed length")
+    parser.add_argument("--preview-height", type=int, default=480, help="Preview height in pixels (default: 480)")
+    parser.add_argument("--live-formats", help="Comma-separated caption formats for --live, written next to --output (ass, srt, vtt)")
+    parser.add_argument("--latency", type=float, default=3.0, help="Seconds from speech to caption in --live mode (default: 3)")
+    parser.add_argument("--realtime", action="store_true", help="Read a --live file at playback speed, as if it were live")
+    parser.add_argument("--follow", action="store_true", help="Keep reading a --live file that is still being written")
+    parser.add_argument("--serve", action="store_true", help="Run a local HTTP job server that keeps models loaded")
+    parser.add_argument("--host", default="127.0.0.1", help="Address for --serve (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve (default: 8765)")
+    parser.add_argument("--server-workers", type=int, default=1, help="Jobs run at the same time by --serve (default: 1)")
+    parser.add_argument("--max-queued", type=int, default=16, help="Queued jobs before --serve rejects new ones (default: 16)")
+    parser.add_argument("--worker", metavar="DIR", help="Run jobs from a shared queue directory until interrupted")
+    parser.add_argument("--submit", metavar="DIR", help="Queue --input (or every --batch file) in a shared queue directory for --worker processes")
+    parser.add_argument("--drain", action="store_true", help="With --worker, exit once every queued job has a result")
+    parser.add_argument("--lease-seconds", type=float, default=120.0, help="A --worker job whose lease is not renewed for this long is taken over (default: 120)")
+    parser.add_argument("--cpu-budget", type=int, help="Threads shared by all transcriptions and encodes running at once (default: all CPU cores)")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-run transcription instead of using the transcript cache")
     
     args = parser.parse_args()
+    if args.cpu_budget:
+        from captions.cpu import configure_cpu_budget
+
+        configure_cpu_budget(args.cpu_budget)
+    if args.serve:
+        run_server(args)
+        return
+    if args.worker:
+        run_worker(args)
+        return
+    if not (args.input or args.batch or args.transcript or args.live):
+        parser.error("one of the arguments --input --batch --transcript --live --serve --worker is required")
+    if args.batch and args.transcript:
+        parser.error("--transcript cannot be combined with --batch")
+
+    style_options = {"render_mode": "compact"} if args.compact_ass else None
+    # "tiktok,clean": the first preset is the main output, the others are variants next to it
+    presets = [p.strip() for p in args.preset.split(",") if p.strip()]
+    args.preset = presets[0] if presets else "tiktok"
+    variants = [{"preset": p} for p in presets[1:]] or None
+    # Job submissions reject a null style, so it is only set when there is one
+    for variant in variants or []:
+        if style_options:
+            variant["style"] = style_options
+    if variants and (args.batch or args.live):
+        parser.error("several presets can't be combined with --batch or --live")
+    if args.submit:
+        if args.live or args.transcript:
+            parser.error("--submit takes --input or --batch")
+        submit_jobs(args, style_options, variants)
+        return
+    if args.live:
+        if args.transcript:
+            parser.error("--transcript cannot be combined with --live")
+        try:
+            run_live_captions(args, style_options)
+        except Exception as e:
+            log_error(str(e))
+            sys.exit(1)
+        return
+    batched = None
+    if args.batched:
+        from captions.batched import BatchedOptions
+
+        if args.long_form:
+            parser.error("--batched cannot be combined with --long-form")
+        batched = BatchedOptions(batch_size=args.batch_size, beam_size=args.beam_size,
+                                 cpu_threads=args.cpu_threads, files=args.batch_files)
+    if args.draft_model and (args.batch or args.transcript or args.long_form or args.batched):
+        parser.error("--draft-model only works with a single --input, without --long-form or --batched")
+    preview = None
+    if args.preview:
+        from captions.preview import PreviewOptions
+
+        if args.batch:
+            parser.error("--preview cannot be combined with --batch")
+        if args.transcript and not args.input:
+            parser.error("--preview with --transcript needs --input")
+        if args.preview_duration <= 0 or args.preview_height <= 0 or (args.preview_segments or 1) <= 0:
+            parser.error("--preview-duration, --preview-height and --preview-segments must be positive")
+        preview = PreviewOptions(start=args.preview_start, duration=args.preview_duration,
+                                 segments=args.preview_segments, height=args.preview_height)
+
+    if args.batch:
+        from captions.batch import collect_jobs, run_batch
+
+        check_ffmpeg()
+        jobs = collect_jobs(args.batch, args.output_dir)
+        if not jobs:
+            log_error(f"No input files found for: {args.batch}")
+            sys.exit(1)
+        report_dir = Path(args.output_dir) if args.output_dir else Path.cwd()
+        run_batch(
+            jobs,
+            preset=args.preset,
+            model=args.model,
+            device=args.device,
+            dry_run=args.dry_run,
+            style_options=style_options,
+            compute_type=args.compute_type,
+            language=args.language,
+            use_cache=not args.no_cache,
+            in_memory_audio=not args.temp_wav,
+            burn_workers=args.burn_workers,
+            report_path=report_dir / "batch_report.json",
+            batched=batched
+        )
+        sys.exit(0 if all(j.status == "done" for j in jobs) else 1)
+
+    if args.transcript:
+        try:
+            render_transcript(
+                transcript_file=args.transcript,
+                input_file=args.input,
+                output_file=args.output,
+                preset=args.preset,
+                dry_run=args.dry_run,
+                style_options=style_options,
+                burn_segments=args.burn_segments,
+                threads=args.threads,
+                incremental=args.incremental,
+                preview=preview,
+                variants=variants
+            )
+        except Exception:
+            sys.exit(1)
+        return
     
     try:
         process_video(
@@ -140,7 +529,21 @@ def main():
             preset=args.preset,
             model=args.model,
             device=args.device,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            style_options=style_options,
+            compute_type=args.compute_type,
+            language=args.language,
+            use_cache=not args.no_cache,
+            in_memory_audio=not args.temp_wav,
+            long_form=args.long_form,
+            workers=args.workers,
+            burn_segments=args.burn_segments,
+            threads=args.threads,
+            incremental=args.incremental,
+            preview=preview,
+            variants=variants,
+            batched=batched,
+            draft_model=args.draft_model
         )
     except Exception:
         sys.exit(1)
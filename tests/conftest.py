@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The repository is not an installed package; make captions/ and benchmarks/ importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,81 @@
+import hashlib
+from captions.burn import BurnRange, parse_ass_time, plan_ranges, range_hashes, read_ass_events
+
+HEADER = """[Script Info]
+PlayResX: 1080
+PlayResY: 1920
+
+[V4+ Styles]
+Style: Default,Arial,60
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+RANGES = [BurnRange(0, 0.0, 10.0, 300), BurnRange(1, 10.0, 20.0, 300), BurnRange(2, 20.0, None, 150)]
+
+def dialogue(start: str, end: str, text: str) -> str:
+    return f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}"
+
+def hashes(lines, header=HEADER):
+    return range_hashes(RANGES, hashlib.sha1(header.encode("utf-8")).hexdigest(), [
+        (parse_ass_time(line.split(",")[1]), parse_ass_time(line.split(",")[2]), line) for line in lines])
+
+EVENTS = [
+    dialogue("0:00:01.00", "0:00:02.00", "one"),
+    dialogue("0:00:12.00", "0:00:13.00", "two"),
+    dialogue("0:00:25.00", "0:00:26.50", "three"),
+]
+
+def test_parse_ass_time():
+    assert parse_ass_time("0:00:01.50") == 1.5
+    assert parse_ass_time("1:02:03.04") == 3723.04
+
+def test_edit_changes_only_its_range():
+    before = hashes(EVENTS)
+    edited = hashes([EVENTS[0], dialogue("0:00:12.00", "0:00:13.00", "TWO"), EVENTS[2]])
+    assert [a == b for a, b in zip(before, edited)] == [True, False, True]
+    assert hashes(EVENTS) == before
+
+def test_event_across_a_cut_counts_for_both_ranges():
+    before = hashes(EVENTS)
+    spanning = hashes(EVENTS + [dialogue("0:00:09.50", "0:00:10.50", "across")])
+    assert [a == b for a, b in zip(before, spanning)] == [False, False, True]
+
+def test_event_rounded_down_before_a_cut_counts_for_the_next_range():
+    # ASS rounds times down to the centisecond: a word at 9.999 s starts at 9.99
+    before = hashes(EVENTS)
+    edge = hashes(EVENTS + [dialogue("0:00:09.99", "0:00:09.995", "edge")])
+    assert edge[1] != before[1]
+
+def test_header_change_changes_every_range():
+    before = hashes(EVENTS)
+    restyled = hashes(EVENTS, header=HEADER.replace("60", "72"))
+    assert all(a != b for a, b in zip(before, restyled))
+
+def test_read_ass_events(tmp_path):
+    path = tmp_path / "a.ass"
+    path.write_text(HEADER + "\n".join(reversed(EVENTS)) + "\n", encoding="utf-8")
+    header_hash, events = read_ass_events(path)
+    # Sorted by start time, lines kept verbatim
+    assert [e[2] for e in events] == EVENTS
+    assert events[2][:2] == (25.0, 26.5)
+
+    path.write_text(HEADER.replace("60", "72") + "\n".join(EVENTS) + "\n", encoding="utf-8")
+    assert read_ass_events(path)[0] != header_hash
+
+def test_plan_ranges_starts_on_keyframes_and_keeps_every_frame():
+    frames = [i / 30 for i in range(30 * 60)]
+    keyframes = [float(k) for k in range(0, 60, 2)]
+    ranges = plan_ranges(frames, keyframes, 4, 60.0)
+    assert len(ranges) == 4
+    assert all(r.start in keyframes for r in ranges)
+    assert sum(r.frames for r in ranges) == len(frames)
+    assert [r.end for r in ranges[:-1]] == [r.start for r in ranges[1:]]
+    assert ranges[-1].end is None
+
+def test_plan_ranges_skips_short_ranges():
+    frames = [i / 30 for i in range(30 * 3)]
+    # A 3 s clip can't be split into ranges of at least MIN_RANGE_SECONDS
+    assert len(plan_ranges(frames, [0.0, 1.0, 2.0], 4, 3.0)) == 1
+    assert plan_ranges([], [], 4, 0.0) == []
@@ -0,0 +1,77 @@
+import pytest
+from benchmarks.synthetic import make_words
+from captions.asr import Word
+from captions.chunking import StreamingChunker, break_lines, chunk_words
+from captions.presets import ChunkingConfig
+from captions.timeline import WordTimeline
+
+CONFIGS = [
+    ChunkingConfig(),
+    ChunkingConfig(max_chars=12, max_words=8, max_lines=3, gap_threshold=0.3),
+    ChunkingConfig(max_chars=30, max_words=3, max_lines=1, gap_threshold=1.0),
+    ChunkingConfig(max_chars=6, max_words=10, max_lines=2),
+]
+
+def layout(segments):
+    """What a caption looks like on screen: its lines of words and its timing."""
+    return [([[w.word for w in line] for line in seg.lines], seg.start, seg.end) for seg in segments]
+
+def stream(words, config):
+    chunker = StreamingChunker(config)
+    segments = []
+    for word in words:
+        segments.extend(chunker.push(word))
+    return segments + chunker.flush()
+
+def unicode_words():
+    # Multi-byte text, a word longer than a line, empty text and touching words
+    texts = ["Größe", "naïve", "日本語のテキスト", "", "supercalifragilistic,", "ok.", "déjà", "vu!", "ä"]
+    words, t = [], 0.0
+    for i, text in enumerate(texts * 3):
+        words.append(Word(text, t, t + 0.2, 0.9))
+        t += 0.2 + (0.8 if i % 7 == 6 else 0.0)
+    return words
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("seed", range(5))
+def test_streaming_matches_batch(config, seed):
+    words = make_words(400, seed=seed)
+    assert layout(stream(words, config)) == layout(chunk_words(words, config))
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_streaming_matches_batch_unicode(config):
+    words = unicode_words()
+    assert layout(stream(words, config)) == layout(chunk_words(words, config))
+
+def test_timeline_input_matches_word_list():
+    words = make_words(300, seed=7)
+    config = ChunkingConfig()
+    assert layout(chunk_words(WordTimeline.from_words(words), config)) == layout(chunk_words(words, config))
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_segments_respect_limits(config):
+    words = make_words(500, seed=3)
+    segments = chunk_words(words, config)
+    # Every word exactly once, in order
+    assert [w.word for seg in segments for w in seg.words] == [w.word for w in words]
+    for seg in segments:
+        assert len(seg.words) <= config.max_words
+        assert 1 <= len(seg.lines) <= config.max_lines
+        for line in seg.lines:
+            assert len(line) == 1 or len(" ".join(w.word for w in line)) <= config.max_chars
+
+def test_empty_input():
+    assert chunk_words([], ChunkingConfig()) == []
+    assert StreamingChunker(ChunkingConfig()).flush() == []
+
+def test_break_lines_prefers_punctuation():
+    # "aa bbbb, cccc dddd eeee": breaking after the comma costs a little balance
+    lengths = [2, 5, 4, 4, 4]
+    punctuation = [False, True, False, False, False]
+    assert break_lines(lengths, punctuation, [0.0] * 5, max_chars=16, max_lines=2) == [2]
+    assert break_lines(lengths, [False] * 5, [0.0] * 5, max_chars=16, max_lines=2) == [3]
+
+def test_break_lines_single_line_and_long_word():
+    assert break_lines([3, 3], [False, False], [0.0, 0.0], max_chars=20, max_lines=2) == []
+    # A word longer than max_chars gets a line of its own
+    assert break_lines([2, 30, 2], [False] * 3, [0.0] * 3, max_chars=10, max_lines=3) == [1, 2]
@@ -0,0 +1,80 @@
+import pytest
+from benchmarks.synthetic import make_words
+from captions.asr import Word, load_transcript, save_transcript
+from captions.cache import TranscriptCache
+from captions.timeline import MAGIC, WordTimeline, is_timeline_file
+
+WORDS = [
+    Word("Hello,", 0.0, 0.4, 0.91),
+    Word("Größe", 0.45, 0.9, 0.5),
+    Word("", 1.0, 1.0, 0.0),
+    Word("日本語", 1.2, 1.7, 0.75),
+    Word("end.", 2.0, 2.3, 1.0),
+]
+
+def as_tuples(words):
+    # Probabilities are stored as float32
+    return [(w.word, w.start, w.end, pytest.approx(w.probability, abs=1e-6)) for w in words]
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(tmp_path, mmap):
+    path = tmp_path / "t.words"
+    WordTimeline.from_words(WORDS).save(path)
+    timeline = WordTimeline.load(path, mmap=mmap)
+    assert len(timeline) == len(WORDS)
+    assert as_tuples(timeline) == as_tuples(WORDS)
+    assert timeline.texts(1, 4) == ["Größe", "", "日本語"]
+    assert timeline[-1].word == "end."
+
+def test_round_trip_large(tmp_path):
+    words = make_words(5000, seed=1)
+    path = tmp_path / "t.words"
+    WordTimeline.from_words(words).save(path)
+    assert as_tuples(WordTimeline.load(path)) == as_tuples(words)
+
+def test_empty_timeline(tmp_path):
+    path = tmp_path / "empty.words"
+    WordTimeline.from_words([]).save(path)
+    timeline = WordTimeline.load(path)
+    assert len(timeline) == 0
+    assert timeline.to_words() == []
+
+def test_columns():
+    timeline = WordTimeline.from_words(WORDS)
+    # Characters, not UTF-8 bytes
+    assert timeline.char_lengths().tolist() == [6, 5, 0, 3, 4]
+    assert timeline.ends_with_punctuation().tolist() == [True, False, False, False, True]
+
+def test_rejects_other_and_truncated_files(tmp_path):
+    other = tmp_path / "other.words"
+    other.write_bytes(b"NOTWORDS" + bytes(16))
+    with pytest.raises(ValueError):
+        WordTimeline.load(other)
+    assert not is_timeline_file(other)
+
+    path = tmp_path / "t.words"
+    WordTimeline.from_words(WORDS).save(path)
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(ValueError):
+        WordTimeline.load(path, mmap=False)
+
+def test_transcript_files(tmp_path):
+    json_path = tmp_path / "video_transcript.json"
+    save_transcript(WORDS, json_path)
+    binary = json_path.with_suffix(".words")
+    assert binary.read_bytes().startswith(MAGIC)
+    assert as_tuples(load_transcript(json_path)) == as_tuples(WORDS)
+    assert as_tuples(load_transcript(binary)) == as_tuples(WORDS)
+
+def test_cache_drops_only_legacy_entries(tmp_path):
+    legacy = tmp_path / f"{'ab' * 32}.json"
+    legacy.write_text("[]", encoding="utf-8")
+    kept = [tmp_path / "notes.json", tmp_path / f"{'AB' * 32}.json"]
+    for path in kept:
+        path.write_text("{}", encoding="utf-8")
+    cache = TranscriptCache(tmp_path)
+    key = cache.make_key("digest", "small")
+    cache.put(key, WORDS)
+    assert not legacy.exists()
+    assert all(path.exists() for path in kept)
+    assert as_tuples(cache.get(key)) == as_tuples(WORDS)
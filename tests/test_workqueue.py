@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+import pytest
+from captions import workqueue
+from captions.workqueue import (ATTEMPTS_FILE, RESULT_FILE, Lease, QueueWorker, latest_lease, lease_expired,
+                                lease_path, pending_jobs, queue_status, submit_job)
+
+@pytest.fixture
+def job_dir(tmp_path):
+    video = tmp_path / "in.mp4"
+    video.write_bytes(b"")
+    return submit_job(tmp_path / "queue", {"input": str(video)})
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+def race(count, func):
+    """Runs func on `count` threads released at the same moment; returns their results."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        barrier.wait()
+        results[i] = func(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_submit_job(job_dir, tmp_path):
+    body = json.loads((job_dir / "job.json").read_text(encoding="utf-8"))
+    assert body["input"] == str((tmp_path / "in.mp4").resolve())
+    assert pending_jobs(tmp_path / "queue") == [job_dir]
+    with pytest.raises(ValueError):
+        submit_job(tmp_path / "queue", {"input": str(tmp_path / "missing.mp4")})
+
+def test_lease_is_exclusive(job_dir):
+    leases = race(8, lambda i: Lease.acquire(job_dir, f"w{i}"))
+    winners = [lease for lease in leases if lease]
+    assert len(winners) == 1
+    lease = winners[0]
+    assert lease.held() and lease.heartbeat()
+    lease.release()
+    assert lease_expired(lease.path)
+
+def expire(job_dir):
+    _, path = latest_lease(job_dir)
+    age(path, 600)
+
+def test_heartbeat_fails_once_taken_over(job_dir):
+    lease = Lease.acquire(job_dir, "old")
+    expire(job_dir)
+    new = Lease.acquire(job_dir, "new", lease_seconds=120)
+    assert new.generation == 2
+    assert not lease.held() and not lease.heartbeat()
+    # Releasing a lost lease must not touch the new owner's
+    lease.release()
+    assert new.held() and not lease_expired(new.path)
+
+def test_live_lease_blocks_claims(job_dir):
+    lease = Lease.acquire(job_dir, "w")
+    assert Lease.acquire(job_dir, "other", lease_seconds=120) is None
+    assert lease.held()
+
+def test_release_lets_the_next_worker_in(job_dir):
+    Lease.acquire(job_dir, "w").release()
+    lease = Lease.acquire(job_dir, "next", lease_seconds=120)
+    assert lease is not None and lease.generation == 2
+
+def test_expired_lease_race_gives_the_job_to_one_worker(job_dir):
+    Lease.acquire(job_dir, "dead")
+    for generation in range(2, 22):
+        expire(job_dir)
+        winners = [lease for lease in race(8, lambda i: Lease.acquire(job_dir, f"w{i}", lease_seconds=120))
+                   if lease]
+        assert len(winners) == 1
+        assert winners[0].generation == generation and winners[0].held()
+    assert latest_lease(job_dir)[0] == 21
+
+def test_claim_from_an_outdated_view_fails(job_dir, monkeypatch):
+    first = Lease.acquire(job_dir, "a")
+    expire(job_dir)
+    second = Lease.acquire(job_dir, "b", lease_seconds=120)
+    # A slow worker that listed the folder before any lease existed
+    views = iter([(0, None)])
+    real = workqueue.latest_lease
+    monkeypatch.setattr(workqueue, "latest_lease", lambda d: next(views, None) or real(d))
+    assert Lease.acquire(job_dir, "slow") is None
+    # ... or while lease.1 was the newest and had expired
+    views = iter([(1, first.path)])
+    assert Lease.acquire(job_dir, "slow", lease_seconds=120) is None
+    assert second.held()
+
+def worker(queue_dir, runner, **kwargs):
+    return QueueWorker(queue_dir, runner, poll_seconds=0.01, **kwargs)
+
+def result_of(job_dir):
+    return json.loads((job_dir / RESULT_FILE).read_text(encoding="utf-8"))
+
+def test_worker_runs_jobs(job_dir):
+    seen = []
+    worker(job_dir.parent, lambda params, progress: seen.append(params)).run(drain=True)
+    assert result_of(job_dir)["status"] == "done"
+    assert seen[0]["output_file"] == str(job_dir / "in_out.mp4")
+    assert lease_expired(latest_lease(job_dir)[1])
+    assert queue_status(job_dir.parent) == {"done": 1}
+
+def test_worker_records_failures(job_dir):
+    def fail(params, progress):
+        raise RuntimeError("boom")
+
+    worker(job_dir.parent, fail).run(drain=True)
+    assert result_of(job_dir)["status"] == "failed"
+    assert result_of(job_dir)["error"] == "boom"
+
+def test_worker_gives_up_after_max_attempts(job_dir):
+    (job_dir / ATTEMPTS_FILE).write_text("1 a\n2 b\n", encoding="utf-8")
+    ran = []
+    worker(job_dir.parent, lambda params, progress: ran.append(1), max_attempts=2).run(drain=True)
+    assert not ran
+    assert result_of(job_dir)["status"] == "failed"
+
+def test_worker_stops_when_its_lease_is_lost(job_dir):
+    def runner(params, progress):
+        # Another worker takes the job over
+        lease_path(job_dir, 2).write_text(json.dumps({"worker": "other", "token": "x"}), encoding="utf-8")
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            progress("transcribe", 0.5)
+            time.sleep(0.01)
+        pytest.fail("progress() didn't raise after the lease was lost")
+
+    qw = worker(job_dir.parent, runner, lease_seconds=0.3, heartbeat_seconds=0.05)
+    qw.run_job(qw.claim())
+    # The new owner writes the result, not this worker
+    assert not (job_dir / RESULT_FILE).exists()
+    assert qw.processed == 0